@@ -0,0 +1,24 @@
+from time import sleep
+
+from pysphero.core import Sphero
+from pysphero.device_api.sensor import Collision, CollisionDetectionMethod
+
+
+def collision_callback(collision: Collision):
+    axes = "".join(axis for axis, hit in (("x", collision.x_axis), ("y", collision.y_axis)) if hit)
+    print(f"[{collision.timestamp}] Collision on {axes}: {collision.magnitude:1.2f}g, speed {collision.speed}")
+
+
+def main():
+    mac_address = "aa:bb:cc:dd:ee:ff"
+    with Sphero(mac_address=mac_address) as sphero:
+        sphero.power.wake()
+        sphero.sensor.configure_collision_detection(CollisionDetectionMethod.accelerometer, 90, 90, 130, 130, 1)
+        sphero.sensor.set_collision_notify(collision_callback)
+        sleep(10)
+        sphero.sensor.cancel_collision_notify()
+        sphero.power.enter_soft_sleep()
+
+
+if __name__ == "__main__":
+    main()
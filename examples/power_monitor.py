@@ -0,0 +1,22 @@
+from time import sleep
+
+from pysphero.core import Sphero
+from pysphero.power_monitor import PowerMonitor, PowerState
+
+
+def print_state(state: PowerState):
+    print(f"Battery {state.battery_percentage}% ({state.battery_state}), "
+          f"charger {state.charger_state}, {state.sleep_state.value}")
+
+
+def main():
+    mac_address = "aa:bb:cc:dd:ee:ff"
+    with Sphero(mac_address=mac_address) as sphero:
+        with PowerMonitor(sphero, reconcile_interval=60, on_change=print_state) as monitor:
+            monitor.wake()
+            # connect or disconnect charger to get notification
+            sleep(30)
+
+
+if __name__ == "__main__":
+    main()
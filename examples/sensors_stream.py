@@ -0,0 +1,19 @@
+from pysphero.core import Sphero
+from pysphero.device_api.sensor import Accelerometer, CoreTime, OverflowPolicy
+
+
+def main():
+    mac_address = "aa:bb:cc:dd:ee:ff"
+    with Sphero(mac_address=mac_address) as sphero:
+        sphero.power.wake()
+        with sphero.sensor.stream(Accelerometer, CoreTime, interval=50, overflow=OverflowPolicy.drop_oldest) as samples:
+            for _ in range(10):
+                batch = samples.take(20, timeout=2)
+                x = sum(sample.values[Accelerometer.x] for sample in batch) / max(len(batch), 1)
+                print(f"{len(batch)} samples, mean x: {x:1.2f}, dropped: {samples.dropped}")
+
+        sphero.power.enter_soft_sleep()
+
+
+if __name__ == "__main__":
+    main()
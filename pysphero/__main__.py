@@ -0,0 +1,5 @@
+import sys
+
+from pysphero.cli import main
+
+sys.exit(main())
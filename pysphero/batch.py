@@ -0,0 +1,164 @@
+import logging
+from concurrent.futures import Future
+from typing import List, NamedTuple, Optional
+
+from pysphero.device_api import Animatronics, ApiProcessor, Power, Sensor, SystemInfo, UserIO
+from pysphero.driving import Driving
+from pysphero.exceptions import PySpheroRuntimeError, PySpheroException
+from pysphero.helpers import cached_property
+from pysphero.packet import Packet
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchRequest(NamedTuple):
+    packet: Packet
+    future: Future
+    timeout: Optional[float]
+    raise_api_error: bool
+    durable: bool = False  # remembered by adapter after successful response
+
+
+class _BatchAdapter:
+    """
+    Ble adapter for device api which collects requests and returns futures of responses
+    """
+
+    def __init__(self, batch: "Batch"):
+        self.batch = batch
+
+    @property
+    def sequences(self):
+        # packets of batch are in flight together with other requests of the adapter
+        return getattr(self.batch.ble_adapter, "sequences", None)
+
+    def write(self, packet: Packet, *, timeout: float = None, raise_api_error: bool = True) -> Future:
+        future = Future()
+        self.batch.requests.append(_BatchRequest(packet, future, timeout, raise_api_error))
+        self.batch.futures.append(future)
+        return future
+
+    def remember(self, packet: Packet):
+        # called by device api right after write of the request
+        requests = self.batch.requests
+        if requests and requests[-1].packet is packet:
+            requests[-1] = requests[-1]._replace(durable=True)
+        else:
+            self.batch.ble_adapter.remember(packet)
+
+    def forget(self, packet_id):
+        self.batch.ble_adapter.forget(packet_id)
+
+    def start_notify(self, *args, **kwargs):
+        raise PySpheroRuntimeError("Notifications can't be used in batch")
+
+    def stop_notify(self, *args, **kwargs):
+        raise PySpheroRuntimeError("Notifications can't be used in batch")
+
+
+class Batch:
+    """
+    Collect requests and send them at once: frames are packed into writes of adapter's mtu,
+    then responses are matched with requests by sequence.
+    Every request gets a future of response packet (batch.futures in order of requests),
+    so only commands which don't decode response (setters, drive, etc.) make sense here.
+    Requests of batch are sent once, without retries of timeout policy
+
+    with sphero.batch() as batch:
+        batch.driving.set_stabilization(StabilizationIndex.full_control_system)
+        batch.driving.reset_yaw()
+        batch.user_io.set_all_leds_8_bit_mask(front_color=Color(green=0xff))
+    for future in batch.futures:
+        future.result()
+    """
+
+    def __init__(self, ble_adapter):
+        self.ble_adapter = ble_adapter
+        self.requests: List[_BatchRequest] = []
+        self.futures: List[Future] = []
+        self._adapter = _BatchAdapter(self)
+
+    @cached_property
+    def system_info(self) -> SystemInfo:
+        return SystemInfo(ble_adapter=self._adapter)
+
+    @cached_property
+    def api_processor(self) -> ApiProcessor:
+        return ApiProcessor(ble_adapter=self._adapter)
+
+    @cached_property
+    def power(self) -> Power:
+        return Power(ble_adapter=self._adapter)
+
+    @cached_property
+    def driving(self) -> Driving:
+        return Driving(ble_adapter=self._adapter)
+
+    @cached_property
+    def user_io(self) -> UserIO:
+        return UserIO(ble_adapter=self._adapter)
+
+    @cached_property
+    def sensor(self) -> Sensor:
+        return Sensor(ble_adapter=self._adapter)
+
+    @cached_property
+    def animatronics(self) -> Animatronics:
+        return Animatronics(ble_adapter=self._adapter)
+
+    def send(self):
+        """
+        Send collected requests and resolve their futures
+        """
+        requests, self.requests = self.requests, []
+        if not requests:
+            return
+
+        try:
+            self.ble_adapter.send_many([request.packet for request in requests])
+        except PySpheroException as e:
+            for request in requests:
+                self._release(request)
+                request.future.set_exception(e)
+            raise
+
+        collector = self.ble_adapter.packet_collector
+        for request in requests:
+            timeout = request.timeout
+            if timeout is None:
+                timeout = self.ble_adapter.timeout_policy.timeout(request.packet.id)
+
+            try:
+                response = collector.get_response(request.packet, request.raise_api_error, timeout=timeout)
+            except PySpheroException as e:
+                logger.debug(f"Batch request {request.packet} failed: {e}")
+                request.future.set_exception(e)
+            else:
+                if request.durable:
+                    self.ble_adapter.remember(request.packet)
+                request.future.set_result(response)
+            finally:
+                self._release(request)
+
+    def _release(self, request: _BatchRequest):
+        sequences = self._adapter.sequences
+        if sequences is not None:
+            sequences.release(request.packet)
+
+    def cancel(self):
+        """
+        Drop collected requests
+        """
+        requests, self.requests = self.requests, []
+        for request in requests:
+            self._release(request)
+            request.future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.cancel()
+        else:
+            self.send()
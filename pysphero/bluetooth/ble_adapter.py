@@ -1,11 +1,18 @@
 import abc
+import contextlib
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from threading import Event
-from typing import Callable, Optional
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Event, Lock, Thread
+from typing import Callable, Optional, Tuple, Type, List, Dict
 
 from pysphero.bluetooth.packet_collector import PacketCollector
-from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.bluetooth.receive_ring import ReceiveRing
+from pysphero.bluetooth.sequence_allocator import SequenceAllocator
+from pysphero.bluetooth.timeout_policy import AdaptiveTimeout
+from pysphero.exceptions import PySpheroRuntimeError, PySpheroTimeoutError, PySpheroConnectionLostError, \
+    PySpheroException
 from pysphero.packet import Packet
 
 logger = logging.getLogger(__name__)
@@ -14,53 +21,380 @@ STOP_NOTIFY = object()
 
 
 class AbstractBleAdapter(abc.ABC):
-    def __init__(self, mac_address, max_workers=2):
+    # backend exceptions which mean that link to the toy is lost
+    connection_errors: Tuple[Type[Exception], ...] = ()
+
+    # reconnect with exponential backoff: delay, delay * 2, ... up to max delay
+    reconnect_attempts = 8
+    reconnect_delay = 0.25
+    reconnect_max_delay = 4.0
+    # how long new requests wait for the end of reconnect
+    reconnect_timeout = 10.0
+
+    # max bytes of one write, ATT payload of default MTU 23.
+    # Backends which can exchange MTU set it from the negotiated one on every connect
+    mtu = 20
+    preferred_mtu = 247
+
+    # executor runs loops of backend (receiver), every notification subscription has own thread
+    def __init__(self, mac_address, max_workers=8):
         self.mac_address = mac_address
         self.packet_collector = PacketCollector()
+        self.timeout_policy = AdaptiveTimeout()
+        self.sequences = SequenceAllocator()
+        # backend callbacks only push raw bytes, packets are built by parser thread
+        self.receive_ring = ReceiveRing()
+        self.reconnect_callbacks: List[Callable] = []
 
         self._executor = ThreadPoolExecutor(max_workers=max_workers)
         self._running = Event()  # disable receiver thread
         self._running.set()
-        self._notify_future = None
+        self._connected = Event()  # cleared while reconnecting
+        self._connected.set()
+        self._reconnect_lock = Lock()
+        self._reconnecting = False
+        self._durable_packets = OrderedDict()
+        self._notify_futures: Dict[Tuple, Future] = {}
+        self._notify_stops: Dict[Tuple, Event] = {}
+
+        self._parser = Thread(target=self._parse_worker, name=f"parser-{mac_address}", daemon=True)
+        self._parser.start()
 
     def close(self):
         self._running.clear()
+        # notification workers without timeout would wait forever
+        self.stop_notify()
+        self.receive_ring.wake_up()
         self._executor.shutdown(wait=False)
 
-    def write(self, packet: Packet, *, timeout: float = 10, raise_api_error: bool = True) -> Optional[Packet]:
+    def _parse_worker(self):
+        logger.debug("Start parser")
+
+        while self._running.is_set():
+            data = self.receive_ring.pop(timeout=0.1)
+            if not data:
+                continue
+
+            # parser must survive broken packets (e.g. after dropped chunks)
+            try:
+                self.packet_collector.append_raw_data(data)
+            except PySpheroRuntimeError as e:
+                logger.warning(f"Broken packet dropped: {e}")
+            except Exception:
+                logger.exception("Unable to parse received data")
+                self.packet_collector.reset()
+
+        logger.debug("Stop parser")
+
+    @abc.abstractmethod
+    def _connect(self):
+        """
+        Connect to peripheral and prepare api characteristic for requests
+        """
+
+    @abc.abstractmethod
+    def _disconnect(self):
+        """
+        Drop connection to peripheral
+        """
+
+    @abc.abstractmethod
+    def _write_raw(self, data: bytes):
+        """
+        Write bytes to api characteristic of peripheral
+
+        :param data: built packet
+        """
+
+    def _set_att_mtu(self, att_mtu: Optional[int]):
+        """
+        Set max size of write from negotiated ATT MTU, default is kept when it is unknown
         """
-         Method allow send request packet and get response packet
+        if att_mtu:
+            # ATT header of write: opcode and handle
+            self.mtu = max(att_mtu - 3, type(self).mtu)
+            logger.debug(f"MTU of {self.mac_address}: {att_mtu}")
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _wait_connected(self):
+        """
+        Wait for the end of reconnect. Reconnect is started again when previous one gave up
+        """
+        if not self._connected.is_set():
+            self._start_reconnect()
+
+        if not self._connected.wait(self.reconnect_timeout):
+            raise PySpheroConnectionLostError(f"Not connected to {self.mac_address}")
+
+    def send(self, packet: Packet):
+        """
+        Send request packet without waiting for a response
+
+        :param packet: request packet
+        """
+        self._wait_connected()
+
+        logger.debug(f"Send {packet}")
+        try:
+            self._write_raw(packet.build())
+        except self.connection_errors as e:
+            self.handle_disconnect()
+            raise PySpheroConnectionLostError(f"Connection lost while sending {packet}") from e
+
+    def send_many(self, packets: List[Packet]):
+        """
+        Send request packets without waiting for responses.
+        Frames are concatenated into as few writes of mtu size as possible,
+        frame is never split between writes
+
+        :param packets: request packets
+        """
+        self._wait_connected()
+
+        writes = []
+        for packet in packets:
+            logger.debug(f"Send {packet}")
+            frame = packet.build()
+            if writes and len(writes[-1]) + len(frame) <= self.mtu:
+                writes[-1] += frame
+            else:
+                writes.append(bytearray(frame))
+
+        try:
+            for data in writes:
+                self._write_raw(bytes(data))
+        except self.connection_errors as e:
+            self.handle_disconnect()
+            raise PySpheroConnectionLostError(f"Connection lost while sending {len(packets)} packets") from e
+
+    def write(self, packet: Packet, *, timeout: float = None, raise_api_error: bool = True) -> Optional[Packet]:
+        """
+         Method allow send request packet and get response packet.
+         Without explicit timeout the request is sent with timeout of the adapter's timeout_policy,
+         read-only commands of timeout_policy.retryable are retried
 
          :param packet: request packet
-         :param timeout: timeout waiting for a response from sphero
+         :param timeout: timeout waiting for a response from sphero, overrides timeout policy
          :param raise_api_error: raise exception when receive api error
          :return Packet: response packet
          """
+        try:
+            return self._write(packet, timeout, raise_api_error)
+        finally:
+            self.sequences.release(packet)
+
+    def _write(self, packet: Packet, timeout: Optional[float], raise_api_error: bool) -> Optional[Packet]:
+        if timeout is not None:
+            self.send(packet)
+            return self.packet_collector.get_response(packet, raise_api_error, timeout=timeout)
 
-    def start_notify(self, packet: Packet, callback: Callable, timeout: float = 10):
-        self._notify_future = self._executor.submit(
-            self.notify_worker,
-            callback,
-            packet,
-            timeout,
+        retries = self.timeout_policy.retries_of(packet.id)
+        attempts = retries + 1
+        for attempt in range(attempts):
+            started = time.monotonic()
+            self.send(packet)
+            try:
+                # the same sequence is used for retries,
+                # therefore late response of previous attempt is accepted too
+                response = self.packet_collector.get_response(
+                    packet,
+                    raise_api_error,
+                    timeout=self.timeout_policy.timeout(packet.id),
+                )
+            except PySpheroTimeoutError:
+                self.timeout_policy.on_timeout(packet.id)
+                if attempt + 1 == attempts:
+                    raise
+
+                logger.debug(f"Retry {packet} ({attempt + 1}/{retries})")
+                continue
+
+            if attempt == 0 and response is not None:
+                self.timeout_policy.on_response(packet.id, time.monotonic() - started)
+            return response
+
+    def remember(self, packet: Packet):
+        """
+        Save request which changes durable state of toy (leds, stabilization, streaming, etc.)
+        The last request of each command is repeated after reconnect
+
+        :param packet: request packet
+        """
+        self._durable_packets.pop(packet.id, None)
+        self._durable_packets[packet.id] = packet
+
+    def forget(self, packet_id: Tuple):
+        self._durable_packets.pop(packet_id, None)
+
+    def handle_disconnect(self):
+        """
+        Called by backend when connection is lost.
+        Requests in flight are aborted and reconnect is started in background
+        """
+        with self._reconnect_lock:
+            # adapter is closed or reconnect is already started
+            if not self._running.is_set() or not self._connected.is_set():
+                return
+            self._connected.clear()
+
+        logger.warning(f"Connection to {self.mac_address} lost")
+        self.packet_collector.abort_responses()
+        self._start_reconnect()
+
+    def _start_reconnect(self):
+        with self._reconnect_lock:
+            if not self._running.is_set() or self._connected.is_set() or self._reconnecting:
+                return
+            self._reconnecting = True
+
+        Thread(target=self._reconnect, name=f"reconnect-{self.mac_address}", daemon=True).start()
+
+    def _reconnect(self):
+        try:
+            self._reconnect_attempts()
+        finally:
+            with self._reconnect_lock:
+                self._reconnecting = False
+
+    def _reconnect_attempts(self):
+        delay = self.reconnect_delay
+        for attempt in range(1, self.reconnect_attempts + 1):
+            if not self._running.is_set():
+                return
+
+            with contextlib.suppress(Exception):
+                self._disconnect()
+
+            try:
+                self._connect()
+            except Exception as e:
+                logger.warning(f"Reconnect to {self.mac_address} failed ({attempt}/{self.reconnect_attempts}): {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+                continue
+
+            logger.info(f"Reconnected to {self.mac_address}")
+            self.packet_collector.reset()
+            self._connected.set()
+            self._restore_session()
+            return
+
+        # the next request starts reconnect again
+        logger.error(f"Unable to reconnect to {self.mac_address}")
+
+    def _restore_session(self):
+        for packet in list(self._durable_packets.values()):
+            replay = self.sequences.packet(
+                device_id=packet.device_id,
+                command_id=packet.command_id,
+                flags=packet.flags,
+                target_id=packet.target_id,
+                source_id=packet.source_id,
+                data=list(packet.data),
+            )
+            try:
+                self.write(replay)
+            except PySpheroException as e:
+                logger.warning(f"Unable to restore state by {replay}: {e}")
+
+        for callback in self.reconnect_callbacks:
+            callback()
+
+    def start_notify(self, packet: Packet, callback: Callable, timeout: Optional[float] = 10) -> Future:
+        """
+        Call callback for every notification with id of packet.
+        Every (device_id, command_id) has one subscription, previous one is stopped
+
+        :param packet: packet with id of notification
+        :param callback: called with notification packet in worker thread, may return STOP_NOTIFY
+        :param timeout: timeout waiting for a notification, then worker stops with PySpheroTimeoutError.
+            None is infinite
+        :return Future: future of worker
+        :raise PySpheroRuntimeError: worker thread can't be started
+        """
+        if packet.id in self._notify_futures:
+            self.stop_notify(packet.id)
+        # queued notifications belong to previous subscription or nobody (e.g. frames of previous stream)
+        self.packet_collector.discard_notifications(packet.id)
+
+        stop = Event()
+        future = Future()
+        # subscriptions are long-lived (often without timeout), a shared pool would be exhausted by them
+        worker = Thread(
+            target=self._run_notify_worker,
+            args=(future, callback, packet, timeout, stop),
+            name=f"notify-{self.mac_address}-{packet.device_id:#04x}-{packet.command_id:#04x}",
+            daemon=True,
         )
-        return self._notify_future
+        try:
+            worker.start()
+        except RuntimeError as e:
+            raise PySpheroRuntimeError(f"Unable to start notification worker of {packet}: {e}") from e
+
+        self._notify_stops[packet.id] = stop
+        self._notify_futures[packet.id] = future
+        future.add_done_callback(lambda _: self._forget_notify(packet.id, future))
+        return future
+
+    def _run_notify_worker(self, future: Future, callback: Callable, packet: Packet, timeout, stop: Event):
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            self.notify_worker(callback, packet, timeout, stop)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+    def _forget_notify(self, packet_id: Tuple, future: Future):
+        if self._notify_futures.get(packet_id) is future:
+            self._notify_futures.pop(packet_id, None)
+            self._notify_stops.pop(packet_id, None)
 
-    def stop_notify(self):
-        if self._notify_future is None:
+    def stop_notify(self, packet_id: Tuple = None):
+        """
+        Stop subscription
+
+        :param packet_id: (device_id, command_id) of notification, all subscriptions by default
+        """
+        packet_ids = list(self._notify_futures) if packet_id is None else [packet_id]
+        if packet_id is not None and packet_id not in self._notify_futures:
             raise PySpheroRuntimeError("Future not found")
 
-        logger.debug(f"[NOTIFY_WORKER] Cancel")
-        self._notify_future.cancel()
-        self._notify_future = None
+        for packet_id in packet_ids:
+            logger.debug(f"[NOTIFY_WORKER] Cancel {packet_id}")
+            stop = self._notify_stops.pop(packet_id, None)
+            future = self._notify_futures.pop(packet_id, None)
+            if stop is not None:
+                stop.set()
+            if future is not None:
+                future.cancel()
 
-    def notify_worker(self, callback: Callable, packet: Packet, timeout: float):
+        self.packet_collector.wake_up()
+
+    def notify_worker(self, callback: Callable, packet: Packet, timeout: Optional[float], stop: Event = None):
         logger.debug(f"[NOTIFY_WORKER] Start {packet}")
+        stop = stop or Event()
+
+        while self._running.is_set() and not stop.is_set():
+            try:
+                response = self.packet_collector.get_notification(packet.id, timeout=timeout, stop=stop)
+            except PySpheroTimeoutError:
+                # keep subscription while link is restored
+                if self._connected.is_set() or not self._connected.wait(self.reconnect_timeout):
+                    raise
+                continue
+
+            if response is None:
+                break
 
-        while self._running.is_set():
-            response = self.packet_collector.get_response(packet, raise_api_error=False, timeout=timeout)
             logger.debug(f"[NOTIFY_WORKER] Received {response}")
             if callback(response) is STOP_NOTIFY:
                 logger.debug(f"[NOTIFY_WORKER] Received STOP_NOTIFY")
-                self._notify_future = None
                 break
+
+        logger.debug(f"[NOTIFY_WORKER] Stop {packet}")
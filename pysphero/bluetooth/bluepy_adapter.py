@@ -1,13 +1,19 @@
 import contextlib
 import logging
-from typing import List, Optional
+import os
+import queue
+import select
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
 
-from bluepy.btle import DefaultDelegate, Peripheral, ADDR_TYPE_RANDOM, Characteristic, Descriptor
+from bluepy.btle import DefaultDelegate, Peripheral, ADDR_TYPE_RANDOM, Characteristic, Descriptor, \
+    BTLEDisconnectError, BTLEException, BluepyHelper
 
 from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
-from pysphero.bluetooth.packet_collector import PacketCollector
+from pysphero.bluetooth.receive_ring import ReceiveRing
 from pysphero.constants import SpheroCharacteristic, GenericCharacteristic
-from pysphero.packet import Packet
+from pysphero.exceptions import PySpheroConnectionLostError, PySpheroTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -15,34 +21,97 @@ logger = logging.getLogger(__name__)
 class BluepyDelegate(DefaultDelegate):
     """
     Delegate class for bluepy
-    Getting bytes from peripheral and build packets
+    Getting bytes from peripheral, packets are built by parser thread of adapter
     """
 
-    def __init__(self, packet_collector: PacketCollector):
+    def __init__(self, receive_ring: ReceiveRing):
         super().__init__()
-        self.packet_collector = packet_collector
+        self.receive_ring = receive_ring
 
     def handleNotification(self, handle: int, data: List[int]):
         """
-        handleNotification getting raw data from peripheral and save it.
-        This function may be called several times. Therefore, the state is stored inside the class.
+        handleNotification getting raw data from peripheral and only pushes it to receive ring.
 
         :param handle:
         :param data: raw data
         :return:
         """
-        self.packet_collector.append_raw_data(data)
+        self.receive_ring.push(data)
+
+
+class HelperOutput:
+    """
+    Line reader of bluepy helper output.
+    Buffered reader of helper may keep several lines read at once, select doesn't see them,
+    so the lines are buffered here where I/O thread can drain them before waiting
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._fd = stream.fileno()
+        self._buffer = bytearray()
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def has_line(self) -> bool:
+        return b"\n" in self._buffer
+
+    def fill(self):
+        """
+        Read available output, helper fd must be readable
+        """
+        data = os.read(self._fd, 4096)
+        if not data:
+            raise BTLEDisconnectError("Helper exited")
+        self._buffer += data
+
+    def readline(self) -> str:
+        while not self.has_line():
+            self.fill()
+
+        end = self._buffer.index(b"\n") + 1
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return line.decode()
+
+    def close(self):
+        self.stream.close()
 
 
 class BluepyAdapter(AbstractBleAdapter):
+    """
+    Peripheral is used only by I/O thread: writes of other threads are queued,
+    I/O thread waits for output of bluepy helper or for queued writes at the same time,
+    so notifications and writes are handled without polling delay
+    """
     STOP_NOTIFY = object()
+    connection_errors = (BTLEDisconnectError,)
+    peripheral_cls = Peripheral
+
+    # max time of waiting when there are no events
+    idle_timeout = 0.05
+    write_timeout = 10.0
 
     def __init__(self, mac_address):
         logger.debug("Init Bluepy Adapter")
         super().__init__(mac_address)
-        self.delegate = BluepyDelegate(self.packet_collector)
-        self.peripheral = Peripheral(self.mac_address, ADDR_TYPE_RANDOM)
+        self.delegate = BluepyDelegate(self.receive_ring)
+        self._writes: "queue.Queue[Tuple[bytes, Future]]" = queue.Queue()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self._io_thread: Optional[threading.Thread] = None
+        self._connect()
+
+        self._executor.submit(self._receiver)
+        logger.debug("Bluepy Adapter: successful initialization")
+
+    def _connect(self):
+        self.peripheral = self.peripheral_cls(self.mac_address, ADDR_TYPE_RANDOM)
         self.peripheral.setDelegate(self.delegate)
+        # all output of helper is read by lines through it, also responses read by bluepy
+        self.helper_output = HelperOutput(self.peripheral._helper.stdout)
+        self.peripheral._helper.stdout = self.helper_output
 
         self.ch_api_v2 = self._get_characteristic(uuid=SpheroCharacteristic.api_v2.value)
         # Initial api descriptor
@@ -50,27 +119,123 @@ class BluepyAdapter(AbstractBleAdapter):
         desc = self._get_descriptor(self.ch_api_v2, GenericCharacteristic.client_characteristic_configuration.value)
         desc.write(b"\x01\x00", withResponse=True)
 
-        self._executor.submit(self._receiver)
-        logger.debug("Bluepy Adapter: successful initialization")
+        try:
+            response = self.peripheral.setMTU(self.preferred_mtu)
+        except BTLEException as e:
+            logger.debug(f"MTU exchange failed, default is used: {e}")
+        else:
+            # status of bluepy helper, values are lists
+            self._set_att_mtu((response or {}).get("mtu", [None])[0])
 
-    def close(self):
-        super().close()
+    def _disconnect(self):
         # ignoring any exception
         # because it does not matter
         with contextlib.suppress(Exception):
             self.peripheral.disconnect()
 
-    def write(self, packet: Packet, *, timeout: float = 10, raise_api_error: bool = True) -> Optional[Packet]:
-        logger.debug(f"Send {packet}")
-        self.ch_api_v2.write(packet.build(), withResponse=True)
-        return self.packet_collector.get_response(packet, raise_api_error, timeout=timeout)
+    def close(self):
+        super().close()
+        self._wake_up()
+        if self._io_thread is not None and self._io_thread is not threading.current_thread():
+            self._io_thread.join(self.write_timeout)
+        self._disconnect()
+        self._fail_writes()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    def _wake_up(self):
+        with contextlib.suppress(OSError):
+            os.write(self._wake_write, b"\x00")
+
+    def _write_raw(self, data: bytes):
+        if threading.current_thread() is self._io_thread:
+            self.ch_api_v2.write(data, withResponse=True)
+            return
+
+        if not self._running.is_set():
+            raise PySpheroConnectionLostError(f"Adapter of {self.mac_address} is closed")
+
+        future = Future()
+        self._writes.put((data, future))
+        self._wake_up()
+        try:
+            future.result(self.write_timeout)
+        except FutureTimeoutError:
+            # queued write is skipped by I/O thread, a write in progress can't be stopped
+            future.cancel()
+            raise PySpheroTimeoutError(f"Timeout error for writing {len(data)} bytes")
+
+    def _fail_writes(self):
+        while True:
+            try:
+                _, future = self._writes.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(PySpheroConnectionLostError(f"Not connected to {self.mac_address}"))
+
+    def _flush_writes(self):
+        while True:
+            try:
+                data, future = self._writes.get_nowait()
+            except queue.Empty:
+                return
+
+            # writer has given up waiting
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                # notifications received while waiting for write response are handled by delegate
+                self.ch_api_v2.write(data, withResponse=True)
+            except BaseException as e:
+                future.set_exception(e)
+                if isinstance(e, BTLEException):
+                    raise
+            else:
+                future.set_result(None)
+
+    def _handle_line(self, line: str):
+        """
+        Handle output line of helper received without request, like bluepy's waitForNotifications
+        """
+        if line.startswith("#") or line == "\n":
+            return
+
+        response = BluepyHelper.parseResp(line)
+        kind = response["rsp"][0]
+        if kind in ("ntfy", "ind"):
+            self.delegate.handleNotification(response["hnd"][0], response["d"][0])
+        elif kind == "stat" and response.get("state") == ["disc"]:
+            raise BTLEDisconnectError("Device disconnected", response)
 
     def _receiver(self):
         logger.debug("Start receiver")
+        self._io_thread = threading.current_thread()
 
-        sleep = 0.05
         while self._running.is_set():
-            self.peripheral.waitForNotifications(sleep)
+            if not self._connected.is_set():
+                self._fail_writes()
+                self._connected.wait(self.idle_timeout)
+                continue
+
+            try:
+                self._flush_writes()
+                output = self.helper_output
+                # lines read together with a write response are already buffered, select doesn't see them
+                if not output.has_line():
+                    readable, _, _ = select.select([output.fileno(), self._wake_read], [], [], self.idle_timeout)
+                    if self._wake_read in readable:
+                        with contextlib.suppress(BlockingIOError):
+                            os.read(self._wake_read, 4096)
+                    if output.fileno() in readable:
+                        output.fill()
+
+                while output.has_line():
+                    self._handle_line(output.readline())
+            except (BTLEException, OSError, ValueError):
+                # no-op when reconnect is already started by writer
+                self.handle_disconnect()
 
         logger.debug("Stop receiver")
 
@@ -1,28 +1,35 @@
 import logging
-from typing import Optional
+from typing import Callable
 
 import gatt
 
 from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
-from pysphero.bluetooth.packet_collector import PacketCollector
+from pysphero.bluetooth.receive_ring import ReceiveRing
 from pysphero.constants import SpheroCharacteristic
 from pysphero.exceptions import PySpheroRuntimeError
-from pysphero.packet import Packet
 
 logger = logging.getLogger(__name__)
 
 
 class Device(gatt.Device):
 
-    def __init__(self, packet_collector: PacketCollector, *args, **kwargs):
+    def __init__(self, receive_ring: ReceiveRing, on_disconnect: Callable, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.packet_collector = packet_collector
+        self.receive_ring = receive_ring
+        self.on_disconnect = on_disconnect
 
     def characteristic_value_updated(self, characteristic, value):
         """
-        Callback from gatt when value was updated, call the create packet function for received data.
+        Callback from gatt when value was updated, received data is only pushed to receive ring.
         """
-        self.packet_collector.append_raw_data(value)
+        self.receive_ring.push(bytes(value))
+
+    def disconnect_succeeded(self):
+        """
+        Callback from gatt when the toy was disconnected
+        """
+        super().disconnect_succeeded()
+        self.on_disconnect()
 
 
 class GattAdapter(AbstractBleAdapter):
@@ -31,9 +38,12 @@ class GattAdapter(AbstractBleAdapter):
         super().__init__(mac_address)
 
         self.manager = gatt.DeviceManager("hci0")
+        self._connect()
+        self._executor.submit(self.manager.run)
 
+    def _connect(self):
         self._device = Device(
-            self.packet_collector, mac_address=self.mac_address, manager=self.manager)
+            self.receive_ring, self.handle_disconnect, mac_address=self.mac_address, manager=self.manager)
         self._device.connect()
 
         ch_force_band = self._find_characteristic(SpheroCharacteristic.force_band.value)
@@ -42,7 +52,9 @@ class GattAdapter(AbstractBleAdapter):
         self.ch_api_v2 = self._find_characteristic(SpheroCharacteristic.api_v2.value)
 
         self.ch_api_v2.enable_notifications()
-        self._executor.submit(self.manager.run)
+
+    def _disconnect(self):
+        self._device.disconnect()
 
     def _find_characteristic(self, characteristic: str):
         found_characteristic = None
@@ -58,19 +70,9 @@ class GattAdapter(AbstractBleAdapter):
         return found_characteristic
 
     def close(self):
-        self.manager.stop()
-        self._device.disconnect()
         super().close()
+        self.manager.stop()
+        self._disconnect()
 
-    def write(self, packet: Packet, *, timeout: float = 10, raise_api_error: bool = True) -> Optional[Packet]:
-        """
-         Method allow send request packet and get response packet
-
-         :param packet: request packet
-         :param timeout: timeout waiting for a response from sphero
-         :param raise_api_error: raise exception when receive api error
-         :return Packet: response packet
-        """
-        logger.debug(f"Send {packet}")
-        self.ch_api_v2.write_value(packet.build())
-        return self.packet_collector.get_response(packet, raise_api_error, timeout)
+    def _write_raw(self, data: bytes):
+        self.ch_api_v2.write_value(data)
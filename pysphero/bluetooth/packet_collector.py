@@ -1,30 +1,76 @@
 import logging
-import time
-from typing import List, Optional
+import threading
+import warnings
+from collections import defaultdict, deque
+from threading import Event
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
+from pysphero.capture import CaptureWriter
 from pysphero.constants import Api2Error
-from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError, PySpheroApiError
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError, PySpheroApiError, \
+    PySpheroConnectionLostError
 from pysphero.packet import Packet, Flag
 
 logger = logging.getLogger(__name__)
 
 
 class PacketCollector:
-    def __init__(self, check_response_delta: float = 0.1):
+    """
+    Build packets from raw bytes and hand them to waiting threads.
+    Responses are matched with requests by (device_id, command_id, sequence),
+    asynchronous notifications only by (device_id, command_id)
+    """
+
+    # responses that nobody waits for anymore (e.g. after timeout) are dropped after this limit
+    max_pending_responses = 256
+    # notifications are queued per (device_id, command_id) while subscriber is busy,
+    # the oldest one is dropped and counted in dropped_notifications after this limit
+    max_pending_notifications = 64
+
+    def __init__(self, check_response_delta: float = None):
+        """
+        :param check_response_delta: deprecated and ignored, waiters are woken by received packets
+        """
+        if check_response_delta is not None:
+            warnings.warn(
+                "check_response_delta is deprecated and ignored, responses are no longer polled",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
         self._data = []
-        self._packets = {}
-        self._check_response_delta = check_response_delta or 0.01  # protect of 0 sleep_time
+        self._packets: Dict[Tuple, Deque[Packet]] = {}
+        self.dropped_notifications: Dict[Tuple, int] = defaultdict(int)
+        self._responses = {}
+        self._condition = threading.Condition()
+        self._generation = 0  # changed when waiting responses are aborted
+        self.capture: Optional[CaptureWriter] = None  # record every received frame
+        # called with every received packet in parser thread before it is stored, e.g. by bridge.
+        # Listener returns True when response is of its own request, such response isn't stored
+        self.listeners: List[Callable[[Packet], None]] = []
 
     def append_raw_data(self, data: List[int]):
+        """
+        Add received bytes. Broken packet is dropped, following packets of data are still built,
+        then error of the first broken packet is raised
+        """
+        error = None
         for b in data:
             logger.debug(f"Received {b:#04x}")
             self._data.append(b)
 
             # packet always ending with end byte
             if b == Packet.end:
-                if len(self._data) < 6:
-                    raise PySpheroRuntimeError(f"Very small packet {[hex(x) for x in self.data]}")
-                self._build_packet()
+                try:
+                    if len(self._data) < 6:
+                        raise PySpheroRuntimeError(f"Very small packet {[hex(x) for x in self._data]}")
+                    self._build_packet()
+                except PySpheroRuntimeError as e:
+                    self._data = []
+                    error = error or e
+
+        if error is not None:
+            raise error
 
     def _build_packet(self):
         """
@@ -32,24 +78,136 @@ class PacketCollector:
         """
         logger.debug(f"Starting of packet build")
 
+        if self.capture is not None:
+            self.capture.write_raw(self._data)
+
         packet = Packet.from_response(self._data)
-        self._packets[packet.id] = packet
         self._data = []
 
+        # response claimed by listener belongs to its request, nobody else waits for it
+        claimed = False
+        for listener in self.listeners:
+            claimed = listener(packet) is True or claimed
+        if claimed and packet.flags & Flag.response.value:
+            return
+
+        with self._condition:
+            if packet.flags & Flag.response.value:
+                self._responses[(*packet.id, packet.sequence)] = packet
+                while len(self._responses) > self.max_pending_responses:
+                    self._responses.pop(next(iter(self._responses)))
+            else:
+                queue = self._packets.get(packet.id)
+                if queue is None:
+                    queue = self._packets[packet.id] = deque()
+                elif len(queue) >= self.max_pending_notifications:
+                    queue.popleft()
+                    self.dropped_notifications[packet.id] += 1
+                queue.append(packet)
+
+            self._condition.notify_all()
+
     def get_response(self, packet: Packet, raise_api_error: bool = True, timeout: float = 10) -> Optional[Packet]:
+        """
+        Wait response for request packet
+
+        :param packet: request packet
+        :param raise_api_error: raise exception when receive api error
+        :param timeout: timeout waiting for a response
+        :return Packet: response packet or None if request doesn't need response
+        """
         if (packet.flags & (Flag.requests_response.value | Flag.requests_only_error_response.value)) == 0:
             return
 
-        while True:
-            response = self._packets.pop(packet.id, None)
-            if response:
-                if raise_api_error and response.api_error is not Api2Error.success:
-                    raise PySpheroApiError(response.api_error)
+        key = (*packet.id, packet.sequence)
+        with self._condition:
+            generation = self._generation
 
-                return response
+            def ready():
+                return key in self._responses or generation != self._generation
 
-            timeout -= self._check_response_delta
-            if timeout <= 0:
+            if not self._condition.wait_for(ready, timeout):
                 raise PySpheroTimeoutError(f"Timeout error for response of {packet}")
 
-            time.sleep(self._check_response_delta)
+            if generation != self._generation:
+                raise PySpheroConnectionLostError(f"Connection lost while waiting response of {packet}")
+
+            response = self._responses.pop(key)
+
+        if raise_api_error and response.api_error is not Api2Error.success:
+            raise PySpheroApiError(response.api_error)
+
+        return response
+
+    def get_any_response(self, packets: List[Packet], timeout: float) -> Optional[Tuple[Packet, Packet]]:
+        """
+        Wait response for any of request packets, api error isn't raised
+
+        :param packets: request packets which need response
+        :param timeout: timeout waiting for a response
+        :return: request and its response or None if timeout is out
+        """
+        keys = {(*packet.id, packet.sequence): packet for packet in packets}
+        with self._condition:
+            generation = self._generation
+
+            def ready():
+                return any(key in self._responses for key in keys) or generation != self._generation
+
+            if not self._condition.wait_for(ready, timeout):
+                return None
+
+            if generation != self._generation:
+                raise PySpheroConnectionLostError("Connection lost while waiting responses")
+
+            key = next(key for key in keys if key in self._responses)
+            return keys[key], self._responses.pop(key)
+
+    def abort_responses(self):
+        """
+        Wake up all threads waiting responses with PySpheroConnectionLostError
+        Notification waiters are kept
+        """
+        with self._condition:
+            self._generation += 1
+            self._responses.clear()
+            self._condition.notify_all()
+
+    def reset(self):
+        """
+        Drop bytes of incomplete packet, e.g. after reconnect
+        """
+        self._data = []
+
+    def get_notification(self, packet_id: Tuple, timeout: Optional[float] = 10, stop: Event = None) -> Optional[Packet]:
+        """
+        Wait asynchronous packet from toy, notifications of one id are returned in order of receiving
+
+        :param packet_id: (device_id, command_id) of notification
+        :param timeout: timeout waiting for a notification, None is infinite
+        :param stop: stop waiting when event is set (see wake_up)
+        :return Packet: notification packet or None if waiting was stopped
+        """
+        def ready():
+            return self._packets.get(packet_id) or (stop is not None and stop.is_set())
+
+        with self._condition:
+            if not self._condition.wait_for(ready, timeout):
+                raise PySpheroTimeoutError(f"Timeout error for notification {packet_id}")
+
+            queue = self._packets.get(packet_id)
+            return queue.popleft() if queue else None
+
+    def discard_notifications(self, packet_id: Tuple):
+        """
+        Drop queued notifications nobody was subscribed to, e.g. before a new subscription
+        """
+        with self._condition:
+            self._packets.pop(packet_id, None)
+
+    def wake_up(self):
+        """
+        Wake up waiting threads to check their stop events
+        """
+        with self._condition:
+            self._condition.notify_all()
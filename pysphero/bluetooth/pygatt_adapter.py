@@ -1,46 +1,47 @@
 import logging
-from typing import Optional
-
 import pygatt
 
 from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
-from pysphero.bluetooth.packet_collector import PacketCollector
+from pysphero.bluetooth.receive_ring import ReceiveRing
 from pysphero.constants import SpheroCharacteristic
 from pysphero.exceptions import PySpheroRuntimeError
-from pysphero.packet import Packet
 
 logger = logging.getLogger(__name__)
 
 class PygattDelegate():
     """
     Delegate class for Pygatt
-    Getting bytes from peripheral and build packets
+    Getting bytes from peripheral, packets are built by parser thread of adapter
     """
 
-    def __init__(self, packet_collector: PacketCollector):
+    def __init__(self, receive_ring: ReceiveRing):
         super().__init__()
-        self.packet_collector = packet_collector
+        self.receive_ring = receive_ring
 
     def handleNotification(self, handle, data):
         """
-        handleNotification getting raw data from peripheral and save it.
-        This function may be called several times. Therefore, the state is stored inside the class.
+        handleNotification getting raw data from peripheral and only pushes it to receive ring.
 
         :param handle:
         :param data: raw data
         :return:
         """
-        self.packet_collector.append_raw_data(data)
+        self.receive_ring.push(data)
 
 class PygattAdapter(AbstractBleAdapter):
+    connection_errors = (pygatt.exceptions.NotConnectedError,)
+
     def __init__(self, mac_address):
         logger.debug("Init pygatt Adapter")
         super().__init__(mac_address)
 
         self.adapter = pygatt.BGAPIBackend()
         self.adapter.start()
-        self.delegate = PygattDelegate(self.packet_collector)
+        self.delegate = PygattDelegate(self.receive_ring)
+        self._connect()
+        logger.debug("Pygatt Adapter: successful initialization")
 
+    def _connect(self):
         self._device = self.adapter.connect(self.mac_address, address_type=pygatt.BLEAddressType.random)
 
         ch_force_band = self._find_characteristic(SpheroCharacteristic.force_band.value)
@@ -49,7 +50,14 @@ class PygattAdapter(AbstractBleAdapter):
         self.ch_api_v2 = self._find_characteristic(SpheroCharacteristic.api_v2.value)
 
         self._device.subscribe(self.ch_api_v2, callback = self.delegate.handleNotification)
-        logger.debug("Pygatt Adapter: successful initialization")
+
+        try:
+            self._set_att_mtu(self._device.exchange_mtu(self.preferred_mtu))
+        except pygatt.exceptions.BLEError as e:
+            logger.debug(f"MTU exchange failed, default is used: {e}")
+
+    def _disconnect(self):
+        self._device.disconnect()
 
     def _find_characteristic(self, characteristic: str):
         found_characteristic = None
@@ -64,19 +72,9 @@ class PygattAdapter(AbstractBleAdapter):
 
 
     def close(self):
-        self._device.disconnect()
-        self.adapter.stop()
         super().close()
+        self._disconnect()
+        self.adapter.stop()
 
-    def write(self, packet: Packet, *, timeout: float = 10, raise_api_error: bool = True) -> Optional[Packet]:
-        """
-         Method allow send request packet and get response packet
-
-         :param packet: request packet
-         :param timeout: timeout waiting for a response from sphero
-         :param raise_api_error: raise exception when receive api error
-         :return Packet: response packet
-        """
-        logger.debug(f"Send {packet}")
-        self._device.char_write(self.ch_api_v2, packet.build(), wait_for_response=True)
-        return self.packet_collector.get_response(packet, raise_api_error, timeout)
+    def _write_raw(self, data: bytes):
+        self._device.char_write(self.ch_api_v2, data, wait_for_response=True)
@@ -0,0 +1,83 @@
+import threading
+from typing import Optional
+
+
+class ReceiveRing:
+    """
+    Preallocated byte ring between one producer (callback of ble backend) and one consumer (parser thread).
+    Producer only moves head, consumer only moves tail, so no lock is needed:
+    pushing is a copy into the buffer and never waits for the consumer.
+    When the ring is full the chunk is dropped and counted
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.capacity = capacity
+        self.high_water = 0  # max occupancy in bytes
+        self.dropped = 0  # bytes of dropped chunks
+        self.dropped_chunks = 0
+
+        self._buffer = bytearray(capacity)
+        self._head = 0  # count of written bytes, changed only by producer
+        self._tail = 0  # count of read bytes, changed only by consumer
+        self._readable = threading.Event()
+
+    @property
+    def occupancy(self) -> int:
+        return self._head - self._tail
+
+    def push(self, data) -> bool:
+        """
+        Copy chunk into ring. Called by producer only
+
+        :param data: bytes-like chunk
+        :return bool: False if the chunk was dropped because the ring is full
+        """
+        size = len(data)
+        head = self._head
+        occupancy = head - self._tail
+        if size > self.capacity - occupancy:
+            self.dropped += size
+            self.dropped_chunks += 1
+            self._readable.set()
+            return False
+
+        start = head % self.capacity
+        first = min(size, self.capacity - start)
+        view = memoryview(data) if isinstance(data, (bytes, bytearray, memoryview)) else memoryview(bytes(data))
+        self._buffer[start:start + first] = view[:first]
+        if first < size:
+            self._buffer[:size - first] = view[first:]
+
+        # publish after copying, consumer reads only up to head
+        self._head = head + size
+        self.high_water = max(self.high_water, occupancy + size)
+        self._readable.set()
+        return True
+
+    def pop(self, timeout: Optional[float] = None) -> bytes:
+        """
+        Take all available bytes. Called by consumer only
+
+        :param timeout: timeout waiting for data, None is infinite
+        :return bytes: available data, empty after timeout
+        """
+        self._readable.clear()
+        if self._head == self._tail and not self._readable.wait(timeout):
+            return b""
+
+        tail = self._tail
+        size = self._head - tail
+        start = tail % self.capacity
+        first = min(size, self.capacity - start)
+        data = bytes(self._buffer[start:start + first])
+        if first < size:
+            data += bytes(self._buffer[:size - first])
+
+        self._tail = tail + size
+        return data
+
+    def wake_up(self):
+        """
+        Wake up consumer waiting in pop, e.g. on close
+        """
+        self._readable.set()
@@ -0,0 +1,143 @@
+import contextlib
+import logging
+import socket
+from threading import Lock
+from typing import Optional, Tuple, Union, Callable
+
+from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
+from pysphero.bridge import DEFAULT_ADDRESS, MessageType, create_socket, encode_message, read_message
+from pysphero.exceptions import PySpheroNotFoundError, PySpheroRuntimeError
+from pysphero.packet import Packet
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteAdapter(AbstractBleAdapter):
+    """
+    Adapter of toy connected by BridgeServer of another process or host.
+    Requests, responses and notifications are the same as with local adapter,
+    sequences are remapped by bridge, so many clients can share one toy
+
+    Sphero(mac_address, ble_adapter_cls=RemoteAdapter)
+    Sphero(mac_address, ble_adapter_cls=functools.partial(RemoteAdapter, address=("gateway", 8888), token=token))
+    """
+    connection_errors = (OSError,)
+    address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS
+
+    # frames of one message are split by bridge and packed again into writes of toy's mtu,
+    # so batch sent by send_many is still sent to toy in as few writes as possible
+    mtu = 1024
+
+    def __init__(self, mac_address, address: Union[str, Tuple[str, int]] = None, token: Optional[str] = None):
+        """
+        :param mac_address: mac address of toy served by bridge
+        :param address: path of unix socket or (host, port) of tcp socket of bridge
+        :param token: secret of bridge
+        """
+        logger.debug("Init Remote Adapter")
+        super().__init__(mac_address)
+        if address is not None:
+            self.address = address
+        self.token = token
+
+        self._socket = None
+        self._send_lock = Lock()
+        self._connect()
+
+        self._executor.submit(self._receiver)
+        logger.debug("Remote Adapter: successful initialization")
+
+    def _connect(self):
+        sock = create_socket(self.address)
+        try:
+            sock.connect(self.address)
+            hello = self.mac_address if self.token is None else f"{self.mac_address}\n{self.token}"
+            sock.sendall(encode_message(MessageType.hello, hello.encode()))
+            message_type, payload = read_message(sock)
+        except (OSError, EOFError):
+            sock.close()
+            raise
+
+        if message_type is MessageType.hello and payload == b"\x02":
+            sock.close()
+            raise PySpheroRuntimeError(f"Wrong token of bridge {self.address}")
+        if message_type is not MessageType.hello or payload != b"\x00":
+            sock.close()
+            raise PySpheroNotFoundError(f"Toy {self.mac_address} isn't served by bridge {self.address}")
+
+        with self._send_lock:
+            self._socket = sock
+
+        # state of the previous connection is lost if bridge was restarted
+        for packet_id in list(self._notify_futures):
+            self._send_message(MessageType.subscribe, bytes(packet_id))
+        for packet in list(self._durable_packets.values()):
+            self._send_message(MessageType.remember, packet.build())
+
+    def _disconnect(self):
+        with self._send_lock:
+            sock, self._socket = self._socket, None
+        if sock is not None:
+            with contextlib.suppress(OSError):
+                # wake up receiver blocked in recv
+                sock.shutdown(socket.SHUT_RDWR)
+            sock.close()
+
+    def close(self):
+        super().close()
+        self._disconnect()
+
+    def _send_message(self, message_type: MessageType, payload: bytes = b""):
+        with self._send_lock:
+            if self._socket is None:
+                raise ConnectionError(f"Not connected to bridge {self.address}")
+            self._socket.sendall(encode_message(message_type, payload))
+
+    def _write_raw(self, data: bytes):
+        self._send_message(MessageType.frame, data)
+
+    def _receiver(self):
+        logger.debug("Start receiver")
+
+        while self._running.is_set():
+            sock = self._socket
+            if not self._connected.is_set() or sock is None:
+                self._connected.wait(0.1)
+                continue
+
+            try:
+                message_type, payload = read_message(sock)
+            except (EOFError, OSError):
+                # closed by bridge or by adapter itself
+                if self._socket is sock:
+                    self.handle_disconnect()
+                continue
+
+            if message_type is MessageType.frame:
+                self.receive_ring.push(payload)
+
+        logger.debug("Stop receiver")
+
+    def remember(self, packet: Packet):
+        super().remember(packet)
+        # bridge repeats request after reconnect to toy
+        with contextlib.suppress(OSError):
+            self._send_message(MessageType.remember, packet.build())
+
+    def forget(self, packet_id: Tuple):
+        super().forget(packet_id)
+        with contextlib.suppress(OSError):
+            self._send_message(MessageType.forget, bytes(packet_id))
+
+    def start_notify(self, packet: Packet, callback: Callable, timeout: Optional[float] = 10):
+        # subscription is repeated after reconnect to bridge
+        with contextlib.suppress(OSError):
+            self._send_message(MessageType.subscribe, bytes(packet.id))
+        return super().start_notify(packet, callback, timeout)
+
+    def stop_notify(self, packet_id: Tuple = None):
+        packet_ids = list(self._notify_futures) if packet_id is None else [packet_id]
+        super().stop_notify(packet_id)
+        for packet_id in packet_ids:
+            with contextlib.suppress(OSError):
+                self._send_message(MessageType.unsubscribe, bytes(packet_id))
@@ -0,0 +1,87 @@
+import threading
+from typing import Dict, Optional
+
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.packet import Packet
+
+
+class SequenceAllocator:
+    """
+    Sequence numbers of one connection.
+    Sequence is outstanding from allocation until its request is completed (release),
+    outstanding sequences are never given out again, so responses are always matched with the right request.
+    When the window is exhausted allocation waits for a release or raises.
+    Packets created without allocator take sequences of the shared counter of Packet, which skips outstanding ones
+    """
+
+    def __init__(self, window: int = 128, block: bool = True, timeout: Optional[float] = 10.0):
+        """
+        :param window: max count of outstanding sequences (up to 256)
+        :param block: wait for a free sequence when the window is exhausted, otherwise raise at once
+        :param timeout: max time of waiting for a free sequence, None is infinite
+        """
+        if not 0 < window <= 256:
+            raise ValueError("Window must be from 1 to 256")
+
+        self.window = window
+        self.block = block
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._next = 0x00
+        # sequence -> packet, None until packet is bound
+        self._outstanding: Dict[int, Optional[Packet]] = {}
+        Packet.add_sequence_allocator(self)
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._outstanding)
+
+    def __contains__(self, sequence: int) -> bool:
+        return sequence in self._outstanding
+
+    def allocate(self) -> int:
+        """
+        Reserve the next free sequence
+
+        :raise PySpheroRuntimeError: window is exhausted
+        """
+        with self._condition:
+            def ready():
+                return len(self._outstanding) < self.window
+
+            if not ready() and not (self.block and self._condition.wait_for(ready, self.timeout)):
+                raise PySpheroRuntimeError(f"Sequence window exhausted ({self.window} requests in flight)")
+
+            sequence = self._next
+            while sequence in self._outstanding:
+                sequence = (sequence + 1) % 256
+
+            self._outstanding[sequence] = None
+            self._next = (sequence + 1) % 256
+            return sequence
+
+    def bind(self, packet: Packet):
+        """
+        Bind packet to its allocated sequence, so release by another packet with the same sequence is ignored
+        """
+        with self._condition:
+            if packet.sequence in self._outstanding:
+                self._outstanding[packet.sequence] = packet
+
+    def packet(self, **kwargs) -> Packet:
+        """
+        Create packet with allocated sequence
+        """
+        packet = Packet(sequence=self.allocate(), **kwargs)
+        self.bind(packet)
+        return packet
+
+    def release(self, packet: Packet):
+        """
+        Request of packet is completed (response received, timed out or not needed)
+        """
+        with self._condition:
+            if self._outstanding.get(packet.sequence) is packet:
+                del self._outstanding[packet.sequence]
+                self._condition.notify()
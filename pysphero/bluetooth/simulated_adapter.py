@@ -0,0 +1,134 @@
+import logging
+import queue
+import random
+import struct
+import threading
+import time
+from typing import Optional, Tuple
+
+from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
+from pysphero.bridge import split_frames
+from pysphero.packet import Packet, Flag
+
+logger = logging.getLogger(__name__)
+
+_SENSORS = 0x18
+_SET_SENSOR_STREAMING_MASK = 0x00
+_SENSOR_STREAMING_DATA = 0x02
+_SET_EXTENDED_SENSOR_STREAMING_MASK = 0x0c
+
+
+class SimulatedAdapter(AbstractBleAdapter):
+    """
+    Toy without radio: every request is answered with success after latency,
+    sensor streaming sends frames of zero values with requested interval.
+    Used for benchmarks and diagnostics of host side
+
+    Sphero("00:00:00:00:00:00", ble_adapter_cls=functools.partial(SimulatedAdapter, latency=0.02))
+    """
+
+    def __init__(self, mac_address, latency: float = 0.0, loss: float = 0.0):
+        """
+        :param latency: delay of responses in seconds
+        :param loss: probability of lost request
+        """
+        logger.debug("Init Simulated Adapter")
+        super().__init__(mac_address)
+        self.latency = latency
+        self.loss = loss
+        self.received = 0  # requests received by toy
+
+        self._extended_mask = 0x0
+        self._streaming: Optional[threading.Event] = None
+        # receive ring has one producer: all frames are delivered by one thread in order
+        self._deliveries: "queue.Queue[Tuple[float, bytes]]" = queue.Queue()
+        self._connect()
+
+        self._executor.submit(self._deliver)
+
+    def _connect(self):
+        pass
+
+    def _disconnect(self):
+        if self._streaming is not None:
+            self._streaming.set()
+
+    def close(self):
+        super().close()
+        self._disconnect()
+
+    def _write_raw(self, data: bytes):
+        # frames are concatenated by send_many
+        for frame in split_frames(data):
+            self._handle(Packet.from_response(list(frame)))
+
+    def _handle(self, request: Packet):
+        if self.loss and random.random() < self.loss:
+            return
+
+        self.received += 1
+        if (request.device_id, request.command_id) == (_SENSORS, _SET_EXTENDED_SENSOR_STREAMING_MASK):
+            self._extended_mask = int.from_bytes(bytes(request.data[:4]), "big")
+        elif (request.device_id, request.command_id) == (_SENSORS, _SET_SENSOR_STREAMING_MASK):
+            interval = int.from_bytes(bytes(request.data[:2]), "big")
+            self._start_streaming(interval, request.data[2], int.from_bytes(bytes(request.data[3:7]), "big"))
+
+        if not request.flags & Flag.requests_response.value:
+            return
+
+        response = Packet(
+            request.device_id,
+            request.command_id,
+            flags=Flag.response.value,
+            sequence=request.sequence,
+            data=[0x00],
+        )
+        self._receive(response.build())
+
+    def _receive(self, frame: bytes):
+        self._deliveries.put((time.monotonic() + self.latency, frame))
+
+    def _deliver(self):
+        while self._running.is_set():
+            try:
+                deadline, frame = self._deliveries.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.receive_ring.push(frame)
+
+    def _start_streaming(self, interval: int, count: int, mask: int):
+        if self._streaming is not None:
+            self._streaming.set()
+            self._streaming = None
+        if not mask:
+            return
+
+        values = bin(mask).count("1") + bin(self._extended_mask).count("1")
+        stop = self._streaming = threading.Event()
+        threading.Thread(
+            target=self._stream,
+            args=(interval / 1000, count, values, stop),
+            name=f"simulated-stream-{self.mac_address}",
+            daemon=True,
+        ).start()
+
+    def _stream(self, interval: float, count: int, values: int, stop: threading.Event):
+        frame = Packet(
+            _SENSORS,
+            _SENSOR_STREAMING_DATA,
+            flags=0x00,
+            sequence=0x00,
+            data=list(struct.pack(f">{values}f", *[0.0] * values)),
+        ).build()
+
+        sent = 0
+        deadline = time.monotonic()
+        while not stop.is_set() and self._running.is_set() and (count == 0 or sent < count):
+            self._receive(frame)
+            sent += 1
+            deadline += interval
+            stop.wait(max(deadline - time.monotonic(), 0))
@@ -0,0 +1,113 @@
+import threading
+from typing import Dict, FrozenSet, Hashable, Iterable, Tuple
+
+# (device_id, command_id) of requests without side effects, they are safe to send again
+# when a response is lost. Commands like drive, animations or flashing are never retried
+READ_ONLY_COMMANDS: FrozenSet[Tuple[int, int]] = frozenset({
+    (0x10, 0x00),  # api_processor.echo
+    *((0x11, command_id) for command_id in (
+        0x00, 0x01, 0x02, 0x03, 0x06, 0x07, 0x0b, 0x0c, 0x0e, 0x12, 0x13, 0x15, 0x17, 0x19, 0x23, 0x28, 0x29, 0x38,
+    )),  # system_info.get_*
+    *((0x13, command_id) for command_id in (0x02, 0x03, 0x04, 0x10, 0x13, 0x17)),  # power.get_*
+    *((0x18, command_id) for command_id in (0x01, 0x0d, 0x30)),  # sensor.get_*
+})
+
+
+class _RttState:
+    __slots__ = ("srtt", "rttvar", "rto")
+
+    def __init__(self, rto: float):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = rto
+
+
+class AdaptiveTimeout:
+    """
+    Response timeout estimated from observed round-trip times (RFC 6298).
+    Every command class (device_id, command_id) has own smoothed RTT and variance:
+
+        rto = srtt + k * rttvar
+
+    The timeout is doubled after each lost response and restored by the next measurement.
+    RTT of retransmitted requests is not measured (Karn's algorithm).
+    Only commands of retryable set are retried, a retry of other commands could run them twice
+    """
+
+    def __init__(
+            self,
+            initial_timeout: float = 3.0,
+            min_timeout: float = 0.2,
+            max_timeout: float = 10.0,
+            retries: int = 2,
+            alpha: float = 1 / 8,
+            beta: float = 1 / 4,
+            k: float = 4,
+            retryable: Iterable[Hashable] = READ_ONLY_COMMANDS,
+    ):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.retryable = set(retryable)
+
+        self._lock = threading.Lock()
+        self._states: Dict[Hashable, _RttState] = {}
+
+    def _state(self, key: Hashable) -> _RttState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _RttState(self.initial_timeout)
+        return state
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min_timeout), self.max_timeout)
+
+    def retries_of(self, key: Hashable) -> int:
+        """
+        Count of retries for command class, 0 if command is not in retryable set
+        """
+        return self.retries if key in self.retryable else 0
+
+    def timeout(self, key: Hashable) -> float:
+        """
+        Current timeout for command class
+        """
+        with self._lock:
+            return self._state(key).rto
+
+    def srtt(self, key: Hashable) -> float:
+        """
+        Smoothed RTT for command class or None if it was never measured
+        """
+        with self._lock:
+            return self._state(key).srtt
+
+    def on_response(self, key: Hashable, rtt: float):
+        """
+        Update estimation by measured round-trip time
+
+        :param key: command class
+        :param rtt: time from request to response in seconds
+        """
+        with self._lock:
+            state = self._state(key)
+            if state.srtt is None:
+                state.srtt = rtt
+                state.rttvar = rtt / 2
+            else:
+                state.rttvar = (1 - self.beta) * state.rttvar + self.beta * abs(state.srtt - rtt)
+                state.srtt = (1 - self.alpha) * state.srtt + self.alpha * rtt
+
+            state.rto = self._clamp(state.srtt + self.k * state.rttvar)
+
+    def on_timeout(self, key: Hashable):
+        """
+        Back off timeout of command class after lost response
+        """
+        with self._lock:
+            state = self._state(key)
+            state.rto = self._clamp(state.rto * 2)
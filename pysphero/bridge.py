@@ -0,0 +1,474 @@
+"""
+Bridge shares BLE connections of toys among many local clients (see RemoteAdapter).
+
+Message structure:
+---------------------------------
+- type         [1 byte]  MessageType
+- size         [2 byte]  big-endian size of payload
+- payload      [n byte]
+---------------------------------
+
+Client starts with hello (mac address of toy in ascii, then newline and token if bridge has token),
+bridge answers hello with one byte: 0x00 ok, 0x01 unknown toy, 0x02 wrong token.
+Tcp bridge is bound to localhost unless host is given, and requires token:
+clients without token are disconnected before any request, subscription or remembered packet.
+Frames are built packets: requests of client are sent to toy with sequences of bridge,
+frames of one message are packed into writes of toy's mtu,
+responses are sent back to the client with sequence of its request.
+Notifications are sent to every client subscribed to (device_id, command_id)
+"""
+
+import contextlib
+import hmac
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from enum import Enum
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from pysphero.exceptions import PySpheroException, PySpheroRuntimeError
+from pysphero.packet import Packet, Flag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "/tmp/pysphero.sock"
+DEFAULT_HOST = "localhost"
+
+_header = struct.Struct(">BH")
+MAX_PAYLOAD = 0xffff
+
+
+class MessageType(Enum):
+    hello = 0x00
+    frame = 0x01
+    subscribe = 0x02  # payload: device_id, command_id
+    unsubscribe = 0x03  # payload: device_id, command_id
+    remember = 0x04  # payload: frame of durable request, replayed by bridge after reconnect to toy
+    forget = 0x05  # payload: device_id, command_id
+
+
+def encode_message(message_type: MessageType, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise PySpheroRuntimeError(f"Too large message: {len(payload)} bytes")
+    return _header.pack(message_type.value, len(payload)) + payload
+
+
+def _read_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def read_message(sock: socket.socket) -> Tuple[MessageType, bytes]:
+    """
+    :raise EOFError: connection is closed
+    """
+    message_type, size = _header.unpack(_read_exactly(sock, _header.size))
+    return MessageType(message_type), _read_exactly(sock, size)
+
+
+def split_frames(data: bytes) -> Iterator[bytes]:
+    """
+    Split concatenated frames, end byte is never inside of escaped frame
+    """
+    start = 0
+    while start < len(data):
+        end = data.find(Packet.end, start)
+        if end < 0:
+            raise PySpheroRuntimeError("Incomplete frame")
+        yield data[start:end + 1]
+        start = end + 1
+
+
+def create_socket(address: Union[str, Tuple[str, int]]) -> socket.socket:
+    """
+    Unix socket for path, tcp socket for (host, port)
+    """
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+
+class _Route(NamedTuple):
+    client: "_BridgeClient"
+    sequence: int  # sequence of client
+    packet: Packet  # request sent to toy
+    deadline: float
+
+
+class _Toy:
+    """
+    Adapter of toy with requests of clients in flight
+    """
+
+    def __init__(self, server: "BridgeServer", ble_adapter):
+        self.server = server
+        self.ble_adapter = ble_adapter
+        self.routes: Dict[int, _Route] = {}  # sequence of bridge -> route
+        self.lock = threading.Lock()
+
+    def request(self, client: "_BridgeClient", frames: List[bytes]):
+        """
+        Send frames of one message of client at once, e.g. batch of client is packed into writes of toy's mtu
+        """
+        sequences = self.ble_adapter.sequences
+        packets = []
+        without_response = []
+        for frame in frames:
+            request = Packet.from_response(list(frame))
+            needs_response = request.flags & (Flag.requests_response.value | Flag.requests_only_error_response.value)
+
+            packet = sequences.packet(
+                device_id=request.device_id,
+                command_id=request.command_id,
+                flags=request.flags,
+                target_id=request.target_id,
+                source_id=request.source_id,
+                data=request.data,
+            )
+            packets.append(packet)
+            if not needs_response:
+                without_response.append(packet)
+                continue
+
+            with self.lock:
+                self._expire()
+                self.routes[packet.sequence] = _Route(
+                    client,
+                    request.sequence,
+                    packet,
+                    time.monotonic() + self.server.request_timeout,
+                )
+
+        try:
+            self.ble_adapter.send_many(packets)
+        except PySpheroException as e:
+            # client gets no responses and handles it as timeout
+            logger.warning(f"{len(packets)} requests of {client} aren't sent: {e}")
+            for packet in packets:
+                self._drop(packet)
+            return
+
+        for packet in without_response:
+            sequences.release(packet)
+
+    def _drop(self, packet: Packet):
+        with self.lock:
+            route = self.routes.get(packet.sequence)
+            if route is not None and route.packet is packet:
+                del self.routes[packet.sequence]
+        self.ble_adapter.sequences.release(packet)
+
+    def _expire(self):
+        # toy doesn't answer some requests, their sequences are returned after timeout
+        now = time.monotonic()
+        for sequence, route in list(self.routes.items()):
+            if route.deadline < now:
+                del self.routes[sequence]
+                self.ble_adapter.sequences.release(route.packet)
+
+    def drop_client(self, client: "_BridgeClient"):
+        with self.lock:
+            routes = [route for route in self.routes.values() if route.client is client]
+            for route in routes:
+                del self.routes[route.packet.sequence]
+        for route in routes:
+            self.ble_adapter.sequences.release(route.packet)
+
+    def on_packet(self, packet: Packet) -> bool:
+        """
+        Listener of packet collector, called in parser thread of adapter.
+        Responses routed to clients are claimed, so they aren't stored in packet collector of bridge
+        """
+        try:
+            if packet.flags & Flag.response.value:
+                return self._on_response(packet)
+
+            subscribers = [client for client in self.server.clients(self) if packet.id in client.subscriptions]
+            if subscribers:
+                frame = packet.build()
+                for client in subscribers:
+                    client.send(MessageType.frame, frame)
+        except Exception:
+            logger.exception(f"Unable to forward {packet}")
+        return False
+
+    def _on_response(self, packet: Packet) -> bool:
+        with self.lock:
+            route = self.routes.get(packet.sequence)
+            if route is None or route.packet.id != packet.id:
+                # response of request of bridge adapter itself
+                return False
+            del self.routes[packet.sequence]
+
+        self.ble_adapter.sequences.release(route.packet)
+        response = Packet(
+            device_id=packet.device_id,
+            command_id=packet.command_id,
+            flags=packet.flags,
+            target_id=packet.target_id,
+            source_id=packet.source_id,
+            sequence=route.sequence,
+            data=list(packet.data),
+        )
+        route.client.send(MessageType.frame, response.build())
+        return True
+
+
+class _BridgeClient:
+    """
+    Connection of one client. Messages are sent by own thread,
+    so slow client never blocks parser of adapter: when its queue is full messages are dropped
+    """
+
+    def __init__(self, server: "BridgeServer", sock: socket.socket, name: str):
+        self.server = server
+        self.sock = sock
+        self.name = name
+        self.toy: Optional[_Toy] = None
+        self.subscriptions: Set[Tuple] = set()
+        self.dropped = 0
+
+        self._outgoing: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=server.client_queue_size)
+        self._closed = threading.Event()
+
+    def __str__(self):
+        return f"client {self.name}"
+
+    def send(self, message_type: MessageType, payload: bytes = b""):
+        try:
+            self._outgoing.put_nowait(encode_message(message_type, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def serve(self):
+        writer = threading.Thread(target=self._writer, name=f"bridge-writer-{self.name}", daemon=True)
+        writer.start()
+        try:
+            self._hello()
+            while not self._closed.is_set():
+                message_type, payload = read_message(self.sock)
+                self._handle(message_type, payload)
+        except (EOFError, OSError):
+            pass
+        except (PySpheroException, ValueError) as e:
+            # unknown message type, broken frame, etc.
+            logger.warning(f"Bad message of {self}: {e}")
+        finally:
+            self._stop_writer()
+            writer.join(1)
+            self.close()
+            self.server._remove(self)
+
+    def _hello(self):
+        message_type, payload = read_message(self.sock)
+        if message_type is not MessageType.hello:
+            raise PySpheroRuntimeError(f"Hello is expected, got {message_type}")
+
+        mac_address, _, token = payload.decode().partition("\n")
+        self.toy = self.server.toys.get(mac_address.lower())
+        if self.toy is None:
+            self.send(MessageType.hello, b"\x01")
+            raise PySpheroRuntimeError(f"Unknown toy {mac_address}")
+
+        if not self.server.authenticate(token):
+            self.toy = None
+            self.send(MessageType.hello, b"\x02")
+            raise PySpheroRuntimeError(f"Wrong token of {self}")
+
+        self.send(MessageType.hello, b"\x00")
+        logger.info(f"{self} connected to {mac_address}")
+
+    def _handle(self, message_type: MessageType, payload: bytes):
+        if message_type is MessageType.frame:
+            self.toy.request(self, list(split_frames(payload)))
+        elif message_type is MessageType.subscribe:
+            self.subscriptions.add(tuple(payload[:2]))
+        elif message_type is MessageType.unsubscribe:
+            self.subscriptions.discard(tuple(payload[:2]))
+        elif message_type is MessageType.remember:
+            self.toy.ble_adapter.remember(Packet.from_response(list(payload)))
+        elif message_type is MessageType.forget:
+            self.toy.ble_adapter.forget(tuple(payload[:2]))
+        else:
+            raise PySpheroRuntimeError(f"Unexpected message {message_type}")
+
+    def _writer(self):
+        while True:
+            data = self._outgoing.get()
+            if data is None:
+                return
+
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self._closed.set()
+                return
+
+    def _stop_writer(self):
+        # writer is stopped after already queued messages
+        while True:
+            try:
+                self._outgoing.put_nowait(None)
+                return
+            except queue.Full:
+                with contextlib.suppress(queue.Empty):
+                    self._outgoing.get_nowait()
+
+    def close(self):
+        self._closed.set()
+        self._stop_writer()
+        with contextlib.suppress(OSError):
+            self.sock.shutdown(socket.SHUT_RDWR)
+        self.sock.close()
+
+
+class BridgeServer:
+    """
+    Serve adapters of toys on local socket
+
+    with Sphero(mac_address) as sphero, BridgeServer(sphero.ble_adapter, address="/tmp/pysphero.sock") as bridge:
+        bridge.serve_forever()
+
+    # in other processes
+
+    with Sphero(mac_address, ble_adapter_cls=RemoteAdapter) as sphero:
+        sphero.power.wake()
+
+    Tcp bridge needs token shared with clients, it listens on other hosts only with explicit host:
+
+    BridgeServer(sphero.ble_adapter, address=("0.0.0.0", 8888), token=token)
+    Sphero(mac_address, ble_adapter_cls=functools.partial(RemoteAdapter, address=("gateway", 8888), token=token))
+    """
+
+    def __init__(
+            self,
+            *ble_adapters,
+            address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS,
+            request_timeout: float = 10.0,
+            client_queue_size: int = 1024,
+            token: Optional[str] = None,
+    ):
+        """
+        :param ble_adapters: connected adapters of toys
+        :param address: path of unix socket or (host, port) of tcp socket, empty host is localhost
+        :param request_timeout: time after which request of client without response is forgotten
+        :param client_queue_size: max count of messages queued for one client
+        :param token: secret shared with clients, required for tcp socket
+        """
+        if not isinstance(address, str):
+            if token is None:
+                raise ValueError("Token is required for tcp bridge")
+            host, port = address
+            address = (host or DEFAULT_HOST, port)
+
+        self.request_timeout = request_timeout
+        self.client_queue_size = client_queue_size
+        self._token = token
+        self.toys: Dict[str, _Toy] = {}
+        for ble_adapter in ble_adapters:
+            toy = _Toy(self, ble_adapter)
+            self.toys[ble_adapter.mac_address.lower()] = toy
+            ble_adapter.packet_collector.listeners.append(toy.on_packet)
+
+        self._clients: List[_BridgeClient] = []
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._socket = create_socket(address)
+        if isinstance(address, str):
+            self._unlink(address)
+        else:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(address)
+        self._socket.listen()
+        self._socket.settimeout(0.1)
+
+    @property
+    def address(self) -> Union[str, Tuple[str, int]]:
+        """
+        Bound address, e.g. with port chosen by system
+        """
+        return self._socket.getsockname()
+
+    @staticmethod
+    def _unlink(path: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+    def authenticate(self, token: str) -> bool:
+        if self._token is None:
+            return True
+        return hmac.compare_digest(token.encode(), self._token.encode())
+
+    def clients(self, toy: _Toy = None) -> List[_BridgeClient]:
+        with self._lock:
+            return [client for client in self._clients if toy is None or client.toy is toy]
+
+    def serve_forever(self):
+        self._running.set()
+        count = 0
+        while self._running.is_set():
+            try:
+                sock, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                # server socket is closed
+                break
+
+            sock.settimeout(None)
+            count += 1
+            client = _BridgeClient(self, sock, str(count))
+            with self._lock:
+                self._clients.append(client)
+            threading.Thread(target=client.serve, name=f"bridge-client-{count}", daemon=True).start()
+
+    def start(self):
+        """
+        Serve in background thread
+        """
+        self._running.set()
+        self._thread = threading.Thread(target=self.serve_forever, name="bridge", daemon=True)
+        self._thread.start()
+
+    def _remove(self, client: _BridgeClient):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        if client.toy is not None:
+            client.toy.drop_client(client)
+        logger.info(f"{client} disconnected")
+
+    def close(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(1)
+
+        address = self.address
+        self._socket.close()
+        if isinstance(address, str) and address:
+            self._unlink(address)
+
+        for client in self.clients():
+            client.close()
+
+        for toy in self.toys.values():
+            listeners = toy.ble_adapter.packet_collector.listeners
+            if toy.on_packet in listeners:
+                listeners.remove(toy.on_packet)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,232 @@
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pysphero.constants import Api2Error
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroApiError
+from pysphero.packet import Packet
+
+logger = logging.getLogger(__name__)
+
+
+class Chunk(NamedTuple):
+    """
+    Part of transfer. Upload chunks carry data, download chunks only offset and size
+    """
+    offset: int
+    size: int
+    data: bytes = b""
+
+
+class TransferStats:
+    def __init__(self, total: int, chunks: int):
+        self.total = total  # bytes
+        self.chunks = chunks
+        self.acked = 0  # bytes of acknowledged chunks
+        self.acked_chunks = 0
+        self.retransmissions = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        return self.acked / self.total if self.total else 1.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """
+        Acknowledged bytes per second
+        """
+        elapsed = self.elapsed
+        return self.acked / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (
+            f"TransferStats({self.acked}/{self.total} bytes, {self.acked_chunks}/{self.chunks} chunks, "
+            f"retransmissions={self.retransmissions}, {self.throughput:.0f} B/s)"
+        )
+
+
+class _InFlight:
+    __slots__ = ("chunk", "packet", "attempts", "deadline")
+
+    def __init__(self, chunk: Chunk, packet: Packet):
+        self.chunk = chunk
+        self.packet = packet
+        self.attempts = 1
+        self.deadline = 0.0
+
+
+class BulkTransfer:
+    """
+    Transfer of many chunks with a window of requests in flight.
+    Every chunk is one request, responses are correlated with requests by sequence,
+    so a chunk is acknowledged by its own response only. Every chunk has own deadline,
+    a lost or failed chunk is sent again without waiting for older chunks of the window,
+    other chunks are not repeated.
+
+    def here_is_page(chunk: Chunk) -> Packet:
+        # sequence is allocated by adapter and released when chunk is acknowledged
+        return sphero.ble_adapter.sequences.packet(
+            device_id=0x1d, command_id=0x01, target_id=0x12, data=[*chunk.offset.to_bytes(4, "big"), *chunk.data],
+        )
+
+    engine = BulkTransfer(sphero.ble_adapter, here_is_page, window=8)
+    stats = engine.upload(firmware, chunk_size=64)
+    """
+
+    def __init__(
+            self,
+            ble_adapter,
+            make_packet: Callable[[Chunk], Packet],
+            window: int = 8,
+            retries: int = 3,
+            timeout: float = None,
+            progress: Callable[[TransferStats], None] = None,
+    ):
+        """
+        :param ble_adapter: adapter of toy
+        :param make_packet: build request of chunk, request must ask for response,
+            sequence should be allocated by sequences of adapter
+        :param window: max count of requests in flight
+        :param retries: max count of retransmissions of one chunk
+        :param timeout: timeout waiting for a response, timeout policy of adapter by default
+        :param progress: called with stats after every acknowledged chunk
+        """
+        if window < 1:
+            raise ValueError("Window must be positive")
+
+        self.ble_adapter = ble_adapter
+        self.make_packet = make_packet
+        # responses of the whole window must fit into packet collector
+        self.window = min(window, ble_adapter.packet_collector.max_pending_responses)
+        sequences = getattr(ble_adapter, "sequences", None)
+        if sequences is not None:
+            self.window = min(self.window, sequences.window)
+        self.retries = retries
+        self.timeout = timeout
+        self.progress = progress
+        self.stats: Optional[TransferStats] = None  # of the last transfer
+
+    def _timeout(self, packet: Packet) -> float:
+        if self.timeout is not None:
+            return self.timeout
+        return self.ble_adapter.timeout_policy.timeout(packet.id)
+
+    def _send(self, item: _InFlight):
+        item.deadline = time.monotonic() + self._timeout(item.packet)
+        self.ble_adapter.send(item.packet)
+
+    def _retransmit(self, item: _InFlight, stats: TransferStats, error: Exception):
+        if item.attempts > self.retries:
+            raise error
+
+        logger.debug(f"Retransmit chunk at {item.chunk.offset} ({item.attempts}/{self.retries}): {error}")
+        item.attempts += 1
+        stats.retransmissions += 1
+        # the same sequence, late response of previous attempt acknowledges chunk too
+        self._send(item)
+
+    def _release(self, item: _InFlight):
+        sequences = getattr(self.ble_adapter, "sequences", None)
+        if sequences is not None:
+            sequences.release(item.packet)
+
+    def iter_transfer(self, chunks: Iterable[Chunk]) -> Iterator[Tuple[Chunk, Packet]]:
+        """
+        Send requests of all chunks, stats of transfer are in self.stats
+
+        :param chunks: chunks of transfer
+        :raise PySpheroTimeoutError: chunk isn't acknowledged after all retries
+        :raise PySpheroApiError: chunk is rejected after all retries
+        :return: chunks with their responses in order of acknowledgement
+        """
+        pending: Deque[Chunk] = deque(chunks)
+        stats = self.stats = TransferStats(sum(chunk.size for chunk in pending), len(pending))
+        in_flight: List[_InFlight] = []
+
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < self.window:
+                    chunk = pending.popleft()
+                    item = _InFlight(chunk, self.make_packet(chunk))
+                    in_flight.append(item)
+                    self._send(item)
+
+                # wait for any response of the window until the nearest deadline
+                timeout = max(min(item.deadline for item in in_flight) - time.monotonic(), 0)
+                ready = self.ble_adapter.packet_collector.get_any_response(
+                    [item.packet for item in in_flight],
+                    timeout=timeout,
+                )
+                if ready is None:
+                    now = time.monotonic()
+                    for item in in_flight:
+                        if item.deadline <= now:
+                            self._retransmit(item, stats, PySpheroTimeoutError(
+                                f"Timeout error for response of {item.packet}"
+                            ))
+                    continue
+
+                request, response = ready
+                item = next(item for item in in_flight if item.packet is request)
+                if response.api_error is not Api2Error.success:
+                    self._retransmit(item, stats, PySpheroApiError(response.api_error))
+                    continue
+
+                in_flight.remove(item)
+                self._release(item)
+                stats.acked += item.chunk.size
+                stats.acked_chunks += 1
+                if self.progress is not None:
+                    self.progress(stats)
+                yield item.chunk, response
+        finally:
+            # transfer is failed or abandoned by consumer
+            for item in in_flight:
+                self._release(item)
+
+        stats.finished = time.monotonic()
+        logger.debug(f"Transfer completed: {stats}")
+
+    def transfer(
+            self,
+            chunks: Iterable[Chunk],
+            on_response: Callable[[Chunk, Packet], None] = None,
+    ) -> TransferStats:
+        """
+        Send requests of all chunks
+
+        :param chunks: chunks of transfer
+        :param on_response: called with chunk and its response in order of acknowledgement
+        :return TransferStats:
+        """
+        for chunk, response in self.iter_transfer(chunks):
+            if on_response is not None:
+                on_response(chunk, response)
+        return self.stats
+
+    def upload(self, payload: bytes, chunk_size: int, offset: int = 0) -> TransferStats:
+        """
+        Split payload into chunks and send them
+
+        :param payload: data
+        :param chunk_size: size of data in one request
+        :param offset: offset of the first chunk, e.g. to resume upload
+        """
+        return self.transfer(split(payload, chunk_size, offset))
+
+
+def split(payload: bytes, chunk_size: int, offset: int = 0) -> List[Chunk]:
+    """
+    Upload chunks of payload starting at offset
+    """
+    return [
+        Chunk(position, len(payload[position:position + chunk_size]), payload[position:position + chunk_size])
+        for position in range(offset, len(payload), chunk_size)
+    ]
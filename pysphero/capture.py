@@ -0,0 +1,445 @@
+"""
+Capture file structure:
+---------------------------------
+- magic      [8 byte]  b"PSCAP\x00\x01\x00"
+- records    [n]
+---------------------------------
+
+Record structure:
+---------------------------------
+- timestamp  [8 byte]  host time, little-endian double.
+                       Writer never decreases it (wall clock at open + monotonic clock),
+                       but records of separate sessions may still go back after a clock step
+- length     [2 byte]  length of frame, little-endian
+- frame      [n byte]  unescaped packet without start and end bytes
+---------------------------------
+
+Index file (<capture>.idx) structure:
+---------------------------------
+- magic      [8 byte]  b"PSIDX\x00\x02\x00"
+- size       [8 byte]  size of indexed capture
+- tail crc   [4 byte]  crc32 of the last 4 KiB of indexed capture
+- frames     [4 byte]  count of frames
+- ids        [4 byte]  count of (device_id, command_id) pairs
+- ordered    [4 byte]  1 if timestamps never decrease, lookups by time use binary search then
+- entries    [20 byte * frames]  timestamp, offset, length, device_id, command_id
+- id table   [10 byte * ids]  device_id, command_id, postings start, postings count
+- postings   [4 byte * frames]  frame numbers grouped by id table
+---------------------------------
+"""
+
+import contextlib
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple, Union
+
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.packet import Packet, Flag
+
+CAPTURE_MAGIC = b"PSCAP\x00\x01\x00"
+INDEX_MAGIC = b"PSIDX\x00\x02\x00"
+TAIL_SIZE = 4096
+
+_record_header = struct.Struct("<dH")
+_index_header = struct.Struct("<8sQIIII")
+_index_entry = struct.Struct("<dQHBB")
+_index_id = struct.Struct("<BBII")
+_posting = struct.Struct("<I")
+
+
+def _frame_header_size(flags: int) -> int:
+    # flags, device_id, command_id, sequence
+    size = 4
+    if flags & Flag.command_has_target_id.value:
+        size += 1
+    if flags & Flag.command_has_source_id.value:
+        size += 1
+    return size
+
+
+class PacketView:
+    """
+    Read-only packet over a slice of capture file.
+    Fields are decoded on access, data is a memoryview without copying
+    """
+
+    __slots__ = ("timestamp", "_frame")
+
+    def __init__(self, timestamp: float, frame: memoryview):
+        self.timestamp = timestamp
+        self._frame = frame
+
+    @property
+    def flags(self) -> int:
+        return self._frame[0]
+
+    @property
+    def target_id(self) -> Optional[int]:
+        if self.flags & Flag.command_has_target_id.value:
+            return self._frame[1]
+        return None
+
+    @property
+    def source_id(self) -> Optional[int]:
+        if self.flags & Flag.command_has_source_id.value:
+            return self._frame[1 + (self.target_id is not None)]
+        return None
+
+    @property
+    def device_id(self) -> int:
+        return self._frame[_frame_header_size(self.flags) - 3]
+
+    @property
+    def command_id(self) -> int:
+        return self._frame[_frame_header_size(self.flags) - 2]
+
+    @property
+    def sequence(self) -> int:
+        return self._frame[_frame_header_size(self.flags) - 1]
+
+    @property
+    def id(self) -> Tuple:
+        return self.device_id, self.command_id
+
+    @property
+    def data(self) -> memoryview:
+        """
+        Packet data including the api_v2 response code
+        """
+        return self._frame[_frame_header_size(self.flags):-1]
+
+    @property
+    def checksum(self) -> int:
+        return self._frame[-1]
+
+    def to_packet(self) -> Packet:
+        """
+        Copy view into the regular packet
+        """
+        return Packet(
+            flags=self.flags,
+            target_id=self.target_id,
+            source_id=self.source_id,
+            device_id=self.device_id,
+            command_id=self.command_id,
+            sequence=self.sequence,
+            data=list(self.data),
+        )
+
+    def __repr__(self) -> str:
+        return f"PacketView(ts: {self.timestamp:.6f} flg: {self.flags:#04x} did: {self.device_id:#04x} " \
+               f"cid: {self.command_id:#04x} seq: {self.sequence:#04x} len: {len(self.data)})"
+
+
+class CaptureWriter:
+    """
+    Append packets to capture file.
+    Can be assigned to PacketCollector.capture for recording of all received packets
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+
+        # wall clock may be stepped (ntp), timestamps of session follow monotonic clock
+        self._wall_start = time.time()
+        self._monotonic_start = time.monotonic()
+
+    def write_raw(self, raw_data: Union[List[int], bytes], timestamp: float = None):
+        """
+        Write frame as it was received from peripheral
+
+        :param raw_data: escaped frame with start and end bytes
+        :param timestamp: host time, current time by default
+        """
+        frame = Packet._unescape_response_data(raw_data)
+        if len(frame) < 6 or frame[0] != Packet.start or frame[-1] != Packet.end:
+            raise PySpheroRuntimeError(f"Bad frame {[hex(x) for x in frame]}")
+
+        self._write(bytes(frame[1:-1]), timestamp)
+
+    def write_packet(self, packet: Packet, timestamp: float = None):
+        self._write(bytes([*packet.packet_payload, packet.checksum]), timestamp)
+
+    def _write(self, frame: bytes, timestamp: Optional[float]):
+        if timestamp is None:
+            timestamp = self._wall_start + time.monotonic() - self._monotonic_start
+
+        with self._lock:
+            self._file.write(_record_header.pack(timestamp, len(frame)))
+            self._file.write(frame)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CaptureReader:
+    """
+    Memory-mapped reader of capture file.
+    Index of frames is stored near the capture and rebuilt when the capture was changed.
+    Lookups by time or by (device_id, command_id) don't read the whole file
+    """
+
+    def __init__(self, path: str, index_path: str = None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(CAPTURE_MAGIC):
+            raise PySpheroRuntimeError(f"Capture {path} is empty")
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        if self._buffer[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.close()
+            raise PySpheroRuntimeError(f"File {path} is not a capture")
+
+        if not self._index_is_actual(size):
+            self._build_index()
+
+        self._index_file = open(self.index_path, "rb")
+        self._index_mmap = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = memoryview(self._index_mmap)
+
+        _, _, _, self._frames_count, ids_count, ordered = _index_header.unpack_from(self._index)
+        self._ordered = bool(ordered)
+        self._ids_offset = _index_header.size + self._frames_count * _index_entry.size
+        self._postings_offset = self._ids_offset + ids_count * _index_id.size
+        self._ids = {}
+        for i in range(ids_count):
+            device_id, command_id, start, count = _index_id.unpack_from(
+                self._index, self._ids_offset + i * _index_id.size,
+            )
+            self._ids[device_id, command_id] = start, count
+
+    def _tail_crc(self, size: int) -> int:
+        return zlib.crc32(self._buffer[max(size - TAIL_SIZE, 0):size])
+
+    def _index_is_actual(self, size: int) -> bool:
+        """
+        Index matches the capture by size and content of its end,
+        index file itself must have all tables of header
+        """
+        try:
+            with open(self.index_path, "rb") as index:
+                header = index.read(_index_header.size)
+                index_size = os.fstat(index.fileno()).st_size
+        except OSError:
+            return False
+
+        if len(header) != _index_header.size:
+            return False
+
+        magic, indexed_size, tail_crc, frames_count, ids_count, _ = _index_header.unpack(header)
+        expected_index_size = (
+            _index_header.size
+            + frames_count * (_index_entry.size + _posting.size)
+            + ids_count * _index_id.size
+        )
+        return (
+            magic == INDEX_MAGIC
+            and indexed_size == size
+            and index_size == expected_index_size
+            and tail_crc == self._tail_crc(size)
+        )
+
+    def _build_index(self):
+        """
+        Scan capture once and write index file
+        A truncated record at the end of file (unfinished capture) is ignored
+        """
+        entries = bytearray()
+        postings = {}
+        offset = len(CAPTURE_MAGIC)
+        size = len(self._buffer)
+        frame_number = 0
+        ordered = True
+        previous_timestamp = float("-inf")
+        while offset + _record_header.size <= size:
+            timestamp, length = _record_header.unpack_from(self._buffer, offset)
+            frame_offset = offset + _record_header.size
+            if frame_offset + length > size:
+                break
+
+            flags = self._buffer[frame_offset]
+            header_size = _frame_header_size(flags)
+            if length < header_size + 1:
+                raise PySpheroRuntimeError(f"Bad frame at offset {offset} of {self.path}")
+
+            if timestamp < previous_timestamp:
+                ordered = False
+            previous_timestamp = timestamp
+
+            device_id = self._buffer[frame_offset + header_size - 3]
+            command_id = self._buffer[frame_offset + header_size - 2]
+            entries += _index_entry.pack(timestamp, frame_offset, length, device_id, command_id)
+            postings.setdefault((device_id, command_id), []).append(frame_number)
+
+            frame_number += 1
+            offset = frame_offset + length
+
+        ids_table = bytearray()
+        postings_table = bytearray()
+        start = 0
+        for (device_id, command_id), frame_numbers in sorted(postings.items()):
+            ids_table += _index_id.pack(device_id, command_id, start, len(frame_numbers))
+            postings_table += struct.pack(f"<{len(frame_numbers)}I", *frame_numbers)
+            start += len(frame_numbers)
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wb") as index:
+            index.write(_index_header.pack(
+                INDEX_MAGIC, size, self._tail_crc(size), frame_number, len(postings), int(ordered),
+            ))
+            index.write(entries)
+            index.write(ids_table)
+            index.write(postings_table)
+        os.replace(tmp_path, self.index_path)
+
+    def _entry(self, frame_number: int) -> Tuple[float, int, int]:
+        timestamp, offset, length, _, _ = _index_entry.unpack_from(
+            self._index, _index_header.size + frame_number * _index_entry.size,
+        )
+        return timestamp, offset, length
+
+    def _timestamp(self, frame_number: int) -> float:
+        return _index_entry.unpack_from(self._index, _index_header.size + frame_number * _index_entry.size)[0]
+
+    def _posting(self, position: int) -> int:
+        return _posting.unpack_from(self._index, self._postings_offset + position * _posting.size)[0]
+
+    def _view(self, frame_number: int) -> PacketView:
+        timestamp, offset, length = self._entry(frame_number)
+        return PacketView(timestamp, self._buffer[offset:offset + length])
+
+    def __len__(self) -> int:
+        return self._frames_count
+
+    def __getitem__(self, frame_number: int) -> PacketView:
+        if frame_number < 0:
+            frame_number += self._frames_count
+        if not 0 <= frame_number < self._frames_count:
+            raise IndexError("Frame number out of range")
+        return self._view(frame_number)
+
+    def __iter__(self) -> Iterator[PacketView]:
+        for frame_number in range(self._frames_count):
+            yield self._view(frame_number)
+
+    def ids(self) -> List[Tuple]:
+        """
+        All (device_id, command_id) pairs found in capture
+        """
+        return list(self._ids)
+
+    def window(self, start: float = None, end: float = None) -> Iterator[PacketView]:
+        """
+        Frames with start <= timestamp < end.
+        Binary search is used while timestamps of capture never decrease, otherwise all frames are scanned
+
+        :param start: host time, beginning of capture by default
+        :param end: host time, end of capture by default
+        """
+        if not self._ordered:
+            for frame_number in range(self._frames_count):
+                if _in_window(self._timestamp(frame_number), start, end):
+                    yield self._view(frame_number)
+            return
+
+        first = 0 if start is None else _bisect(self._timestamp, 0, self._frames_count, start)
+        last = self._frames_count if end is None else _bisect(self._timestamp, first, self._frames_count, end)
+        for frame_number in range(first, last):
+            yield self._view(frame_number)
+
+    def frames(
+            self,
+            device_id: int,
+            command_id: int,
+            start: float = None,
+            end: float = None,
+    ) -> Iterator[PacketView]:
+        """
+        Frames of one command, e.g. sensor_streaming_data, optionally limited by time
+
+        :param device_id:
+        :param command_id:
+        :param start: host time, beginning of capture by default
+        :param end: host time, end of capture by default
+        """
+        first, count = self._ids.get((device_id, command_id), (0, 0))
+        last = first + count
+
+        def timestamp(position: int) -> float:
+            return self._timestamp(self._posting(position))
+
+        if not self._ordered:
+            for position in range(first, last):
+                if _in_window(timestamp(position), start, end):
+                    yield self._view(self._posting(position))
+            return
+
+        if start is not None:
+            first = _bisect(timestamp, first, last, start)
+        if end is not None:
+            last = _bisect(timestamp, first, last, end)
+
+        for position in range(first, last):
+            yield self._view(self._posting(position))
+
+    def close(self):
+        """
+        Close capture. Views which are still referenced keep the mapping alive until they are released
+        """
+        for name in ("_index", "_buffer"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+
+        for name in ("_index_mmap", "_index_file", "_mmap", "_file"):
+            resource = self.__dict__.pop(name, None)
+            if resource is not None:
+                # exported views of mmap are still alive
+                with contextlib.suppress(BufferError):
+                    resource.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _in_window(timestamp: float, start: Optional[float], end: Optional[float]) -> bool:
+    return (start is None or timestamp >= start) and (end is None or timestamp < end)
+
+
+def _bisect(key, low: int, high: int, value: float) -> int:
+    """
+    First position in [low, high) where key(position) >= value
+    """
+    while low < high:
+        middle = (low + high) // 2
+        if key(middle) < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
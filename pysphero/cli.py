@@ -0,0 +1,268 @@
+"""
+Command-line tool for diagnostics of toys
+
+pysphero scan
+pysphero --mac aa:bb:cc:dd:ee:ff ping --count 20
+pysphero --mac aa:bb:cc:dd:ee:ff stream Accelerometer CoreTime --interval 50 --output samples.csv
+pysphero --simulated --latency 15 bench --requests 1000
+
+Without --mac the first toy found by scanner is used
+"""
+
+import argparse
+import csv
+import functools
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import List, TextIO
+
+from pysphero.constants import Toy
+from pysphero.core import Sphero
+from pysphero.device_api.sensor import StreamingLayout, sensor_by_name, parameter_name
+from pysphero.exceptions import PySpheroException, PySpheroTimeoutError
+from pysphero.packet import Packet
+from pysphero.utils import scan_toys, toy_scanner
+
+logger = logging.getLogger(__name__)
+
+SIMULATED_MAC_ADDRESS = "00:00:00:00:00:00"
+
+
+class LatencyStats:
+    def __init__(self, latencies: List[float]):
+        """
+        :param latencies: latencies in seconds
+        """
+        self.values = sorted(latency * 1000 for latency in latencies)
+
+    def percentile(self, percent: float) -> float:
+        index = min(int(len(self.values) * percent / 100), len(self.values) - 1)
+        return self.values[index]
+
+    def __str__(self):
+        if not self.values:
+            return "no responses"
+
+        stdev = statistics.stdev(self.values) if len(self.values) > 1 else 0.0
+        return (
+            f"min/avg/max/stdev = {self.values[0]:.1f}/{statistics.mean(self.values):.1f}/"
+            f"{self.values[-1]:.1f}/{stdev:.1f} ms, "
+            f"p50/p90/p99 = {self.percentile(50):.1f}/{self.percentile(90):.1f}/{self.percentile(99):.1f} ms"
+        )
+
+
+def _address(value: str):
+    """
+    host:port of tcp socket or path of unix socket
+    """
+    host, separator, port = value.rpartition(":")
+    if separator and port.isdigit():
+        return host, int(port)
+    return value
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def _sphero(args) -> Sphero:
+    if args.simulated:
+        from pysphero.bluetooth.simulated_adapter import SimulatedAdapter
+
+        adapter_cls = functools.partial(SimulatedAdapter, latency=args.latency / 1000, loss=args.loss)
+        return Sphero(args.mac or SIMULATED_MAC_ADDRESS, ble_adapter_cls=adapter_cls)
+
+    if args.bridge:
+        from pysphero.bluetooth.remote_adapter import RemoteAdapter
+
+        if not args.mac:
+            raise PySpheroException("--mac is required with --bridge")
+        adapter_cls = functools.partial(RemoteAdapter, address=args.bridge, token=args.bridge_token)
+        return Sphero(args.mac, ble_adapter_cls=adapter_cls)
+
+    if args.mac:
+        return Sphero(args.mac)
+
+    toy_type = Toy[args.toy_type] if args.toy_type else None
+    return toy_scanner(toy_type=toy_type, name=args.name, timeout=args.scan_timeout)
+
+
+def scan(args, out: TextIO) -> int:
+    toy_type = Toy[args.toy_type] if args.toy_type else None
+    toys = scan_toys(toy_type=toy_type, timeout=args.scan_timeout)
+    for toy in toys:
+        print(f"{toy.mac_address}  {toy.rssi:4d} dBm  {toy.toy_type.value:<16}  {toy.name}", file=out)
+
+    if not toys:
+        print("No toys found", file=sys.stderr)
+        return 1
+    return 0
+
+
+def ping(sphero: Sphero, args, out: TextIO) -> int:
+    latencies = []
+    for number in range(args.count):
+        started = time.monotonic()
+        try:
+            sphero.api_processor.echo(timeout=args.timeout)
+        except PySpheroTimeoutError:
+            print(f"echo {number}: timeout", file=out)
+        else:
+            latency = time.monotonic() - started
+            latencies.append(latency)
+            print(f"echo {number}: {latency * 1000:.1f} ms", file=out)
+
+        if number + 1 < args.count:
+            time.sleep(max(args.interval - (time.monotonic() - started), 0))
+
+    lost = args.count - len(latencies)
+    print(f"{args.count} sent, {len(latencies)} received, {lost / args.count:.0%} lost", file=out)
+    print(f"rtt {LatencyStats(latencies)}", file=out)
+    return 0 if latencies else 1
+
+
+def stream(sphero: Sphero, args, out: TextIO) -> int:
+    sensors = [sensor_by_name(name) for name in args.sensors]
+    parameters = StreamingLayout.from_sensors(*sensors).parameters
+    output = open(args.output, "w", newline="") if args.output else out
+
+    if args.format == "csv":
+        writer = csv.writer(output)
+        writer.writerow(["timestamp", *(parameter_name(parameter) for parameter in parameters)])
+
+        def write(sample):
+            writer.writerow([sample.timestamp, *(sample.values.get(parameter, "") for parameter in parameters)])
+    else:
+        def write(sample):
+            values = {parameter_name(parameter): value for parameter, value in sample.values.items()}
+            output.write(json.dumps({"timestamp": sample.timestamp, **values}) + "\n")
+
+    sphero.power.wake()
+    written = 0
+    try:
+        with sphero.sensor.stream(*sensors, interval=args.interval, timeout=args.timeout) as samples:
+            for sample in samples:
+                write(sample)
+                written += 1
+                if args.count and written >= args.count:
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not out:
+            output.close()
+
+    print(f"{written} samples written", file=sys.stderr)
+    return 0
+
+
+def bench(sphero: Sphero, args, out: TextIO) -> int:
+    frame_size = len(Packet(0x10, 0x00).build())
+
+    # latency of sequential requests
+    latencies = []
+    for _ in range(args.requests):
+        started = time.monotonic()
+        try:
+            sphero.api_processor.echo(timeout=args.timeout)
+        except PySpheroTimeoutError:
+            continue
+        latencies.append(time.monotonic() - started)
+
+    print(f"latency: {args.requests} requests, {args.requests - len(latencies)} lost", file=out)
+    print(f"  {LatencyStats(latencies)}", file=out)
+
+    # throughput of pipelined requests
+    lost = 0
+    started = time.monotonic()
+    for offset in range(0, args.requests, args.window):
+        with sphero.batch() as batch:
+            for _ in range(min(args.window, args.requests - offset)):
+                batch.api_processor.echo()
+
+        lost += sum(1 for future in batch.futures if future.exception() is not None)
+    elapsed = time.monotonic() - started
+
+    acked = args.requests - lost
+    print(
+        f"throughput: {args.requests} requests in {elapsed:.2f} s, window {args.window}, {lost} lost",
+        file=out,
+    )
+    if elapsed > 0:
+        print(f"  {acked / elapsed:.0f} req/s, {acked * frame_size / elapsed:.0f} B/s of requests", file=out)
+    return 0 if acked else 1
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pysphero", description="Diagnostics of Sphero toys")
+    parser.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+    parser.add_argument("--mac", help="mac address of toy, the first found toy by default")
+    parser.add_argument("--toy-type", choices=[toy.name for toy in Toy], help="scan only toys of type")
+    parser.add_argument("--name", help="scan only toy with name")
+    parser.add_argument("--scan-timeout", type=float, default=5.0, help="seconds of scanning")
+    parser.add_argument("--bridge", type=_address, help="use toy of bridge at path or host:port")
+    parser.add_argument("--bridge-token", help="token of bridge, required by tcp bridge")
+    parser.add_argument("--simulated", action="store_true", help="use simulated toy instead of radio")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of simulated toy in ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of lost request of simulated toy")
+
+    commands = parser.add_subparsers(dest="command")
+    # keyword argument "required" is added in python 3.7
+    commands.required = True
+    commands.add_parser("scan", help="list toys nearby")
+
+    ping_parser = commands.add_parser("ping", help="measure round-trip time of echo requests")
+    ping_parser.add_argument("-c", "--count", type=_positive_int, default=10)
+    ping_parser.add_argument("-i", "--interval", type=float, default=0.5, help="seconds between requests")
+    ping_parser.add_argument("-t", "--timeout", type=float, default=1.0, help="seconds waiting for a response")
+    ping_parser.set_defaults(handler=ping)
+
+    stream_parser = commands.add_parser("stream", help="write sensor samples to stdout or file")
+    stream_parser.add_argument("sensors", nargs="+", help="sensor classes, e.g. Accelerometer CoreTime")
+    stream_parser.add_argument("-i", "--interval", type=int, default=100, help="streaming interval in ms")
+    stream_parser.add_argument("-c", "--count", type=int, default=0, help="count of samples, 0 is infinite")
+    stream_parser.add_argument("-o", "--output", help="output file")
+    stream_parser.add_argument("-f", "--format", choices=["csv", "jsonl"], default="csv")
+    stream_parser.add_argument("-t", "--timeout", type=float, default=2.0, help="seconds waiting for a sample")
+    stream_parser.set_defaults(handler=stream)
+
+    bench_parser = commands.add_parser("bench", help="measure latency and throughput of requests")
+    bench_parser.add_argument("-n", "--requests", type=_positive_int, default=200)
+    bench_parser.add_argument("-w", "--window", type=_positive_int, default=16, help="requests in flight for throughput")
+    bench_parser.add_argument("-t", "--timeout", type=float, default=1.0, help="seconds waiting for a response")
+    bench_parser.set_defaults(handler=bench)
+    return parser
+
+
+def main(argv: List[str] = None, out: TextIO = None) -> int:
+    argument_parser = parser()
+    args = argument_parser.parse_args(argv)
+    out = out or sys.stdout
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    if args.command == "stream":
+        for name in args.sensors:
+            try:
+                sensor_by_name(name)
+            except KeyError:
+                argument_parser.error(f"unknown sensor {name}")
+
+    try:
+        if args.command == "scan":
+            return scan(args, out)
+
+        with _sphero(args) as sphero:
+            return args.handler(sphero, args, out)
+    except PySpheroException as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import contextlib
+import logging
+import math
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Type
+
+from pysphero.device_api.sensor import SensorSample, OverflowPolicy, _Sensor
+from pysphero.driving import Direction
+
+logger = logging.getLogger(__name__)
+
+
+class DriveOutput(NamedTuple):
+    """
+    Output of control function, sent by Driving.drive_with_heading
+    """
+    speed: int
+    heading: int
+    direction: Direction = Direction.forward
+
+
+class ControlStats:
+    """
+    Timing of control loop.
+    Jitter is lateness of iteration start relative to its deadline,
+    sample age is time between receiving of sensor sample and its use
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.overruns = 0  # iterations which finished after the next deadline
+        self.skipped = 0  # deadlines missed because of overruns
+        self.max_jitter = 0.0
+        self.max_sample_age = 0.0
+        self._jitter_sum = 0.0
+        self._sample_age_sum = 0.0
+        self._samples = 0
+
+    @property
+    def mean_jitter(self) -> float:
+        return self._jitter_sum / self.iterations if self.iterations else 0.0
+
+    @property
+    def mean_sample_age(self) -> float:
+        return self._sample_age_sum / self._samples if self._samples else 0.0
+
+    def add_iteration(self, jitter: float, sample_age: Optional[float]):
+        self.iterations += 1
+        self._jitter_sum += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        if sample_age is not None:
+            self._samples += 1
+            self._sample_age_sum += sample_age
+            self.max_sample_age = max(self.max_sample_age, sample_age)
+
+    def __repr__(self):
+        return (
+            f"ControlStats(iterations={self.iterations}, overruns={self.overruns}, skipped={self.skipped}, "
+            f"jitter={self.mean_jitter * 1000:.2f}/{self.max_jitter * 1000:.2f}ms, "
+            f"sample_age={self.mean_sample_age * 1000:.2f}/{self.max_sample_age * 1000:.2f}ms)"
+        )
+
+
+class Controller:
+    """
+    Run control function at fixed rate. Deadlines are planned on monotonic clock,
+    so the rate doesn't drift with time of iterations. After overrun the missed
+    deadlines are skipped instead of running iterations back to back.
+
+    Control function gets the latest sensor sample (None before the first one)
+    and returns DriveOutput or None. Output is sent without waiting for a response.
+
+    def hold_heading(sample):
+        error = 90 - sample.values[Attitude.yaw]
+        return DriveOutput(speed=0, heading=int(90 + error) % 360)
+
+    with Controller(sphero, hold_heading, Attitude, rate=50) as controller:
+        time.sleep(10)
+    print(controller.stats)
+    """
+
+    def __init__(
+            self,
+            sphero,
+            control: Callable[[Optional[SensorSample]], Optional[DriveOutput]],
+            *sensors: Type[_Sensor],
+            rate: float = 50,
+            interval: int = None,
+    ):
+        """
+        :param Sphero sphero: toy
+        :param control: control function
+        :param sensors: sensor classes of samples, without sensors control function gets None
+        :param rate: iterations per second
+        :param interval: sensor streaming interval in ms, period of control loop by default
+        """
+        self.sensor = sphero.sensor
+        self.driving = sphero.driving
+        self.control = control
+        self.sensors = sensors
+        self.period = 1 / rate
+        self.interval = interval or max(int(self.period * 1000), 1)
+        self.stats = ControlStats()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def run(self, duration: float = None):
+        """
+        Run control loop in current thread until stop or end of duration
+
+        :param duration: seconds, infinite by default
+        """
+        with contextlib.ExitStack() as stack:
+            samples = None
+            if self.sensors:
+                samples = stack.enter_context(self.sensor.stream(
+                    *self.sensors,
+                    interval=self.interval,
+                    maxsize=1,
+                    overflow=OverflowPolicy.drop_oldest,
+                    timeout=max(1.0, 10 * self.period),
+                ))
+            self._loop(samples, duration)
+
+    def _loop(self, samples, duration: Optional[float]):
+        sample = None
+        deadline = time.monotonic()
+        end = None if duration is None else deadline + duration
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if end is not None and started >= end:
+                break
+
+            if samples is not None:
+                # take the newest sample without waiting
+                sample = next(iter(samples.take(1, timeout=0)), sample)
+
+            output = self.control(sample)
+            if output is not None:
+                self.driving.drive_with_heading(*output, wait_response=False)
+
+            self.stats.add_iteration(
+                started - deadline,
+                None if sample is None else max(time.time() - sample.timestamp, 0.0),
+            )
+
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                self.stats.overruns += 1
+                missed = math.ceil((now - deadline) / self.period)
+                self.stats.skipped += missed
+                deadline += missed * self.period
+                logger.debug(f"Control loop overrun, {missed} deadlines skipped")
+
+            self._stop.wait(deadline - time.monotonic())
+
+    def start(self):
+        """
+        Run control loop in background thread
+        """
+        def target():
+            try:
+                self.run()
+            except BaseException as e:
+                logger.exception("Control loop failed")
+                self._error = e
+
+        self._error = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=target, name="pysphero-controller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop control loop, errors of background loop are raised here
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
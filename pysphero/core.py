@@ -1,10 +1,14 @@
 import logging
-from typing import NamedTuple, ClassVar
+import threading
+from typing import NamedTuple, ClassVar, Optional
 
 from pysphero.bluetooth import BleAdapter
+from pysphero.batch import Batch
 from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
 from pysphero.constants import Toy
-from pysphero.device_api import Animatronics, Sensor, UserIO, ApiProcessor, Power, SystemInfo
+from pysphero.device_api import Animatronics, Sensor, UserIO, ApiProcessor, Power, SystemInfo, \
+    SecondaryMcuFirmwareUpdate
+from pysphero.device_info import DeviceInfo, DeviceInfoCache, read_device_info
 from pysphero.driving import Driving
 from pysphero.exceptions import PySpheroException
 from pysphero.helpers import cached_property
@@ -28,13 +32,32 @@ class Sphero:
             self,
             mac_address: str,
             toy_type: Toy = Toy.unknown,
-            ble_adapter_cls: ClassVar[AbstractBleAdapter] = BleAdapter
+            ble_adapter_cls: ClassVar[AbstractBleAdapter] = BleAdapter,
+            device_info_cache: DeviceInfoCache = None,
+            warm_up: bool = False,
     ):
+        """
+        :param mac_address: mac address of toy
+        :param toy_type: type of toy
+        :param ble_adapter_cls: adapter of bluetooth backend
+        :param device_info_cache: persistent cache of device info, device info is kept only in memory by default
+        :param warm_up: read device info right after connect, connect takes longer then
+        """
         self.mac_address = mac_address
         self.type = toy_type
+        self.device_info_cache = device_info_cache
+        self.warm_up = warm_up
         self._ble_adapter_cls = ble_adapter_cls
         self._ble_adapter = None
 
+        self._device_info: Optional[DeviceInfo] = None
+        self._device_info_outdated = False  # cache file must not be used, e.g. after reconnect
+        # changed by invalidation, device info loaded meanwhile is outdated and isn't stored
+        self._device_info_generation = 0
+        self._device_info_lock = threading.Lock()  # one load at a time
+        # short lock of state, invalidation never waits for requests of load (e.g. in reconnect callback)
+        self._device_info_state_lock = threading.Lock()
+
     @property
     def ble_adapter(self):
         if self._ble_adapter is None:
@@ -49,11 +72,79 @@ class Sphero:
         self._ble_adapter = self._ble_adapter_cls(self.mac_address)
         # if self.type is Toy.unknown:
         #     self.type = TOY_BY_PREFIX.get(self.name[:3], Toy.unknown)
+        self._device_info = None
+        self._ble_adapter.reconnect_callbacks.append(self.invalidate_device_info)
+
+        if self.warm_up:
+            try:
+                self.load_device_info()
+            except PySpheroException as e:
+                # device info is read again on first use
+                logger.warning(f"Unable to read device info of {self.mac_address}: {e}")
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.ble_adapter.close()
 
+    @property
+    def device_info(self) -> DeviceInfo:
+        """
+        Versions, mac address, sku and stats id of toy without requests after warm-up
+        """
+        device_info = self._device_info
+        if device_info is None:
+            device_info = self.load_device_info()
+        return device_info
+
+    def load_device_info(self) -> DeviceInfo:
+        """
+        Take device info from cache file or read it from toy by one burst of requests
+        """
+        with self._device_info_lock:
+            with self._device_info_state_lock:
+                generation = self._device_info_generation
+                outdated = self._device_info_outdated
+
+            device_info = None
+            if self.device_info_cache is not None and not outdated:
+                device_info = self.device_info_cache.get(self.mac_address)
+
+            cached = device_info is not None
+            if not cached:
+                device_info = read_device_info(self.ble_adapter)
+
+            with self._device_info_state_lock:
+                # invalidated while loading, e.g. reconnect or firmware update
+                if generation == self._device_info_generation:
+                    if not cached and self.device_info_cache is not None:
+                        self.device_info_cache.put(self.mac_address, device_info)
+                    self._device_info = device_info
+                    self._device_info_outdated = False
+            return device_info
+
+    def invalidate_device_info(self, persistent: bool = False):
+        """
+        Device info is read from toy again on next use.
+        Called after reconnect (toy may be rebooted meanwhile)
+
+        :param persistent: drop entry of cache file too, e.g. after firmware update
+        """
+        with self._device_info_state_lock:
+            self._device_info_generation += 1
+            self._device_info = None
+            self._device_info_outdated = True
+            if persistent and self.device_info_cache is not None:
+                self.device_info_cache.invalidate(self.mac_address)
+
+    def batch(self) -> Batch:
+        """
+        Context of requests which are sent at once
+
+        with sphero.batch() as batch:
+            batch.driving.reset_yaw()
+        """
+        return Batch(self.ble_adapter)
+
     @cached_property
     def system_info(self) -> SystemInfo:
         return SystemInfo(ble_adapter=self.ble_adapter)
@@ -81,3 +172,11 @@ class Sphero:
     @cached_property
     def animatronics(self) -> Animatronics:
         return Animatronics(ble_adapter=self.ble_adapter)
+
+    @cached_property
+    def secondary_mcu_firmware_update(self) -> SecondaryMcuFirmwareUpdate:
+        # versions of toy are changed by reflash
+        return SecondaryMcuFirmwareUpdate(
+            ble_adapter=self.ble_adapter,
+            on_reflash=lambda: self.invalidate_device_info(persistent=True),
+        )
@@ -1,8 +1,11 @@
 from .device_api import DeviceApiABC, DeviceId
-from .animatronics import R2D2Animation, R2Q5Animation, BB9EAnimation, R2LegAction, LMQAnimation, Animatronics
+from .animatronics import R2D2Animation, R2Q5Animation, BB9EAnimation, R2LegAction, LMQAnimation, Animatronics, \
+    AnimationPlaylist
 from .api_processor import ApiProcessor
 from .power import Power, BatteryVoltageStates, ChargerStates
 from .sensor import Quaternion, Attitude, Accelerometer, AccelOne, \
-    Locator, Velocity, Speed, CoreTime, Gyroscope, AmbientLight, Sensor
+    Locator, Velocity, Speed, CoreTime, Gyroscope, AmbientLight, Sensor, StreamingLayout, \
+    SensorStream, SensorSample, OverflowPolicy, Collision, CollisionDetectionMethod
+from .secondary_mcu_firmware_update import SecondaryMcuFirmwareUpdate
 from .system_info import SystemInfo, Version
 from .user_io import UserIO, Color, Pixel, Led, FrameRotation
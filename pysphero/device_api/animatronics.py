@@ -1,10 +1,14 @@
+import contextlib
 import struct
-import time
+import threading
+from collections import deque
+from concurrent.futures import Future
 from enum import Enum
-from typing import Optional, List
+from typing import Dict, Deque, Tuple, Union, List, Optional
 
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError
 from pysphero.helpers import float_from_bytes
-from pysphero.packet import Packet
+from pysphero.packet import Packet, PacketTemplate
 
 from .device_api import DeviceApiABC, DeviceId
 
@@ -273,13 +277,29 @@ class LMQAnimation(Enum):
     # Dahh_LMQ394 =
 
 
+def _animation_key(animation: Union[int, Enum]) -> Tuple[int, ...]:
+    animation_id = animation.value if isinstance(animation, Enum) else animation
+    return tuple(animation_id.to_bytes(2, "big"))
+
+
 class Animatronics(DeviceApiABC):
     device_id = DeviceId.animatronics
 
+    _head_position_format = struct.Struct("f")
+    _head_position_template = PacketTemplate(
+        DeviceId.animatronics.value,
+        AnimatronicsCommand.set_head_position.value,
+        target_id=0x12,
+    )
+
     def __init__(self, ble_adapter):
         super().__init__(ble_adapter)
-        self._wait_for_play_animation = False
-        self._animation: Optional[List[int]] = None
+        self._animation_lock = threading.Lock()
+        # futures of played animations by animation id, completed in order of start
+        self._animation_futures: Dict[Tuple[int, ...], Deque[Future]] = {}
+        self._animation_notify: Optional[Future] = None
+        # e.g. playlists, subscription is kept between their animations
+        self._animation_holders = 0
 
     def play_animation(self, animation_id: int, target_id=0x12):
         self.request(
@@ -288,29 +308,112 @@ class Animatronics(DeviceApiABC):
             target_id=target_id,
         )
 
-    def play_animation_and_wait(self, animation_id: int, target_id=0x12, timeout: float = 10):
-        self._animation = [*animation_id.to_bytes(2, "big")]
-        self._wait_for_play_animation = True
-
-        def callback_wrapper(response: Packet):
-            if response.data == self._animation:
-                self._wait_for_play_animation = False
-
-        self.notify(AnimatronicsCommand.play_animation_complete_notify, callback_wrapper, timeout=timeout)
-        self.request(
-            AnimatronicsCommand.play_animation,
-            data=self._animation,
-            target_id=target_id,
-        )
+    def _on_animation_complete(self, response: Packet):
+        self._complete_animation(tuple(response.data[:2]))
+
+    def _complete_animation(self, key: Tuple[int, ...], future: Future = None, error: Exception = None):
+        """
+        Resolve the oldest future of animation (or the given one)
+        Only the thread which removed the future resolves it.
+        Completion subscription is stopped when no animation is played anymore
+        """
+        with self._animation_lock:
+            futures = self._animation_futures.get(key)
+            if not futures or (future is not None and future not in futures):
+                return
+
+            if future is None:
+                future = futures.popleft()
+            else:
+                futures.remove(future)
+            if not futures:
+                del self._animation_futures[key]
+            self._unsubscribe_animations()
+
+        if future.cancelled():
+            return
+        if error is None:
+            future.set_result(int.from_bytes(bytes(key), "big"))
+        else:
+            future.set_exception(error)
+
+    def _subscribe_animations(self):
+        # called with animation lock
+        if self._animation_notify is None or self._animation_notify.done():
+            self._animation_notify = self.notify(
+                AnimatronicsCommand.play_animation_complete_notify,
+                self._on_animation_complete,
+                timeout=None,
+            )
+
+    def _unsubscribe_animations(self):
+        # called with animation lock
+        if self._animation_futures or self._animation_holders or self._animation_notify is None:
+            return
+        self._animation_notify = None
+        with contextlib.suppress(PySpheroRuntimeError):
+            self.cancel_notify(AnimatronicsCommand.play_animation_complete_notify)
+
+    def _hold_animation_notify(self):
+        """
+        Keep completion subscription until _release_animation_notify, even when no animation is played
+        """
+        with self._animation_lock:
+            self._animation_holders += 1
+            self._subscribe_animations()
+
+    def _release_animation_notify(self):
+        with self._animation_lock:
+            self._animation_holders -= 1
+            self._unsubscribe_animations()
+
+    def play_animation_async(
+            self,
+            animation: Union[int, Enum],
+            target_id=0x12,
+            timeout: Optional[float] = None,
+    ) -> Future:
+        """
+        Start animation without waiting for the end
+
+        :param animation: animation id or animation enum (R2D2Animation, BB9EAnimation, LMQAnimation, ...)
+        :param target_id: processor of toy
+        :param timeout: future fails with PySpheroTimeoutError if animation isn't completed in time
+        :return Future: resolved with animation id by play_animation_complete_notify
+        """
+        key = _animation_key(animation)
+        future = Future()
+        with self._animation_lock:
+            self._subscribe_animations()
+            self._animation_futures.setdefault(key, deque()).append(future)
+
+        try:
+            self.request(
+                AnimatronicsCommand.play_animation,
+                data=[*key],
+                target_id=target_id,
+            )
+        except Exception as e:
+            self._complete_animation(key, future, e)
+            raise
+
+        if timeout is not None:
+            timer = threading.Timer(timeout, self._complete_animation, args=(key, future, PySpheroTimeoutError(
+                f"Animation {animation} isn't completed in {timeout}s"
+            )))
+            timer.daemon = True
+            timer.start()
+            future.add_done_callback(lambda _: timer.cancel())
+
+        return future
 
-        sleep_time = 0.1
-        while self._wait_for_play_animation:
-            timeout -= sleep_time
-            if timeout <= 0:
-                self._wait_for_play_animation = False
-            time.sleep(sleep_time)
+    def play_animation_and_wait(self, animation_id: int, target_id=0x12, timeout: float = 10):
+        """
+        Play animation and wait for the end
 
-        self.cancel_notify()
+        :raise PySpheroTimeoutError: animation isn't completed in time
+        """
+        self.play_animation_async(animation_id, target_id=target_id, timeout=timeout).result()
 
     def perform_leg_action(self, leg_action: R2LegAction):
         self.request(
@@ -320,11 +423,7 @@ class Animatronics(DeviceApiABC):
         )
 
     def set_head_position(self, position: float):
-        self.request(
-            AnimatronicsCommand.set_head_position,
-            data=[*struct.pack("f", position)],
-            target_id=0x12,
-        )
+        self.request_template(self._head_position_template, self._head_position_format.pack(position))
 
     def get_head_position(self) -> float:
         response = self.request(
@@ -366,3 +465,105 @@ class Animatronics(DeviceApiABC):
             target_id=0x12,
         )
         return bool(int.from_bytes(response.data, "big"))
+
+
+class AnimationPlaylist:
+    """
+    Queue of animations. The next animation is started from completion notification
+    of the previous one, so there are no gaps between animations.
+    Completion subscription is kept for the whole playlist, completions are routed by animation id.
+
+    playlist = AnimationPlaylist(sphero.animatronics, R2D2Animation.emote_happy, R2D2Animation.emote_excited)
+    playlist.start()
+    playlist.wait()
+    """
+
+    def __init__(
+            self,
+            animatronics: Animatronics,
+            *animations: Union[int, Enum],
+            timeout: Optional[float] = 10,
+            target_id=0x12,
+    ):
+        """
+        :param animatronics: animatronics api of toy
+        :param animations: animation ids or enums
+        :param timeout: timeout of one animation
+        :param target_id: processor of toy
+        """
+        self.animatronics = animatronics
+        self.timeout = timeout
+        self.target_id = target_id
+        self.played: List[Union[int, Enum]] = []
+
+        self._queue: Deque[Union[int, Enum]] = deque(animations)
+        self._lock = threading.Lock()
+        self._done: Future = Future()
+        self._started = False
+
+    def add(self, *animations: Union[int, Enum]):
+        """
+        Append animations, can be called while playlist is playing
+        """
+        with self._lock:
+            self._queue.extend(animations)
+
+    def start(self) -> Future:
+        """
+        Start playing
+
+        :return Future: resolved with played animations after the last one,
+            fails with error of animation (e.g. PySpheroTimeoutError)
+        """
+        with self._lock:
+            if self._started:
+                return self._done
+            self._started = True
+
+        self.animatronics._hold_animation_notify()
+        self._done.add_done_callback(lambda _: self.animatronics._release_animation_notify())
+        self._play_next()
+        return self._done
+
+    def _play_next(self):
+        with self._lock:
+            if not self._queue:
+                self._done.set_result(list(self.played))
+                return
+            animation = self._queue.popleft()
+
+        try:
+            future = self.animatronics.play_animation_async(animation, self.target_id, self.timeout)
+        except Exception as e:
+            self._done.set_exception(e)
+            return
+
+        future.add_done_callback(lambda f: self._on_done(animation, f))
+
+    def _on_done(self, animation: Union[int, Enum], future: Future):
+        if future.cancelled():
+            self._done.cancel()
+            return
+
+        error = future.exception()
+        if error is not None:
+            self._done.set_exception(error)
+            return
+
+        self.played.append(animation)
+        self._play_next()
+
+    def stop(self):
+        """
+        Don't start queued animations, the current one is finished
+        """
+        with self._lock:
+            self._queue.clear()
+
+    def wait(self, timeout: float = None) -> List[Union[int, Enum]]:
+        """
+        Wait for the end of playlist
+
+        :return: played animations
+        """
+        return self.start().result(timeout)
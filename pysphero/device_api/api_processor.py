@@ -10,10 +10,11 @@ class ApiProcessorCommand(Enum):
 class ApiProcessor(DeviceApiABC):
     device_id = DeviceId.api_processor
 
-    def echo(self):
+    def echo(self, timeout: float = None):
         """
         Send ping
+        :param timeout: timeout waiting for a response (one attempt), adaptive with retries by default
         :return None:
         """
 
-        self.request(ApiProcessorCommand.echo)
+        self.request(ApiProcessorCommand.echo, timeout=timeout)
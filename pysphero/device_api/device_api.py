@@ -1,9 +1,9 @@
 import abc
 from concurrent.futures import Future
 from enum import Enum
-from typing import Callable
+from typing import Callable, Optional
 
-from pysphero.packet import Packet
+from pysphero.packet import Packet, PacketTemplate
 from pysphero.packet import Flag
 
 
@@ -31,9 +31,58 @@ class DeviceApiABC(abc.ABC):
     def __init__(self, ble_adapter):
         self.ble_adapter = ble_adapter
 
-    def request(self, command_id: Enum, timeout: float = 10, raise_api_error: bool = True, **kwargs) -> Packet:
+    def request(
+            self,
+            command_id: Enum,
+            timeout: float = None,
+            raise_api_error: bool = True,
+            durable: bool = False,
+            **kwargs
+    ) -> Packet:
+        """
+        Send request to device
+
+        :param command_id: command of device
+        :param timeout: timeout waiting for a response, adaptive by default
+        :param raise_api_error: raise exception when receive api error
+        :param durable: request changes state of toy which must be restored after reconnect
+        :return Packet: response packet
+        """
+        packet = self.packet(command_id=command_id.value, **kwargs)
+        response = self.ble_adapter.write(
+            packet,
+            raise_api_error=raise_api_error,
+            timeout=timeout,
+        )
+        if durable:
+            self.ble_adapter.remember(packet)
+        return response
+
+    def request_template(
+            self,
+            template: PacketTemplate,
+            data: bytes = b"",
+            timeout: float = None,
+            raise_api_error: bool = True,
+    ) -> Packet:
+        """
+        Send request built by pre-encoded template, see PacketTemplate
+
+        :param template: template of command
+        :param data: data of request
+        :param timeout: timeout waiting for a response, adaptive by default
+        :param raise_api_error: raise exception when receive api error
+        :return Packet: response packet
+        """
+        sequences = getattr(self.ble_adapter, "sequences", None)
+        if sequences is None:
+            packet = template.packet(data)
+        else:
+            packet = template.packet(data, sequences.allocate())
+            sequences.bind(packet)
+
         return self.ble_adapter.write(
-            self.packet(command_id=command_id.value, **kwargs),
+            packet,
             raise_api_error=raise_api_error,
             timeout=timeout,
         )
@@ -42,19 +91,32 @@ class DeviceApiABC(abc.ABC):
             self,
             command_id: Enum,
             callback: Callable,
-            timeout: float = 10,
+            timeout: Optional[float] = 10,
             **kwargs
     ) -> Future:
         return self.ble_adapter.start_notify(
-            self.packet(command_id=command_id.value, **kwargs),
+            # notification is matched only by device and command ids
+            self.packet(command_id=command_id.value, sequence=0x00, **kwargs),
             callback=callback,
             timeout=timeout,
         )
 
-    def cancel_notify(self):
-        self.ble_adapter.stop_notify()
+    def cancel_notify(self, command_id: Enum = None):
+        """
+        Stop notification of command, all notifications by default
+        """
+        packet_id = None if command_id is None else (self.device_id.value, command_id.value)
+        self.ble_adapter.stop_notify(packet_id)
 
     def packet(self, **kwargs):
+        """
+        Create request packet, sequence is allocated by adapter of toy
+        (class-level counter of Packet is used by adapters without allocator)
+        """
+        sequences = getattr(self.ble_adapter, "sequences", None)
+        if sequences is not None and "sequence" not in kwargs:
+            return sequences.packet(device_id=self.device_id.value, **kwargs)
+
         packet = Packet(
             device_id=self.device_id.value,
             **kwargs
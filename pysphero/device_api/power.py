@@ -1,6 +1,10 @@
+import contextlib
 from enum import Enum
+from typing import Callable
 
+from pysphero.exceptions import PySpheroRuntimeError
 from pysphero.helpers import UnknownEnumMixing
+from pysphero.packet import Packet
 
 from .device_api import DeviceApiABC, DeviceId
 
@@ -83,24 +87,26 @@ class Power(DeviceApiABC):
 
         self.request(PowerCommand.wake)
 
-    def get_battery_state_LMQ(self) -> BatteryLMQStates:
+    def get_battery_state_LMQ(self, timeout: float = None) -> BatteryLMQStates:
         """
         Get battery state without known voltage constants
 
+        :param float timeout: timeout waiting for a response, adaptive by default
         :return BatteryVoltageStates:
         """
 
-        response = self.request(PowerCommand.get_battery_state_LMQ, timeout=100)
+        response = self.request(PowerCommand.get_battery_state_LMQ, timeout=timeout)
         return BatteryLMQStates(response.data[0])
 
-    def get_battery_state(self) -> BatteryVoltageStates:
+    def get_battery_state(self, timeout: float = None) -> BatteryVoltageStates:
         """
         Get battery state without known voltage constants
 
+        :param float timeout: timeout waiting for a response, adaptive by default
         :return BatteryVoltageStates:
         """
 
-        response = self.request(PowerCommand.get_battery_state)
+        response = self.request(PowerCommand.get_battery_state, timeout=timeout)
         return BatteryVoltageStates(response.data[0])
 
     def battery_state_changed(self) -> ChargerStates:
@@ -113,10 +119,55 @@ class Power(DeviceApiABC):
         response = self.request(PowerCommand.battery_state_changed)
         return ChargerStates(response.data[0])
 
-    def get_battery_percentage(self) -> int:
+    def get_battery_percentage(self, timeout: float = None) -> int:
         """
         Returns battery percentage
+
+        :param float timeout: timeout waiting for a response, adaptive by default
         """
 
-        response = self.request(PowerCommand.get_battery_percentage, timeout = 1000)
+        response = self.request(PowerCommand.get_battery_percentage, timeout=timeout)
         return response.data[0]
+
+    def enable_battery_state_change_notification(self, enable: bool = True):
+        """
+        Toy sends battery_state_changed when charger is connected or disconnected
+        """
+
+        self.request(PowerCommand.enable_battery_state_change_notification, durable=True, data=[int(enable)])
+
+    def set_battery_state_notify(self, callback: Callable):
+        """
+        Subscribe to changes of charger state
+
+        :param callback: called with ChargerStates for every change
+        """
+        def callback_wrapper(response: Packet):
+            return callback(ChargerStates(response.data[0] if response.data else 0x00))
+
+        self.notify(PowerCommand.battery_state_changed, callback_wrapper, timeout=None)
+        self.enable_battery_state_change_notification()
+
+    def cancel_battery_state_notify(self):
+        try:
+            self.enable_battery_state_change_notification(False)
+        finally:
+            # subscription is stopped also when toy doesn't answer
+            self.cancel_notify(PowerCommand.battery_state_changed)
+
+    def set_sleep_notify(self, will_sleep_callback: Callable = None, sleep_callback: Callable = None):
+        """
+        Subscribe to sleep of toy after inactivity
+
+        :param will_sleep_callback: called without arguments when toy is going to sleep soon
+        :param sleep_callback: called without arguments when toy falls asleep
+        """
+        if will_sleep_callback is not None:
+            self.notify(PowerCommand.will_sleep_async, lambda response: will_sleep_callback(), timeout=None)
+        if sleep_callback is not None:
+            self.notify(PowerCommand.sleep_async, lambda response: sleep_callback(), timeout=None)
+
+    def cancel_sleep_notify(self):
+        for command_id in (PowerCommand.will_sleep_async, PowerCommand.sleep_async):
+            with contextlib.suppress(PySpheroRuntimeError):
+                self.cancel_notify(command_id)
@@ -1,4 +1,9 @@
 from enum import Enum
+from typing import Callable
+
+from pysphero.packet import Packet
+
+from .device_api import DeviceApiABC, DeviceId
 
 
 class SecondaryMcuFirmwareUpdateCommand(Enum):
@@ -16,3 +21,60 @@ class SecondaryMcuFirmwareUpdateCommand(Enum):
     request_application_id = 0x0b
     set_pending_update_flags = 0x0c
     get_pending_update_flags = 0x0d
+
+
+class SecondaryMcuFirmwareUpdate(DeviceApiABC):
+    """
+    Reflash of secondary mcu (target 0x12).
+    Pages are addressed by offset in image: [address uint32 big-endian, page data]
+    """
+    device_id = DeviceId.secondary_mcu_firmware_update_command
+
+    def __init__(self, ble_adapter, on_reflash: Callable[[], None] = None):
+        """
+        :param ble_adapter: adapter of toy
+        :param on_reflash: called when firmware of toy is changed, e.g. to drop cached device info
+        """
+        super().__init__(ble_adapter)
+        self.on_reflash = on_reflash
+
+    def _reflashed(self):
+        if self.on_reflash is not None:
+            self.on_reflash()
+
+    def begin_reflash(self):
+        # firmware is inconsistent from now on, also when update is aborted
+        self._reflashed()
+        self.request(SecondaryMcuFirmwareUpdateCommand.begin_reflash, target_id=0x12)
+
+    def here_is_page_packet(self, address: int, data: bytes) -> Packet:
+        """
+        Request with page, e.g. for BulkTransfer
+        """
+        return self.packet(
+            command_id=SecondaryMcuFirmwareUpdateCommand.here_is_page.value,
+            target_id=0x12,
+            data=[*address.to_bytes(4, "big"), *data],
+        )
+
+    def here_is_page(self, address: int, data: bytes):
+        self.ble_adapter.write(self.here_is_page_packet(address, data))
+
+    def is_page_blank(self, address: int) -> bool:
+        response = self.request(
+            SecondaryMcuFirmwareUpdateCommand.is_page_blank,
+            data=[*address.to_bytes(4, "big")],
+            target_id=0x12,
+        )
+        return bool(response.data[0])
+
+    def erase_user_config(self):
+        self.request(SecondaryMcuFirmwareUpdateCommand.erase_user_config, target_id=0x12)
+
+    def jump_to_main_app(self):
+        self.request(SecondaryMcuFirmwareUpdateCommand.jump_to_main_app, target_id=0x12)
+        # device info read during reflash is outdated too
+        self._reflashed()
+
+    def jump_to_bootloader(self):
+        self.request(SecondaryMcuFirmwareUpdateCommand.jump_to_bootloader, target_id=0x12)
@@ -1,11 +1,22 @@
+import contextlib
+import logging
+import math
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
 from enum import Enum
-from typing import NamedTuple, Callable, Type, Tuple, List
+from typing import NamedTuple, Callable, Type, Tuple, List, Dict, Sequence, Iterator, Optional
 
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError, PySpheroException
 from pysphero.helpers import float_from_bytes, grouper
 from pysphero.packet import Packet
 
 from .device_api import DeviceApiABC, DeviceId
 
+logger = logging.getLogger(__name__)
+
 
 class SensorParameter(NamedTuple):
     flag: int
@@ -26,6 +37,10 @@ class _Sensor(Enum):
         return _mask
 
 
+class _ExtendedSensor(_Sensor):
+    """Parent class for sensors configured by extended streaming mask"""
+
+
 # next sensors class created for Sphero Bolt
 # todo: refactoring this for all Sphero Toys
 class Quaternion(_Sensor):
@@ -69,16 +84,289 @@ class CoreTime(_Sensor):
     core_time = SensorParameter(0x02, 0.0, 0.0)
 
 
-class Gyroscope(_Sensor):
+class Gyroscope(_ExtendedSensor):
     x = SensorParameter(0x2000000, -20000.0, 20000.0)
     y = SensorParameter(0x1000000, -20000.0, 20000.0)
     z = SensorParameter(0x800000, -20000.0, 20000.0)
 
 
-class AmbientLight(_Sensor):
+class AmbientLight(_ExtendedSensor):
     ambient_light = SensorParameter(0x40000, 0.0, 120000.0)
 
 
+def _all_sensors(parent: Type[_Sensor] = _Sensor) -> List[Type[_Sensor]]:
+    sensors = []
+    for sensor in parent.__subclasses__():
+        sensors.append(sensor)
+        sensors.extend(_all_sensors(sensor))
+    return sensors
+
+
+def parameter_name(parameter: Enum) -> str:
+    """
+    Name of sensor parameter, e.g. "Accelerometer.x"
+    """
+    return f"{type(parameter).__name__}.{parameter.name}"
+
+
+def sensor_by_name(name: str) -> Type[_Sensor]:
+    """
+    Sensor class by name, e.g. "Accelerometer" -> Accelerometer
+    """
+    for sensor in _all_sensors():
+        if sensor.__name__ == name:
+            return sensor
+
+    raise KeyError(name)
+
+
+def parameter_by_name(name: str) -> Enum:
+    """
+    Sensor parameter by name, e.g. "Accelerometer.x" -> Accelerometer.x
+    """
+    sensor_name, _, parameter = name.partition(".")
+    for sensor in _all_sensors():
+        if sensor.__name__ == sensor_name:
+            return sensor[parameter]
+
+    raise KeyError(name)
+
+
+class StreamingLayout(NamedTuple):
+    """
+    Masks for set of sensors and order of values in sensor_streaming_data.
+    Values of primary mask go first, then values of extended mask,
+    inside of each mask values are ordered by flag from high to low bit
+    """
+    mask: int
+    extended_mask: int
+    parameters: List[Enum]
+
+    @classmethod
+    def from_sensors(cls, *sensors: Type[_Sensor]) -> "StreamingLayout":
+        mask = 0x0
+        extended_mask = 0x0
+        primary_parameters = []
+        extended_parameters = []
+        for sensor in sensors:
+            if issubclass(sensor, _ExtendedSensor):
+                extended_parameters.extend(parameter for parameter in sensor)
+                extended_mask |= sensor.mask()
+            else:
+                primary_parameters.extend(parameter for parameter in sensor)
+                mask |= sensor.mask()
+
+        parameters = [
+            *sorted(primary_parameters, key=lambda p: p.value.flag, reverse=True),
+            *sorted(extended_parameters, key=lambda p: p.value.flag, reverse=True),
+        ]
+        return cls(mask, extended_mask, parameters)
+
+    def decode(self, data: Sequence[int]) -> Dict[Enum, float]:
+        """
+        Decode data of sensor_streaming_data packet
+
+        :param data: packet data
+        :return: value of every parameter
+        """
+        values = {}
+        for parameter, raw_value in zip(self.parameters, grouper(data, 4, fillvalue=0x00)):
+            value: float = float_from_bytes(raw_value)
+            if parameter.value.modifier:
+                value = parameter.value.modifier(value)
+
+            values[parameter] = value
+
+        return values
+
+
+class SensorSample(NamedTuple):
+    timestamp: float  # host time of receiving
+    values: Dict[Enum, float]
+
+
+class OverflowPolicy(Enum):
+    # receiver waits for consumer. The toy doesn't slow down, meanwhile frames are queued by packet collector
+    # up to its max_pending_notifications, older frames are dropped there and counted in SensorStream.dropped
+    block = "block"
+    drop_oldest = "drop_oldest"
+    drop_newest = "drop_newest"
+
+
+class SensorStream:
+    """
+    Bounded queue of sensor samples between receiver thread and consumer.
+
+    for sample in stream: ...
+    sample = stream.next(timeout=0.5)
+    batch = stream.take(50, timeout=1)
+    """
+
+    def __init__(
+            self,
+            maxsize: int = 256,
+            overflow: OverflowPolicy = OverflowPolicy.drop_oldest,
+            upstream_dropped: Callable[[], int] = None,
+    ):
+        """
+        :param maxsize: size of samples queue
+        :param OverflowPolicy overflow: what to do when consumer is slower than toy
+        :param upstream_dropped: count of frames dropped before they reached the stream
+        """
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.upstream_dropped = upstream_dropped
+        self._dropped = 0
+
+        self._samples = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def dropped(self) -> int:
+        """
+        Count of lost samples, by overflow policy and before the stream (see OverflowPolicy.block)
+        """
+        upstream = 0 if self.upstream_dropped is None else self.upstream_dropped()
+        return self._dropped + upstream
+
+    def put(self, values: Dict[Enum, float], timestamp: float = None):
+        """
+        Add sample according to overflow policy. Called from receiver thread
+        """
+        sample = SensorSample(time.time() if timestamp is None else timestamp, values)
+        with self._condition:
+            if len(self._samples) >= self.maxsize:
+                if self.overflow is OverflowPolicy.block:
+                    self._condition.wait_for(lambda: len(self._samples) < self.maxsize or self._closed)
+                elif self.overflow is OverflowPolicy.drop_oldest:
+                    self._samples.popleft()
+                    self._dropped += 1
+                else:
+                    self._dropped += 1
+                    return
+
+            if self._closed:
+                return
+
+            self._samples.append(sample)
+            self._condition.notify_all()
+
+    def close(self, error: BaseException = None):
+        """
+        Stop stream. Queued samples are still available for consumer
+
+        :param error: reason of stop, raised to consumer after queued samples
+        """
+        with self._condition:
+            self._closed = True
+            self._error = self._error or error
+            self._condition.notify_all()
+
+    def next(self, timeout: float = None) -> SensorSample:
+        """
+        Get next sample
+
+        :param timeout: timeout waiting for a sample, infinite by default
+        :raise PySpheroTimeoutError: when timeout is out
+        :raise StopIteration: when stream is closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._samples or self._closed, timeout):
+                raise PySpheroTimeoutError("Timeout error for sensor sample")
+
+            if self._samples:
+                sample = self._samples.popleft()
+                self._condition.notify_all()
+                return sample
+
+            if self._error is not None:
+                raise self._error
+            raise StopIteration
+
+    def take(self, n: int, timeout: float = None) -> List[SensorSample]:
+        """
+        Get up to n samples. Waits until n samples are received, stream is closed or timeout is out
+
+        :param n: max count of samples
+        :param timeout: timeout waiting for samples, infinite by default
+        :return: list of samples, may be shorter than n
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            def ready():
+                return len(self._samples) >= n or self._closed
+
+            self._condition.wait_for(ready, None if deadline is None else max(deadline - time.monotonic(), 0))
+
+            samples = [self._samples.popleft() for _ in range(min(n, len(self._samples)))]
+            self._condition.notify_all()
+
+        if not samples and self._closed and self._error is not None:
+            raise self._error
+        return samples
+
+    def __iter__(self) -> Iterator[SensorSample]:
+        return self
+
+    def __next__(self) -> SensorSample:
+        return self.next()
+
+
+class CollisionDetectionMethod(Enum):
+    none = 0x00
+    accelerometer = 0x01
+    accelerometer_filtered = 0x02
+    hybrid = 0x03
+
+
+class Collision(NamedTuple):
+    """
+    Collision detected by firmware of toy
+    """
+    acceleration_x: float  # g
+    acceleration_y: float
+    acceleration_z: float
+    x_axis: bool  # threshold of axis was exceeded
+    y_axis: bool
+    power_x: int
+    power_y: int
+    speed: int
+    timestamp: int  # ms, time of toy
+
+    _format = struct.Struct(">hhhBhhBI")
+
+    @classmethod
+    def from_bytes(cls, data: Sequence[int]) -> "Collision":
+        x, y, z, axis, power_x, power_y, speed, timestamp = cls._format.unpack(bytes(data[:cls._format.size]))
+        return cls(
+            acceleration_x=x / 4096,
+            acceleration_y=y / 4096,
+            acceleration_z=z / 4096,
+            x_axis=bool(axis & 0x01),
+            y_axis=bool(axis & 0x02),
+            power_x=power_x,
+            power_y=power_y,
+            speed=speed,
+            timestamp=timestamp,
+        )
+
+    @property
+    def magnitude(self) -> float:
+        """
+        Magnitude of impact acceleration in g
+        """
+        return math.sqrt(self.acceleration_x ** 2 + self.acceleration_y ** 2 + self.acceleration_z ** 2)
+
+
 class SensorCommand(Enum):
     set_sensor_streaming_mask = 0x00
     get_sensor_streaming_mask = 0x01
@@ -105,9 +393,14 @@ class SensorCommand(Enum):
 class Sensor(DeviceApiABC):
     device_id = DeviceId.sensors
 
+    def __init__(self, ble_adapter):
+        super().__init__(ble_adapter)
+        self._extended_mask = 0x0
+
     def _set_sensor_streaming_mask(self, mask, interval: int = 250, count: int = 0):
         self.request(
             command_id=SensorCommand.set_sensor_streaming_mask,
+            durable=True,
             data=[*interval.to_bytes(2, "big"),  # interval
                   count & 0xff,  # count,
                   *mask.to_bytes(4, "big"),  # 0x00, 0x00, 0x80, 0x00  # mask
@@ -115,6 +408,24 @@ class Sensor(DeviceApiABC):
             target_id=0x12,
         )
 
+    def _set_extended_sensor_streaming_mask(self, mask):
+        self.request(
+            command_id=SensorCommand.set_extended_sensor_streaming_mask,
+            durable=True,
+            data=[*mask.to_bytes(4, "big")],
+            target_id=0x12,
+        )
+        self._extended_mask = mask
+
+    def _set_streaming_layout(self, layout: StreamingLayout, interval: int, count: int):
+        """
+        Configure both masks. Streaming is started by primary mask,
+        therefore extended mask is sent before it (only when it was changed)
+        """
+        if layout.extended_mask != self._extended_mask:
+            self._set_extended_sensor_streaming_mask(layout.extended_mask)
+        self._set_sensor_streaming_mask(layout.mask, interval, count)
+
     def set_notify(
             self,
             callback: Callable,
@@ -123,32 +434,146 @@ class Sensor(DeviceApiABC):
             count: int = 0,
             timeout: float = 1,
     ):
-        parameters = []
-        mask = 0x0
-        for sensor in sensors:
-            parameters.extend(parameter for parameter in sensor)
-            mask |= sensor.mask()
+        """
+        Start streaming of sensors. Sensors of primary and extended masks can be mixed
 
-        parameters = sorted(parameters, key=lambda p: p.value.flag, reverse=True)
+        :param callback: called with dict {parameter: value} for every frame
+        :param sensors: sensor classes, e.g. Quaternion, Accelerometer, Gyroscope
+        :param interval: streaming interval in ms
+        :param count: count of frames, 0 is infinite
+        :param timeout: timeout waiting for a frame
+        """
+        layout = StreamingLayout.from_sensors(*sensors)
 
         def callback_wrapper(response: Packet):
-            callback_data = {}
-            for i, data in enumerate(grouper(response.data, 4, fillvalue=0x00)):
-                value: float = float_from_bytes(data)
+            return callback(layout.decode(response.data))
 
-                parameter: Enum = parameters[i]
-                if parameter.value.modifier:
-                    value = parameter.value.modifier(value)
+        self.notify(SensorCommand.sensor_streaming_data, callback_wrapper, timeout=timeout)
+        self._set_streaming_layout(layout, interval, count)
 
-                callback_data[parameter] = value
+    def cancel_notify_sensors(self):
+        self.cancel_notify(SensorCommand.sensor_streaming_data)
 
-            return callback(callback_data)
+    @contextlib.contextmanager
+    def stream(
+            self,
+            *sensors: Type[_Sensor],
+            interval: int = 250,
+            count: int = 0,
+            maxsize: int = 256,
+            overflow: OverflowPolicy = OverflowPolicy.drop_oldest,
+            timeout: float = 1,
+    ) -> Iterator[SensorStream]:
+        """
+        Stream of sensor samples decoupled from receiver thread
+
+        with sphero.sensor.stream(Accelerometer, CoreTime, interval=50) as samples:
+            for sample in samples: ...
+
+        :param sensors: sensor classes
+        :param interval: streaming interval in ms
+        :param count: count of frames, 0 is infinite
+        :param maxsize: size of samples queue
+        :param OverflowPolicy overflow: what to do when consumer is slower than toy
+        :param timeout: timeout waiting for a frame, then stream is closed with PySpheroTimeoutError
+        """
+        layout = StreamingLayout.from_sensors(*sensors)
+        packet_id = (self.device_id.value, SensorCommand.sensor_streaming_data.value)
+        upstream_dropped = None
+        packet_collector = getattr(self.ble_adapter, "packet_collector", None)
+        if packet_collector is not None:
+            dropped_before = packet_collector.dropped_notifications[packet_id]
+
+            def upstream_dropped():
+                return packet_collector.dropped_notifications[packet_id] - dropped_before
+
+        samples = SensorStream(maxsize=maxsize, overflow=overflow, upstream_dropped=upstream_dropped)
 
-        self.notify(SensorCommand.sensor_streaming_data, callback_wrapper, timeout=timeout)
-        self._set_sensor_streaming_mask(mask, interval, count)
+        def callback_wrapper(response: Packet):
+            samples.put(layout.decode(response.data))
+
+        def done(future: Future):
+            error = None if future.cancelled() else future.exception()
+            samples.close(error)
+
+        self.notify(SensorCommand.sensor_streaming_data, callback_wrapper, timeout=timeout).add_done_callback(done)
+        self._set_streaming_layout(layout, interval, count)
+        try:
+            yield samples
+        finally:
+            samples.close()
+            with contextlib.suppress(PySpheroRuntimeError):
+                self.cancel_notify(SensorCommand.sensor_streaming_data)
+            try:
+                self._set_sensor_streaming_mask(0x0)
+            except PySpheroException as e:
+                # e.g. link is lost, error of the stream itself must not be hidden
+                logger.warning(f"Unable to stop sensor streaming: {e}")
+
+    def configure_collision_detection(
+            self,
+            method: CollisionDetectionMethod = CollisionDetectionMethod.accelerometer,
+            x_threshold: int = 100,
+            y_threshold: int = 100,
+            x_speed: int = 100,
+            y_speed: int = 100,
+            dead_time: int = 10,
+    ):
+        """
+        Configure collision detection in firmware of toy
+
+        :param CollisionDetectionMethod method: detection method, none disables detection
+        :param x_threshold: threshold of impact power on x axis (0..255)
+        :param y_threshold: threshold of impact power on y axis (0..255)
+        :param x_speed: threshold is increased by speed of toy with this factor (0..255)
+        :param y_speed: the same for y axis
+        :param dead_time: minimal time between collisions in 10 ms units (0..255)
+        :raise ValueError: parameter doesn't fit into one byte
+        """
+        parameters = {
+            "x_threshold": x_threshold,
+            "y_threshold": y_threshold,
+            "x_speed": x_speed,
+            "y_speed": y_speed,
+            "dead_time": dead_time,
+        }
+        for name, value in parameters.items():
+            if not 0 <= value <= 0xff:
+                raise ValueError(f"{name} must be from 0 to 255, got {value}")
 
-    def cancel_notify_sensors(self):
-        self.cancel_notify()
+        self.request(
+            command_id=SensorCommand.configure_collision_detection,
+            durable=True,
+            data=[method.value, x_threshold, x_speed, y_threshold, y_speed, dead_time],
+            target_id=0x12,
+        )
+
+    def set_collision_notify(self, callback: Callable):
+        """
+        Subscribe to collision events. Detection must be configured by configure_collision_detection.
+        Sensor streaming isn't needed
+
+        :param callback: called with Collision for every event
+        """
+        def callback_wrapper(response: Packet):
+            return callback(Collision.from_bytes(response.data))
+
+        self.notify(SensorCommand.collision_detected_async, callback_wrapper, timeout=None)
+        self.request(
+            command_id=SensorCommand.enable_collision_detected_async,
+            durable=True,
+            data=[0x01],
+            target_id=0x12,
+        )
+
+    def cancel_collision_notify(self):
+        self.request(
+            command_id=SensorCommand.enable_collision_detected_async,
+            durable=True,
+            data=[0x00],
+            target_id=0x12,
+        )
+        self.cancel_notify(SensorCommand.collision_detected_async)
 
     def get_sensor_streaming_mask(self) -> Tuple[int, int, List[SensorParameter]]:
         response = self.request(
@@ -162,12 +587,31 @@ class Sensor(DeviceApiABC):
 
         parameters = []
         for sensor in _Sensor.__subclasses__():
+            if sensor is _ExtendedSensor:
+                continue
+
             for parameter in sensor:
                 if parameter.value.flag & mask:
                     parameters.append(parameter)
 
         return interval, count, parameters
 
+    def get_extended_sensor_streaming_mask(self) -> List[SensorParameter]:
+        response = self.request(
+            command_id=SensorCommand.get_extended_sensor_streaming_mask,
+            target_id=0x12,
+        )
+
+        mask = int.from_bytes(response.data, "big")
+
+        parameters = []
+        for sensor in _ExtendedSensor.__subclasses__():
+            for parameter in sensor:
+                if parameter.value.flag & mask:
+                    parameters.append(parameter)
+
+        return parameters
+
     def get_ambient_light_sensor_value(self) -> float:
         response = self.request(
             command_id=SensorCommand.get_ambient_light_sensor_value,
@@ -1,14 +1,41 @@
+import logging
+import os
 from enum import Enum
-from typing import NamedTuple
+from typing import NamedTuple, Iterator, Union, BinaryIO, Sequence
+
+from pysphero.bulk_transfer import BulkTransfer, Chunk
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.packet import Packet
 
 from .device_api import DeviceApiABC, DeviceId
 
+logger = logging.getLogger(__name__)
+
 
 class Version(NamedTuple):
     major: int
     minor: int
     revision: int
 
+    @classmethod
+    def from_bytes(cls, data: Sequence[int]) -> "Version":
+        return cls(
+            major=int.from_bytes(data[:2], "big"),
+            minor=int.from_bytes(data[2:4], "big"),
+            revision=int.from_bytes(data[4:], "big"),
+        )
+
+
+def mac_address_from_bytes(data: Sequence[int]) -> str:
+    """
+    Mac address is sent as ascii hex digits without separators
+    """
+    return ":".join(chr(b1) + chr(b2) for b1, b2 in zip(data[0::2], data[1::2]))
+
+
+def sku_from_bytes(data: Sequence[int]) -> str:
+    return "".join(chr(b) for b in data)
+
 
 class SystemInfoCommand(Enum):
     get_main_application_version = 0x00
@@ -57,11 +84,7 @@ class SystemInfo(DeviceApiABC):
         """
 
         response = self.request(SystemInfoCommand.get_main_application_version)
-        return Version(
-            major=int.from_bytes(response.data[:2], "big"),
-            minor=int.from_bytes(response.data[2:4], "big"),
-            revision=int.from_bytes(response.data[4:], "big"),
-        )
+        return Version.from_bytes(response.data)
 
     def get_bootloader_version(self) -> Version:
         """
@@ -71,11 +94,17 @@ class SystemInfo(DeviceApiABC):
         """
 
         response = self.request(SystemInfoCommand.get_bootloader_version)
-        return Version(
-            major=int.from_bytes(response.data[:2], "big"),
-            minor=int.from_bytes(response.data[2:4], "big"),
-            revision=int.from_bytes(response.data[4:], "big"),
-        )
+        return Version.from_bytes(response.data)
+
+    def get_secondary_mcu_version(self) -> Version:
+        """
+        Get version of firmware of secondary mcu
+
+        :return Version:
+        """
+
+        response = self.request(SystemInfoCommand.get_secondary_mcu_version, target_id=0x12)
+        return Version.from_bytes(response.data)
 
     def get_mac_address(self) -> str:
         """
@@ -85,7 +114,7 @@ class SystemInfo(DeviceApiABC):
         """
 
         response = self.request(SystemInfoCommand.get_mac_address)
-        return ":".join(chr(b1) + chr(b2) for b1, b2 in zip(response.data[0::2], response.data[1::2]))
+        return mac_address_from_bytes(response.data)
 
     def get_nordic_temperature(self) -> int:
         """
@@ -109,4 +138,112 @@ class SystemInfo(DeviceApiABC):
 
     def get_sku(self) -> str:
         response = self.request(SystemInfoCommand.get_sku, target_id=0x11)
-        return "".join(chr(b) for b in response.data)
+        return sku_from_bytes(response.data)
+
+    def get_log_status(self) -> int:
+        """
+        Size of toy's log
+
+        :return int: size in bytes
+        """
+
+        response = self.request(SystemInfoCommand.get_log_status, target_id=0x11)
+        return int.from_bytes(response.data[:4], "big")
+
+    def get_log_chunk_packet(self, offset: int, size: int) -> Packet:
+        """
+        Request of log chunk, e.g. for BulkTransfer
+        """
+        return self.packet(
+            command_id=SystemInfoCommand.get_log_chunk.value,
+            target_id=0x11,
+            data=[*offset.to_bytes(4, "big"), *size.to_bytes(2, "big")],
+        )
+
+    def get_log_chunk(self, offset: int, size: int) -> bytes:
+        """
+        :raise PySpheroRuntimeError: toy sent less than size bytes
+        """
+        response = self.ble_adapter.write(self.get_log_chunk_packet(offset, size))
+        data = bytes(response.data)
+        if len(data) < size:
+            raise PySpheroRuntimeError(f"Log chunk at {offset} is short: {len(data)} of {size} bytes")
+        return data
+
+    def clear_log(self):
+        self.request(SystemInfoCommand.clear_log, target_id=0x11)
+
+    def iter_log(self, offset: int = 0, chunk_size: int = 128, window: int = 8) -> Iterator[bytes]:
+        """
+        Read log with several chunk requests in flight, chunks are yielded in order of log
+
+        :param offset: start of reading, e.g. to resume interrupted download
+        :param chunk_size: bytes in one request
+        :param window: requests in flight
+        :raise PySpheroRuntimeError: chunk is still short after retries
+        """
+        size = self.get_log_status()
+        chunks = [
+            Chunk(position, min(chunk_size, size - position))
+            for position in range(offset, size, chunk_size)
+        ]
+        engine = BulkTransfer(
+            self.ble_adapter,
+            lambda chunk: self.get_log_chunk_packet(chunk.offset, chunk.size),
+            window=window,
+        )
+
+        # retransmitted chunks are acknowledged out of order
+        received = {}
+        next_chunk = 0
+        for chunk, response in engine.iter_transfer(chunks):
+            data = bytes(response.data)
+            for attempt in range(engine.retries):
+                if len(data) >= chunk.size:
+                    break
+                logger.debug(f"Request short log chunk at {chunk.offset} again ({attempt + 1}/{engine.retries})")
+                data = bytes(self.ble_adapter.write(self.get_log_chunk_packet(chunk.offset, chunk.size)).data)
+            if len(data) < chunk.size:
+                raise PySpheroRuntimeError(f"Log chunk at {chunk.offset} is short: {len(data)} of {chunk.size} bytes")
+            received[chunk.offset] = data
+            while next_chunk < len(chunks) and chunks[next_chunk].offset in received:
+                yield received.pop(chunks[next_chunk].offset)
+                next_chunk += 1
+
+    def download_log(
+            self,
+            destination: Union[str, BinaryIO],
+            offset: int = 0,
+            chunk_size: int = 128,
+            window: int = 8,
+    ) -> int:
+        """
+        Save log to file. With offset the file is continued from this position,
+        a missing file is downloaded from the beginning.
+        Offset after the end of file is moved back to the end of file.
+        Non-seekable stream (pipe, socket) gets data from offset as it is
+
+        :param destination: path or binary file
+        :param offset: start of reading, e.g. size of partially downloaded file
+        :param chunk_size: bytes in one request
+        :param window: requests in flight
+        :return int: count of written bytes
+        """
+        if isinstance(destination, (str, os.PathLike)):
+            if offset and not os.path.exists(destination):
+                offset = 0
+            with open(destination, "r+b" if offset else "wb") as f:
+                return self.download_log(f, offset, chunk_size, window)
+
+        seekable = destination.seekable()
+        if seekable:
+            # resume after the end of file would leave a hole of zeros
+            offset = min(offset, destination.seek(0, os.SEEK_END))
+            destination.seek(offset)
+        written = 0
+        for data in self.iter_log(offset, chunk_size, window):
+            destination.write(data)
+            written += len(data)
+        if seekable:
+            destination.truncate()
+        return written
@@ -4,7 +4,7 @@ from pysphero.packet import Flag
 from typing import Callable
 
 from .device_api import DeviceApiABC, DeviceId
-from pysphero.packet import Packet
+from pysphero.packet import Packet, PacketTemplate
 
 
 class Color(NamedTuple):
@@ -89,6 +89,12 @@ class UserIOCommand(Enum):
 class UserIO(DeviceApiABC):
     device_id = DeviceId.user_io
 
+    _led_matrix_pixel_template = PacketTemplate(
+        DeviceId.user_io.value,
+        UserIOCommand.set_led_matrix_pixel.value,
+        target_id=0x12,
+    )
+
     def set_all_leds_8_bit_mask(
             self,
             front_color: Color = Color(),
@@ -107,6 +113,7 @@ class UserIO(DeviceApiABC):
         leds = Led.all.value
         self.request(
             command_id=UserIOCommand.set_all_leds_8_bit_mask,
+            durable=True,
             data=[leds, *front_color.to_list(), *back_color.to_list()],
             target_id=0x11,
         )
@@ -120,6 +127,7 @@ class UserIO(DeviceApiABC):
         """
         self.request(
             command_id=UserIOCommand.set_led_matrix_one_color,
+            durable=True,
             data=color.to_list(),
             target_id=0x12,
         )
@@ -132,10 +140,9 @@ class UserIO(DeviceApiABC):
         :param Color color:
         :return:
         """
-        self.request(
-            command_id=UserIOCommand.set_led_matrix_pixel,
-            data=[*pixel.to_list(), *color.to_list()],
-            target_id=0x12,
+        self.request_template(
+            self._led_matrix_pixel_template,
+            bytes((pixel.x & 0x07, pixel.y & 0x07, color.red & 0xff, color.green & 0xff, color.blue & 0xff)),
         )
 
     def set_led_matrix_single_character(self, symbol: str, color: Color):
@@ -184,6 +191,7 @@ class UserIO(DeviceApiABC):
     def set_led_matrix_frame_rotation(self, rotation: FrameRotation = FrameRotation.normal):
         self.request(
             command_id=UserIOCommand.set_led_matrix_frame_rotation,
+            durable=True,
             data=[rotation.value],
             target_id=0x11,
         )
@@ -200,22 +208,25 @@ class UserIO(DeviceApiABC):
         if state == True:
             self.notify(UserIOCommand.cap_touch_indication, callback_wrapper)
         else:
-            self.cancel_notify()
+            self.cancel_notify(UserIOCommand.cap_touch_indication)
 
         self.request(
             command_id=UserIOCommand.cap_touch_enable,
+            durable=True,
             data=[int(state)]
         )
 
     def set_headlights(self, value: int):
             self.request(
             command_id=UserIOCommand.set_headlights,
+            durable=True,
             data=[int(value)]
         )
 
     def set_taillights(self, value: int):
             self.request(
             command_id=UserIOCommand.set_taillights,
+            durable=True,
             data=[int(value)]
         )
 
@@ -0,0 +1,109 @@
+"""
+Device info which doesn't change during connection (versions, mac address, sku, stats id).
+
+Values are read by one pipelined burst of requests and cached by Sphero,
+optionally in json file by mac address of toy for startup without requests:
+
+{
+    "aa:bb:cc:dd:ee:ff": {
+        "mac_address": "aa:bb:cc:dd:ee:ff",
+        "main_application_version": [major, minor, revision],
+        "bootloader_version": [major, minor, revision],
+        "sku": "...",
+        "stats_id": 0
+    }
+}
+"""
+
+import logging
+import os
+from typing import NamedTuple, Optional
+
+from pysphero.batch import Batch
+from pysphero.device_api.system_info import SystemInfoCommand, Version, mac_address_from_bytes, sku_from_bytes
+from pysphero.helpers import JsonFileCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".pysphero", "device_info.json")
+
+
+class DeviceInfo(NamedTuple):
+    mac_address: str
+    main_application_version: Version
+    bootloader_version: Version
+    sku: str
+    stats_id: int
+
+    def to_json(self) -> dict:
+        return {
+            "mac_address": self.mac_address,
+            "main_application_version": list(self.main_application_version),
+            "bootloader_version": list(self.bootloader_version),
+            "sku": self.sku,
+            "stats_id": self.stats_id,
+        }
+
+    @classmethod
+    def from_json(cls, entry: dict) -> "DeviceInfo":
+        return cls(
+            mac_address=entry["mac_address"],
+            main_application_version=Version(*entry["main_application_version"]),
+            bootloader_version=Version(*entry["bootloader_version"]),
+            sku=entry["sku"],
+            stats_id=entry["stats_id"],
+        )
+
+
+def read_device_info(ble_adapter) -> DeviceInfo:
+    """
+    Read all values by requests in flight at once, one round trip instead of one per value
+
+    :raise PySpheroException: any request failed
+    """
+    with Batch(ble_adapter) as batch:
+        system_info = batch.system_info
+        system_info.request(SystemInfoCommand.get_mac_address)
+        system_info.request(SystemInfoCommand.get_main_application_version)
+        system_info.request(SystemInfoCommand.get_bootloader_version)
+        system_info.request(SystemInfoCommand.get_sku, target_id=0x11)
+        system_info.request(SystemInfoCommand.get_stats_id, target_id=0x11)
+
+    mac_address, main_version, bootloader_version, sku, stats_id = (
+        future.result().data for future in batch.futures
+    )
+    return DeviceInfo(
+        mac_address=mac_address_from_bytes(mac_address),
+        main_application_version=Version.from_bytes(main_version),
+        bootloader_version=Version.from_bytes(bootloader_version),
+        sku=sku_from_bytes(sku),
+        stats_id=int.from_bytes(stats_id, "big"),
+    )
+
+
+class DeviceInfoCache(JsonFileCache):
+    """
+    Json file of device info by mac address.
+    Entry of toy must be invalidated when its firmware is updated
+    """
+    description = "Device info cache"
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        super().__init__(path)
+
+    def get(self, mac_address: str) -> Optional[DeviceInfo]:
+        entry = self._entry(mac_address)
+        if entry is None:
+            return None
+
+        try:
+            return DeviceInfo.from_json(entry)
+        except (KeyError, TypeError):
+            logger.warning(f"Device info of {mac_address} in {self.path} is damaged and ignored")
+            return None
+
+    def put(self, mac_address: str, info: DeviceInfo):
+        self._update(mac_address, info.to_json())
+
+    def invalidate(self, mac_address: str):
+        self._update(mac_address, None)
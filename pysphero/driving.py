@@ -1,7 +1,14 @@
+import logging
+import struct
+import threading
 from enum import Enum
+from typing import NamedTuple, Iterable, Optional
 
 from pysphero.device_api import DeviceApiABC, DeviceId
-from pysphero.packet import Flag
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError, PySpheroException
+from pysphero.packet import Flag, Packet, PacketTemplate
+
+logger = logging.getLogger(__name__)
 
 
 class Direction(Enum):
@@ -42,28 +49,62 @@ class DrivingCommand(Enum):
     rc_car_drive = 0x09
     drive_to_position = 0x0a
     set_stabilization = 0x0c
+    # value from spherov2 library (xy_position_drive_result_notify)
+    drive_to_position_result_notify = 0x3a
+
+
+class Waypoint(NamedTuple):
+    """
+    Target of drive_to_position, coordinates of locator
+    """
+    x: float
+    y: float
+    yaw: float = 0.0  # final heading in degrees
+    speed: float = 0.5  # linear speed, m/s
+    flags: int = 0x00
 
 
 class Driving(DeviceApiABC):
     device_id = DeviceId.driving
 
-    def drive_with_heading(self, speed: int, heading: int, direction: Direction = Direction.forward):
+    _drive_to_position_format = struct.Struct(">ffffB")
+
+    _drive_with_heading_format = struct.Struct(">BHB")
+    # by wait_response
+    _drive_with_heading_templates = {
+        wait_response: PacketTemplate(
+            DeviceId.driving.value,
+            DrivingCommand.drive_with_heading.value,
+            target_id=0x12,
+            flags=(
+                Flag.command_has_target_id.value
+                | Flag.resets_inactivity_timeout.value
+                | (Flag.requests_response.value if wait_response else 0)
+            ),
+        )
+        for wait_response in (True, False)
+    }
+    _raw_motor_format = struct.Struct(">BBBB")
+    _raw_motor_template = PacketTemplate(DeviceId.driving.value, DrivingCommand.raw_motor.value, target_id=0x12)
+
+    def drive_with_heading(
+            self,
+            speed: int,
+            heading: int,
+            direction: Direction = Direction.forward,
+            wait_response: bool = True,
+    ):
         """
 
         :param int speed: speed from 0 to 255
         :param int heading: heading from 0 to 360
         :param Direction direction: motor rotation direction
+        :param bool wait_response: without response the call doesn't wait for the toy (e.g. in control loops)
         :return:
         """
-        speed &= 0xff
-        heading = heading.to_bytes(2, "big")
-        direction = direction.value
-
-        self.request(
-            DrivingCommand.drive_with_heading,
-            target_id=0x12,
-            data=[speed, *heading, direction],
-            flags=Flag.requests_response.value | Flag.command_has_target_id.value | Flag.resets_inactivity_timeout.value
+        self.request_template(
+            self._drive_with_heading_templates[wait_response],
+            self._drive_with_heading_format.pack(speed & 0xff, heading, direction.value),
         )
 
     def set_stabilization(self, stabilization_index: StabilizationIndex):
@@ -75,6 +116,7 @@ class Driving(DeviceApiABC):
         """
         self.request(
             DrivingCommand.set_stabilization,
+            durable=True,
             target_id=0x12,
             data=[stabilization_index.value],
         )
@@ -98,16 +140,12 @@ class Driving(DeviceApiABC):
         :return:
 
         """
-        left_direction = left_direction.value
-        right_direction = right_direction.value
-
-        self.request(
-            DrivingCommand.raw_motor,
-            target_id=0x12,
-            data=[
-                left_direction, left_speed & 0xff,
-                right_direction, right_speed & 0xff,
-            ],
+        self.request_template(
+            self._raw_motor_template,
+            self._raw_motor_format.pack(
+                left_direction.value, left_speed & 0xff,
+                right_direction.value, right_speed & 0xff,
+            ),
         )
 
     def reset_yaw(self):
@@ -161,3 +199,71 @@ class Driving(DeviceApiABC):
             data=[*steering.to_bytes(4, "big"), *direction.to_bytes(4, "big")],
             flags=Flag.resets_inactivity_timeout.value
         )
+
+    def drive_to_position(self, yaw: float, x: float, y: float, speed: float, flags: int = 0x00):
+        """
+        Drive to position of locator, the toy controls the trajectory itself.
+        Arrival is reported by DrivingCommand.drive_to_position_result_notify
+
+        :param float yaw: final heading in degrees
+        :param float x: target x of locator
+        :param float y: target y of locator
+        :param float speed: linear speed, m/s
+        :param int flags: drive flags of firmware
+        :return:
+        """
+        self.request(
+            DrivingCommand.drive_to_position,
+            target_id=0x12,
+            data=[*self._drive_to_position_format.pack(yaw, x, y, speed, flags)],
+            flags=Flag.requests_response.value | Flag.command_has_target_id.value | Flag.resets_inactivity_timeout.value
+        )
+
+    def follow_trajectory(self, waypoints: Iterable[Waypoint], leg_timeout: Optional[float] = 30) -> int:
+        """
+        Drive through waypoints one by one. The next waypoint is sent
+        when the toy notifies that the previous one is reached.
+        When a leg times out or fails, the toy is stopped before the error is raised
+
+        :param waypoints: targets of trajectory
+        :param leg_timeout: timeout of driving to one waypoint, None is infinite
+        :return int: count of reached waypoints
+        """
+        results = []
+        arrived = threading.Event()
+
+        def on_result(response: Packet):
+            results.append(bool(response.data and response.data[0]))
+            arrived.set()
+
+        self.notify(DrivingCommand.drive_to_position_result_notify, on_result, timeout=None, target_id=0x12)
+        reached = 0
+        driving_to: Optional[Waypoint] = None
+        try:
+            for waypoint in waypoints:
+                arrived.clear()
+                results.clear()
+                driving_to = waypoint
+                self.drive_to_position(waypoint.yaw, waypoint.x, waypoint.y, waypoint.speed, waypoint.flags)
+                if not arrived.wait(leg_timeout):
+                    raise PySpheroTimeoutError(f"Waypoint {waypoint} isn't reached in {leg_timeout}s")
+                if not results[-1]:
+                    raise PySpheroRuntimeError(f"Toy failed to drive to {waypoint}")
+
+                reached += 1
+                logger.debug(f"Reached {waypoint} ({reached})")
+        except BaseException:
+            # toy would keep driving to the last waypoint
+            if driving_to is not None:
+                self._stop(driving_to)
+            raise
+        finally:
+            self.cancel_notify(DrivingCommand.drive_to_position_result_notify)
+
+        return reached
+
+    def _stop(self, waypoint: Waypoint):
+        try:
+            self.drive_with_heading(0, int(waypoint.yaw) % 360)
+        except PySpheroException as e:
+            logger.warning(f"Unable to stop on the way to {waypoint}: {e}")
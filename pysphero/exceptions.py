@@ -20,3 +20,9 @@ class PySpheroApiError(PySpheroException):
 
 class PySpheroNotFoundError(PySpheroException):
     ...
+
+
+class PySpheroConnectionLostError(PySpheroException):
+    """
+    Connection was lost while request was in flight. Request can be repeated after reconnect
+    """
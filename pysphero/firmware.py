@@ -0,0 +1,212 @@
+"""
+Differential flashing of secondary mcu firmware.
+
+Image is split into pages, only pages which differ from pages known to be on the toy are sent.
+Known pages are stored in a json cache by mac address of toy:
+
+{
+    "aa:bb:cc:dd:ee:ff": {
+        "version": [major, minor, revision],
+        "page_size": 256,
+        "pages": ["<sha256 of page>", ...]
+    }
+}
+
+Cache entry is used only if secondary mcu reports the same version,
+otherwise pages of the toy are unknown and only blank pages are skipped (is_page_blank).
+Toy is queried only after begin_reflash, inside of reflash session.
+
+Known pages after the end of a shorter image are overwritten by blank pages.
+When pages of the toy are unknown, the page after the end of image must be blank,
+otherwise the toy may have a longer image and flashing is rejected
+"""
+
+import hashlib
+import logging
+import os
+from typing import List, NamedTuple, Optional
+
+from pysphero.bulk_transfer import BulkTransfer, Chunk, TransferStats
+from pysphero.device_api import Version
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.helpers import JsonFileCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".pysphero", "firmware.json")
+
+
+def page_hashes(image: bytes, page_size: int) -> List[str]:
+    return [
+        hashlib.sha256(image[offset:offset + page_size]).hexdigest()
+        for offset in range(0, len(image), page_size)
+    ]
+
+
+def _is_blank(page: bytes) -> bool:
+    return page.count(0xff) == len(page)
+
+
+def _blank_page(page_size: int) -> bytes:
+    return b"\xff" * page_size
+
+
+class ToyImage(NamedTuple):
+    """
+    Firmware known to be on the toy
+    """
+    version: Version
+    page_size: int
+    pages: List[str]
+
+
+class FirmwareCache(JsonFileCache):
+    """
+    On-disk cache of firmware images of toys by mac address
+    """
+    description = "Firmware cache"
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        super().__init__(path)
+
+    def get(self, mac_address: str) -> Optional[ToyImage]:
+        entry = self._entry(mac_address)
+        if entry is None:
+            return None
+        return ToyImage(Version(*entry["version"]), entry["page_size"], entry["pages"])
+
+    def put(self, mac_address: str, image: ToyImage):
+        self._update(mac_address, {
+            "version": list(image.version),
+            "page_size": image.page_size,
+            "pages": image.pages,
+        })
+
+    def invalidate(self, mac_address: str):
+        self._update(mac_address, None)
+
+
+class FlashResult(NamedTuple):
+    pages: int
+    sent: int
+    skipped: int
+    user_config_erased: bool
+    stats: TransferStats
+
+
+class DifferentialFlasher:
+    """
+    Update secondary mcu firmware sending only changed pages
+
+    flasher = DifferentialFlasher(sphero)
+    result = flasher.flash(image, Version(4, 2, 1))
+    print(f"{result.sent} of {result.pages} pages sent")
+    """
+
+    def __init__(self, sphero, cache: FirmwareCache = None, page_size: int = 256, window: int = 8):
+        """
+        :param Sphero sphero: toy
+        :param cache: cache of known images, ~/.pysphero/firmware.json by default
+        :param page_size: size of flash page
+        :param window: pages in flight
+        """
+        self.sphero = sphero
+        self.cache = cache or FirmwareCache()
+        self.page_size = page_size
+        self.window = window
+
+    def _changed_pages(self, image: bytes, hashes: List[str], known: Optional[ToyImage]) -> List[Chunk]:
+        firmware_update = self.sphero.secondary_mcu_firmware_update
+        chunks = []
+        for number, page_hash in enumerate(hashes):
+            offset = number * self.page_size
+            page = image[offset:offset + self.page_size]
+            if known is not None:
+                if number < len(known.pages) and known.pages[number] == page_hash:
+                    continue
+            elif _is_blank(page) and firmware_update.is_page_blank(offset):
+                continue
+
+            chunks.append(Chunk(offset, len(page), page))
+        return chunks
+
+    def _stale_pages(self, hashes: List[str], known: Optional[ToyImage]) -> List[Chunk]:
+        """
+        Blank pages over old pages after the end of image
+
+        :raise PySpheroRuntimeError: pages of the toy are unknown and the page after image isn't blank
+        """
+        end = len(hashes) * self.page_size
+        if known is None:
+            if not self.sphero.secondary_mcu_firmware_update.is_page_blank(end):
+                raise PySpheroRuntimeError(
+                    f"Firmware on the toy may be longer than image of {end} bytes, flash image of full size"
+                )
+            return []
+
+        blank = _blank_page(self.page_size)
+        blank_hash = hashlib.sha256(blank).hexdigest()
+        return [
+            Chunk(number * self.page_size, self.page_size, blank)
+            for number in range(len(hashes), len(known.pages))
+            if known.pages[number] != blank_hash
+        ]
+
+    def flash(self, image: bytes, version: Version, erase_user_config: bool = None) -> FlashResult:
+        """
+        :param image: firmware image
+        :param version: version of image
+        :param erase_user_config: erase user config of toy, by default only when major version is changed
+        """
+        if not image:
+            raise PySpheroRuntimeError("Firmware image is empty")
+
+        mac_address = self.sphero.device_info.mac_address
+        current_version = self.sphero.system_info.get_secondary_mcu_version()
+        known = self.cache.get(mac_address)
+        if known is not None and (known.version != current_version or known.page_size != self.page_size):
+            logger.info(f"Cached firmware of {mac_address} is outdated ({known.version}, toy has {current_version})")
+            known = None
+
+        if erase_user_config is None:
+            erase_user_config = current_version.major != version.major
+
+        hashes = page_hashes(image, self.page_size)
+        firmware_update = self.sphero.secondary_mcu_firmware_update
+        firmware_update.begin_reflash()
+        try:
+            # pages are queried inside of reflash session
+            chunks = self._changed_pages(image, hashes, known)
+            stale = self._stale_pages(hashes, known)
+        except BaseException:
+            # nothing is written yet, the old firmware is started again
+            firmware_update.jump_to_main_app()
+            raise
+        logger.info(
+            f"Flash {version} to {mac_address}: {len(chunks)} of {len(hashes)} pages changed, "
+            f"{len(stale)} old pages blanked"
+        )
+
+        # pages of toy are unknown until the end of update
+        self.cache.invalidate(mac_address)
+        if erase_user_config:
+            firmware_update.erase_user_config()
+
+        engine = BulkTransfer(
+            self.sphero.ble_adapter,
+            lambda chunk: firmware_update.here_is_page_packet(chunk.offset, chunk.data),
+            window=self.window,
+        )
+        stats = engine.transfer(chunks + stale)
+        # device info of toy is invalidated by firmware update api
+        firmware_update.jump_to_main_app()
+
+        blank_hash = hashlib.sha256(_blank_page(self.page_size)).hexdigest()
+        self.cache.put(mac_address, ToyImage(version, self.page_size, hashes + [blank_hash] * len(stale)))
+        return FlashResult(
+            pages=len(hashes),
+            sent=len(chunks) + len(stale),
+            skipped=len(hashes) - len(chunks),
+            user_config_erased=erase_user_config,
+            stats=stats,
+        )
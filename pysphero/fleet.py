@@ -0,0 +1,455 @@
+"""
+Fleet of toys with process per toy.
+
+Every toy is handled by its own worker process (adapter threads, packet parsing, decoding of sensors),
+so telemetry of many toys is decoded on many cores. Commands are sent to worker by pipe,
+decoded sensor frames are published into shared memory ring which parent reads without pickling.
+
+Sample ring structure (native byte order):
+---------------------------------
+- head         [8 byte]  count of written records
+- sequences    [8 byte * capacity]  record number + 1 of slot, zero while slot is written
+- timestamps   [8 byte * capacity]  host time, double
+- columns      [4 byte * capacity]  float of every parameter, NaN when value is missing
+---------------------------------
+Record number n is in slot n % capacity. Slot is consistent when its sequence is n + 1
+before and after reading of values.
+"""
+
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+from enum import Enum
+from itertools import count
+from multiprocessing.connection import Connection
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from pysphero.device_api.sensor import StreamingLayout, SensorSample, _Sensor
+from pysphero.exceptions import PySpheroRuntimeError, PySpheroException
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # python < 3.8
+    SharedMemory = None
+
+logger = logging.getLogger(__name__)
+
+_HEADER_SIZE = 64
+
+
+class SampleRing:
+    """
+    Shared memory ring of decoded sensor frames with one writer (worker) and any readers.
+    Writer never waits for readers, reader detects records overwritten during reading
+
+    ring = SampleRing.create([Accelerometer.x, Accelerometer.y], capacity=1024)
+    worker_ring = SampleRing.attach(ring.name, ring.parameters, ring.capacity)
+    """
+
+    def __init__(self, shm: "SharedMemory", parameters: Sequence[Enum], capacity: int, owner: bool):
+        self.shm = shm
+        self.parameters = list(parameters)
+        self.capacity = capacity
+        self.owner = owner
+
+        buffer = shm.buf
+        self._head = buffer[:8].cast("Q")
+        offset = _HEADER_SIZE
+        self._sequences = buffer[offset:offset + 8 * capacity].cast("Q")
+        offset += 8 * capacity
+        self._timestamps = buffer[offset:offset + 8 * capacity].cast("d")
+        offset += 8 * capacity
+        self._columns = []
+        for _ in self.parameters:
+            self._columns.append(buffer[offset:offset + 4 * capacity].cast("f"))
+            offset += 4 * capacity
+        self._positions = {parameter: i for i, parameter in enumerate(self.parameters)}
+
+    @staticmethod
+    def size(parameters: Sequence[Enum], capacity: int) -> int:
+        return _HEADER_SIZE + capacity * (16 + 4 * len(parameters))
+
+    @staticmethod
+    def _shared_memory() -> Type["SharedMemory"]:
+        if SharedMemory is None:
+            raise PySpheroException("Sample ring requires Python 3.8+ (multiprocessing.shared_memory)")
+        return SharedMemory
+
+    @classmethod
+    def create(cls, parameters: Sequence[Enum], capacity: int = 1024) -> "SampleRing":
+        if capacity < 1:
+            raise ValueError("Capacity must be positive")
+
+        shm = cls._shared_memory()(create=True, size=cls.size(parameters, capacity))
+        shm.buf[:cls.size(parameters, capacity)] = bytes(cls.size(parameters, capacity))
+        return cls(shm, parameters, capacity, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, parameters: Sequence[Enum], capacity: int) -> "SampleRing":
+        return cls(cls._shared_memory()(name=name), parameters, capacity, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        """
+        Count of written records, the next record number
+        """
+        return self._head[0]
+
+    def append(self, values: Dict[Enum, float], timestamp: float = None):
+        """
+        Write frame. Called by the only writer
+        """
+        number = self._head[0]
+        slot = number % self.capacity
+        self._sequences[slot] = 0
+        self._timestamps[slot] = time.time() if timestamp is None else timestamp
+        for parameter, column in zip(self.parameters, self._columns):
+            column[slot] = values.get(parameter, float("nan"))
+
+        # publish after values
+        self._sequences[slot] = number + 1
+        self._head[0] = number + 1
+
+    def get(self, number: int) -> Optional[SensorSample]:
+        """
+        Record by number, None when it isn't written yet or is already overwritten
+        """
+        slot = number % self.capacity
+        if self._sequences[slot] != number + 1:
+            return None
+
+        timestamp = self._timestamps[slot]
+        values = {}
+        for parameter, column in zip(self.parameters, self._columns):
+            value = column[slot]
+            if value == value:  # skip NaN
+                values[parameter] = value
+
+        if self._sequences[slot] != number + 1:
+            return None
+        return SensorSample(timestamp, values)
+
+    def read(self, start: int) -> Tuple[List[SensorSample], int]:
+        """
+        Records written since start. Overwritten records are skipped
+
+        :param start: number of the first record, e.g. returned by the previous read
+        :return: samples and number of the next record
+        """
+        head = self.head
+        start = max(start, head - self.capacity)
+        samples = []
+        for number in range(start, head):
+            sample = self.get(number)
+            if sample is not None:
+                samples.append(sample)
+        return samples, head
+
+    def latest(self) -> Optional[SensorSample]:
+        head = self.head
+        return self.get(head - 1) if head else None
+
+    def column(self, parameter: Enum) -> memoryview:
+        """
+        View of values of parameter without copying, record n is at n % capacity.
+        View must be released before closing of ring
+        """
+        return self._columns[self._positions[parameter]]
+
+    def timestamps(self) -> memoryview:
+        return self._timestamps
+
+    def close(self):
+        for view in (self._head, self._sequences, self._timestamps, *self._columns):
+            view.release()
+        self._columns = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ToyConfig(NamedTuple):
+    mac_address: str
+    sensors: Tuple[Type[_Sensor], ...] = ()
+    interval: int = 50  # streaming interval in ms
+    capacity: int = 1024  # records of sample ring
+    ble_adapter_cls: Optional[type] = None  # BleAdapter by default
+
+
+class _Call(NamedTuple):
+    call_id: int
+    method: str  # e.g. "driving.drive_with_heading"
+    args: tuple
+    kwargs: dict
+
+
+def _resolve(sphero, method: str):
+    target = sphero
+    for name in method.split("."):
+        if name.startswith("_"):
+            raise PySpheroRuntimeError(f"Private method {method} can't be called")
+        target = getattr(target, name)
+    return target
+
+
+def _worker_main(config: ToyConfig, ring_name: str, connection, stop):
+    """
+    Entry point of worker process
+    """
+    from pysphero.core import Sphero
+
+    kwargs = {} if config.ble_adapter_cls is None else {"ble_adapter_cls": config.ble_adapter_cls}
+    layout = StreamingLayout.from_sensors(*config.sensors)
+    ring = SampleRing.attach(ring_name, layout.parameters, config.capacity)
+    try:
+        with Sphero(config.mac_address, **kwargs) as sphero:
+            if config.sensors:
+                sphero.sensor.set_notify(ring.append, *config.sensors, interval=config.interval, timeout=None)
+
+            while not stop.is_set():
+                if not connection.poll(0.1):
+                    continue
+
+                call: _Call = connection.recv()
+                try:
+                    value = _resolve(sphero, call.method)(*call.args, **call.kwargs)
+                except Exception as e:
+                    result = (call.call_id, False, e)
+                else:
+                    result = (call.call_id, True, value)
+
+                try:
+                    connection.send(result)
+                except (TypeError, AttributeError, pickle.PicklingError) as e:
+                    connection.send((call.call_id, False, PySpheroRuntimeError(f"Result of {call.method}: {e}")))
+    except EOFError:
+        logger.debug(f"Fleet of {config.mac_address} is gone")
+    finally:
+        ring.close()
+
+
+class ToyWorker:
+    """
+    Worker process of one toy as seen by parent.
+    Every process has its own pipe, so killed worker can't leave locked queue for the next one
+    """
+
+    def __init__(self, fleet: "Fleet", config: ToyConfig):
+        self.fleet = fleet
+        self.config = config
+        self.telemetry = SampleRing.create(
+            StreamingLayout.from_sensors(*config.sensors).parameters,
+            capacity=config.capacity,
+        )
+        self.restarts = 0
+        self.process: Optional[multiprocessing.Process] = None
+        self.connection: Optional[Connection] = None
+        self._receiver: Optional[threading.Thread] = None
+
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def mac_address(self) -> str:
+        return self.config.mac_address
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        connection, child_connection = self.fleet.context.Pipe()
+        self.process = self.fleet.context.Process(
+            target=_worker_main,
+            args=(self.config, self.telemetry.name, child_connection, self.fleet._stop),
+            name=f"sphero-{self.mac_address}",
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        with self._lock:
+            self.connection = connection
+
+        # receiver of every process reads only its own pipe, results of the next process aren't taken by it
+        self._receiver = threading.Thread(
+            target=self._receive,
+            args=(connection,),
+            name=f"fleet-results-{self.mac_address}",
+            daemon=True,
+        )
+        self._receiver.start()
+
+    def call(self, method: str, *args, **kwargs) -> Future:
+        """
+        Call method of Sphero in worker, result of call is pickled
+
+        worker.call("driving.drive_with_heading", 50, 90).result()
+
+        :param method: dotted path of method from Sphero
+        :return Future: result of method
+        """
+        future = Future()
+        call_id = next(self.fleet._call_ids)
+        with self._lock:
+            if self.connection is None:
+                future.set_exception(PySpheroRuntimeError(f"Worker of {self.mac_address} isn't running"))
+                return future
+
+            self._pending[call_id] = future
+            try:
+                self.connection.send(_Call(call_id, method, args, kwargs))
+            except (OSError, ValueError) as e:
+                self._pending.pop(call_id)
+                future.set_exception(PySpheroRuntimeError(f"Worker of {self.mac_address} is lost: {e}"))
+        return future
+
+    def _receive(self, connection: Connection):
+        """
+        Complete calls by results from worker until its pipe is closed. Runs in own thread per process
+        """
+        try:
+            while True:
+                try:
+                    call_id, ok, value = connection.recv()
+                except (EOFError, OSError):
+                    # worker is dead, pending calls are failed by supervisor
+                    return
+
+                with self._lock:
+                    future = self._pending.pop(call_id, None)
+                if future is None:
+                    continue
+
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        finally:
+            connection.close()
+
+    def _fail_pending(self, error: PySpheroException):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # calls sent to dead worker are dropped, not replayed by the next one.
+            # Pipe is closed by receiver after end of file
+            self.connection = None
+
+        for future in pending.values():
+            future.set_exception(error)
+
+
+class Fleet:
+    """
+    Toys handled by worker processes with supervision: crashed worker is restarted after delay
+
+    with Fleet(ToyConfig(mac, sensors=(Accelerometer, CoreTime)), ToyConfig(other_mac)) as fleet:
+        fleet[mac].call("user_io.set_all_leds_8_bit_mask", front_color=Color(red=0xff))
+        samples, position = fleet[mac].telemetry.read(position)
+    """
+
+    def __init__(
+            self,
+            *configs: ToyConfig,
+            restart_delay: float = 1.0,
+            max_restarts: Optional[int] = None,
+            context=None,
+    ):
+        """
+        :param configs: toys of fleet
+        :param restart_delay: delay before restart of crashed worker
+        :param max_restarts: max count of restarts of one worker, infinite by default
+        :param context: multiprocessing context, default context of platform by default
+        """
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.context = context or multiprocessing.get_context()
+
+        self._stop = self.context.Event()
+        self._call_ids = count()
+        self._running = threading.Event()
+        self.workers: Dict[str, ToyWorker] = {}
+        for config in configs:
+            self.workers[config.mac_address] = ToyWorker(self, config)
+
+        self._threads: List[threading.Thread] = []
+
+    def __getitem__(self, mac_address: str) -> ToyWorker:
+        return self.workers[mac_address]
+
+    def __iter__(self):
+        return iter(self.workers.values())
+
+    def start(self):
+        self._running.set()
+        for worker in self.workers.values():
+            worker.start()
+
+        self._threads = [
+            threading.Thread(target=self._supervise, name="fleet-supervisor", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._running.clear()
+        self._stop.set()
+        # supervisor may be restarting a worker, processes are joined after it is stopped
+        for thread in self._threads:
+            thread.join(timeout)
+
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                logger.warning(f"Worker of {worker.mac_address} doesn't stop, terminate it")
+                worker.process.terminate()
+                worker.process.join(timeout)
+
+        for worker in self.workers.values():
+            # pipe is closed by the ended process, receiver reads the rest of results
+            if worker._receiver is not None:
+                worker._receiver.join(timeout)
+            worker._fail_pending(PySpheroRuntimeError("Fleet is stopped"))
+            worker.telemetry.close()
+
+    def _supervise(self):
+        restart_at: Dict[str, float] = {}
+        while self._running.is_set():
+            for worker in self.workers.values():
+                if worker.alive or worker.process is None or not self._running.is_set():
+                    continue
+
+                mac_address = worker.mac_address
+                if mac_address not in restart_at:
+                    logger.warning(f"Worker of {mac_address} exited with code {worker.process.exitcode}")
+                    worker._fail_pending(PySpheroRuntimeError(f"Worker of {mac_address} exited"))
+                    if self.max_restarts is not None and worker.restarts >= self.max_restarts:
+                        logger.error(f"Worker of {mac_address} isn't restarted after {worker.restarts} restarts")
+                        worker.process = None
+                        continue
+                    restart_at[mac_address] = time.monotonic() + self.restart_delay
+
+                if time.monotonic() >= restart_at[mac_address]:
+                    del restart_at[mac_address]
+                    logger.info(f"Restart worker of {mac_address} ({worker.restarts + 1})")
+                    worker.start()
+                    # counted when the worker accepts calls
+                    worker.restarts += 1
+
+            time.sleep(0.05)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
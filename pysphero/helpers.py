@@ -1,6 +1,12 @@
+import json
+import logging
+import os
 import struct
+import threading
 from itertools import zip_longest
-from typing import Callable
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 
 class cached_property:
@@ -29,3 +35,47 @@ def grouper(iterable, n, fillvalue=None):
     # grouper('ABCDEFG', 3, 'x') --> ABC DEF Gxx"
     args = [iter(iterable)] * n
     return zip_longest(*args, fillvalue=fillvalue)
+
+
+class JsonFileCache:
+    """
+    Json file of entries by mac address of toy, entries are dicts of subclass
+    """
+    description = "Cache"
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"{self.description} {self.path} is damaged and ignored")
+            return {}
+
+    def _entry(self, mac_address: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(mac_address.lower())
+
+    def _update(self, mac_address: str, entry: Optional[dict]):
+        """
+        Replace entry of toy, None removes it
+        """
+        with self._lock:
+            entries = self._load()
+            if entry is None:
+                if entries.pop(mac_address.lower(), None) is None:
+                    return
+            else:
+                entries[mac_address.lower()] = entry
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # replace file at once, so the cache is never half written
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
@@ -1,3 +1,5 @@
+import threading
+import weakref
 from enum import Enum
 from typing import List, Tuple
 
@@ -36,6 +38,9 @@ class Packet:
     """
 
     _sequence = 0x00
+    _sequence_lock = threading.Lock()
+    # sequence allocators of connections, their outstanding sequences are skipped by the counter
+    _allocators = weakref.WeakSet()
 
     start = 0x8d
     end = 0xd8
@@ -74,10 +79,24 @@ class Packet:
     @classmethod
     def generate_sequence(cls):
         """
-        Autoincrement sequence number of packet
+        Autoincrement sequence number of packet.
+        Sequences outstanding in allocators of connections are skipped,
+        so packets created directly don't collide with allocated requests
         """
-        cls._sequence = (cls._sequence + 1) % 256
-        return cls._sequence
+        with Packet._sequence_lock:
+            for _ in range(256):
+                Packet._sequence = (Packet._sequence + 1) % 256
+                if not any(Packet._sequence in allocator for allocator in Packet._allocators):
+                    break
+            return Packet._sequence
+
+    @classmethod
+    def add_sequence_allocator(cls, allocator):
+        """
+        Skip outstanding sequences of allocator (anything supporting `sequence in allocator`) in the counter
+        """
+        with Packet._sequence_lock:
+            Packet._allocators.add(allocator)
 
     @property
     def id(self) -> Tuple:
@@ -195,3 +214,111 @@ class Packet:
                 escaped_full_packet.append(i)
 
         return b"".join(i.to_bytes(1, byteorder="big") for i in [self.start, *escaped_full_packet, self.end])
+
+
+def _escape(data: bytes) -> bytes:
+    # escape byte is replaced first, so escaping bytes of start and end aren't escaped twice
+    return data.replace(
+        bytes([Packet.escape]), bytes([Packet.escape, Packet.escape & ~Packet.escape_mask]),
+    ).replace(
+        bytes([Packet.start]), bytes([Packet.escape, Packet.start & ~Packet.escape_mask]),
+    ).replace(
+        bytes([Packet.end]), bytes([Packet.escape, Packet.end & ~Packet.escape_mask]),
+    )
+
+
+class PacketTemplate:
+    """
+    Pre-encoded packet of a command for hot paths.
+    Start byte and escaped header (flags, target, source, device and command ids) are built once,
+    per packet only sequence, data and checksum are encoded into a reusable buffer. Result is equal to Packet.build
+
+    drive = PacketTemplate(0x16, 0x07, target_id=0x12)
+    ble_adapter.write(drive.packet(bytes([speed, *heading.to_bytes(2, "big"), direction])))
+    """
+
+    def __init__(
+            self,
+            device_id: int,
+            command_id: int,
+            flags: int = None,
+            target_id: int = None,
+            source_id: int = None,
+    ):
+        prototype = Packet(device_id, command_id, flags, target_id, source_id, sequence=0x00)
+        self.flags = prototype.flags
+        self.device_id = device_id
+        self.command_id = command_id
+        self.target_id = target_id
+        self.source_id = source_id
+
+        header = prototype.packet_payload[:-1]  # without sequence
+        self._header_sum = sum(header)
+        self._prefix = bytes([Packet.start]) + _escape(bytes(header))
+        # templates are shared by toys, so the buffer is used under lock
+        self._lock = threading.Lock()
+        self._allocate(0)
+
+    def _allocate(self, data_size: int):
+        # every byte of sequence, data and checksum may be escaped, plus end byte
+        self._buffer = bytearray(len(self._prefix) + 2 * (data_size + 2) + 1)
+        self._buffer[:len(self._prefix)] = self._prefix
+
+    def _encode(self, sequence: int, data: bytes, checksum: int) -> int:
+        """
+        Write sequence, data, checksum and end byte after prefix, return size of packet
+        """
+        buffer = self._buffer
+        position = len(self._prefix)
+        end = position + len(data) + 2
+
+        buffer[position] = sequence
+        buffer[position + 1:end - 1] = data
+        buffer[end - 1] = checksum
+        if all(buffer.find(b, position, end) == -1 for b in Packet.bad_bytes):
+            buffer[end] = Packet.end
+            return end + 1
+
+        # escaping is rare, body is encoded again byte by byte
+        for b in (sequence, *data, checksum):
+            if b in Packet.bad_bytes:
+                buffer[position] = Packet.escape
+                buffer[position + 1] = b & ~Packet.escape_mask
+                position += 2
+            else:
+                buffer[position] = b
+                position += 1
+        buffer[position] = Packet.end
+        return position + 1
+
+    def build(self, sequence: int, data: bytes = b"") -> bytes:
+        checksum = 0xff - ((self._header_sum + sequence + sum(data)) & 0xff)
+        with self._lock:
+            if len(self._buffer) < len(self._prefix) + 2 * (len(data) + 2) + 1:
+                self._allocate(len(data))
+            size = self._encode(sequence, data, checksum)
+            return bytes(memoryview(self._buffer)[:size])
+
+    def packet(self, data: bytes = b"", sequence: int = None) -> "TemplatePacket":
+        return TemplatePacket(self, data, sequence)
+
+
+class TemplatePacket(Packet):
+    """
+    Packet built by PacketTemplate
+    """
+
+    def __init__(self, template: PacketTemplate, data: bytes = b"", sequence: int = None):
+        self.template = template
+        self.flags = template.flags
+        self.target_id = template.target_id
+        self.source_id = template.source_id
+        self.device_id = template.device_id
+        self.command_id = template.command_id
+        # counter of Packet is shared by all packets
+        self.sequence = sequence if sequence is not None else Packet.generate_sequence()
+        self.raw_data = bytes(data)
+        self.data = list(self.raw_data)
+
+    def build(self) -> bytes:
+        return self.template.build(self.sequence, self.raw_data)
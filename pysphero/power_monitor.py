@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Callable, NamedTuple, Optional
+
+from pysphero.device_api.power import BatteryVoltageStates, ChargerStates
+from pysphero.exceptions import PySpheroException
+
+logger = logging.getLogger(__name__)
+
+
+class SleepState(Enum):
+    awake = "awake"
+    will_sleep = "will_sleep"  # toy is going to sleep after inactivity
+    asleep = "asleep"
+
+
+class PowerState(NamedTuple):
+    """
+    Power state of toy known by host. Timestamps are host time of the last update, None if never updated
+    """
+    battery_percentage: Optional[int] = None
+    battery_state: Optional[BatteryVoltageStates] = None
+    battery_updated: Optional[float] = None
+    charger_state: Optional[ChargerStates] = None
+    charger_updated: Optional[float] = None
+    sleep_state: SleepState = SleepState.awake
+    sleep_updated: Optional[float] = None
+
+
+class PowerMonitor:
+    """
+    Cached power state of toy updated by notifications:
+    charger state by battery_state_changed, sleep state by will_sleep_async and sleep_async.
+    Battery is polled with low rate (reconcile), also to correct state after lost notifications.
+    Reading of state never sends requests
+
+    with PowerMonitor(sphero, reconcile_interval=300) as monitor:
+        ...
+        state = monitor.state
+        print(state.battery_percentage, state.charger_state, state.sleep_state)
+    """
+
+    def __init__(
+            self,
+            sphero,
+            reconcile_interval: float = 300.0,
+            timeout: float = 1.0,
+            on_change: Callable[[PowerState], None] = None,
+    ):
+        """
+        :param Sphero sphero: toy
+        :param reconcile_interval: interval of battery poll in seconds, None disables polling
+        :param timeout: timeout waiting for a response of poll
+        :param on_change: called with new state after every update
+        """
+        self.sphero = sphero
+        self.reconcile_interval = reconcile_interval
+        self.timeout = timeout
+        self.on_change = on_change
+
+        self._state = PowerState()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> PowerState:
+        return self._state
+
+    def _update(self, **changes):
+        with self._lock:
+            self._state = state = self._state._replace(**changes)
+
+        if self.on_change is not None:
+            try:
+                self.on_change(state)
+            except Exception:
+                logger.exception("Error in power state callback")
+
+    def _on_charger_state(self, charger_state: ChargerStates):
+        logger.debug(f"Charger state of {self.sphero.mac_address}: {charger_state}")
+        self._update(charger_state=charger_state, charger_updated=time.time())
+
+    def _on_will_sleep(self):
+        self._update(sleep_state=SleepState.will_sleep, sleep_updated=time.time())
+
+    def _on_sleep(self):
+        self._update(sleep_state=SleepState.asleep, sleep_updated=time.time())
+
+    def start(self):
+        """
+        Subscribe to notifications and start reconcile thread.
+        Subscriptions and notification setting are restored by adapter after reconnect
+        """
+        power = self.sphero.power
+        power.set_battery_state_notify(self._on_charger_state)
+        power.set_sleep_notify(self._on_will_sleep, self._on_sleep)
+
+        self._stop.clear()
+        if self.reconcile_interval is not None:
+            self._thread = threading.Thread(
+                target=self._reconcile_worker,
+                name=f"power-monitor-{self.sphero.mac_address}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.timeout * 3)
+        self._thread = None
+
+        power = self.sphero.power
+        try:
+            power.cancel_battery_state_notify()
+        except PySpheroException as e:
+            logger.debug(f"Unable to disable battery notification: {e}")
+        power.cancel_sleep_notify()
+
+    def reconcile(self):
+        """
+        Poll battery and charger state now, toy answering the poll is awake
+        """
+        power = self.sphero.power
+        percentage = power.get_battery_percentage(timeout=self.timeout)
+        battery_state = power.get_battery_state(timeout=self.timeout)
+        now = time.time()
+        self._update(
+            battery_percentage=percentage,
+            battery_state=battery_state,
+            battery_updated=now,
+            sleep_state=SleepState.awake,
+            sleep_updated=now,
+        )
+
+    def wake(self):
+        """
+        Wake up toy, sleep state is awake after response
+        """
+        self.sphero.power.wake()
+        self._update(sleep_state=SleepState.awake, sleep_updated=time.time())
+
+    def _reconcile_worker(self):
+        while not self._stop.is_set():
+            try:
+                self.reconcile()
+            except PySpheroException as e:
+                # e.g. toy is asleep or reconnecting, cached state is kept
+                logger.debug(f"Power reconcile of {self.sphero.mac_address} failed: {e}")
+
+            self._stop.wait(self.reconcile_interval)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
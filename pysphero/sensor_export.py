@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+import zipfile
+from array import array
+from concurrent.futures import ThreadPoolExecutor, Future
+from enum import Enum
+from typing import Dict, List, Type
+
+from pysphero.device_api.sensor import Sensor, StreamingLayout, SensorSample, _Sensor, parameter_name
+from pysphero.exceptions import PySpheroException, PySpheroRuntimeError
+
+logger = logging.getLogger(__name__)
+
+HOST_TIME_COLUMN = "host_time"
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, columns: List[str]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise PySpheroException("Install pyarrow to export sensors to Parquet (pip install pysphero[export])")
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(column, pyarrow.float64()) for column in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, chunk: Dict[str, array]):
+        # every chunk is a row group
+        self._writer.write_table(self._pyarrow.table(
+            [self._pyarrow.array(chunk[field.name], self._pyarrow.float64()) for field in self._schema],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+class _FeatherWriter:
+    def __init__(self, path: str, columns: List[str]):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            raise PySpheroException("Install pyarrow to export sensors to Feather (pip install pysphero[export])")
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(column, pyarrow.float64()) for column in columns])
+        self._sink = pyarrow.OSFile(path, "wb")
+        # feather v2 is arrow ipc file, every chunk is a record batch
+        self._writer = pyarrow.ipc.new_file(self._sink, self._schema)
+
+    def write(self, chunk: Dict[str, array]):
+        self._writer.write_batch(self._pyarrow.record_batch(
+            [self._pyarrow.array(chunk[field.name], self._pyarrow.float64()) for field in self._schema],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+class _NpzWriter:
+    """
+    Chunks are appended to <path>.parts as separate arrays and merged into <path> on close.
+    The parts file is readable by numpy.load too if recording was interrupted
+    """
+
+    def __init__(self, path: str, columns: List[str]):
+        try:
+            import numpy
+        except ImportError:
+            raise PySpheroException("Install numpy to export sensors to npz (pip install pysphero[export])")
+
+        self._numpy = numpy
+        self._path = path
+        self._parts_path = f"{path}.parts"
+        self._columns = columns
+        self._chunks = 0
+        self._parts = zipfile.ZipFile(self._parts_path, "w", zipfile.ZIP_STORED)
+
+    def write(self, chunk: Dict[str, array]):
+        for column in self._columns:
+            values = self._numpy.frombuffer(chunk[column], dtype=self._numpy.float64)
+            with self._parts.open(f"{column}.{self._chunks:06d}.npy", "w") as part:
+                self._numpy.lib.format.write_array(part, values)
+        self._chunks += 1
+
+    def close(self):
+        self._parts.close()
+        with self._numpy.load(self._parts_path) as parts:
+            columns = {
+                column: self._numpy.concatenate(
+                    [parts[f"{column}.{i:06d}"] for i in range(self._chunks)] or [self._numpy.empty(0)]
+                )
+                for column in self._columns
+            }
+        self._numpy.savez(self._path, **columns)
+        os.remove(self._parts_path)
+
+
+_WRITERS = {
+    ".parquet": _ParquetWriter,
+    ".feather": _FeatherWriter,
+    ".arrow": _FeatherWriter,
+    ".npz": _NpzWriter,
+}
+
+
+class ColumnarSink:
+    """
+    Buffer decoded sensor samples column-wise and flush fixed-size chunks to
+    Parquet, Feather or npz file (format by file extension).
+
+    Columns are host_time and one column per sensor parameter (e.g. "Accelerometer.x",
+    "CoreTime.core_time"), all float64. Chunks are written by a background thread,
+    so appending costs only a few array appends on the receiver thread.
+
+    with ColumnarSink("session.parquet", Accelerometer, CoreTime) as sink:
+        sphero.sensor.set_notify(sink, Accelerometer, CoreTime, interval=50)
+        ...
+    """
+
+    def __init__(self, path: str, *sensors: Type[_Sensor], chunk_size: int = 4096, fmt: str = None):
+        """
+        :param path: output file
+        :param sensors: sensor classes of the stream
+        :param chunk_size: rows in one written chunk
+        :param fmt: ".parquet", ".feather", ".arrow" or ".npz", by default extension of path
+        """
+        fmt = fmt or os.path.splitext(path)[1]
+        writer_cls = _WRITERS.get(fmt.lower())
+        if writer_cls is None:
+            raise PySpheroRuntimeError(f"Unknown export format {fmt!r}, use one of {', '.join(_WRITERS)}")
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.parameters = StreamingLayout.from_sensors(*sensors).parameters
+        self.columns = [HOST_TIME_COLUMN, *(parameter_name(parameter) for parameter in self.parameters)]
+        self._parameter_columns = list(zip(self.parameters, self.columns[1:]))
+        self.rows = 0
+
+        self._writer = writer_cls(path, self.columns)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+        self._chunk = self._new_chunk()
+        self._closed = False
+
+    def _new_chunk(self) -> Dict[str, array]:
+        return {column: array("d") for column in self.columns}
+
+    def __call__(self, values: Dict[Enum, float]):
+        """
+        Sensor.set_notify callback
+        """
+        self.append(values)
+
+    def append(self, values: Dict[Enum, float], timestamp: float = None):
+        """
+        Add one sample, missing parameters are stored as NaN
+
+        :param values: decoded sensor values
+        :param timestamp: host time, current time by default
+        """
+        with self._lock:
+            if self._closed:
+                return
+
+            chunk = self._chunk
+            chunk[HOST_TIME_COLUMN].append(time.time() if timestamp is None else timestamp)
+            for parameter, column in self._parameter_columns:
+                chunk[column].append(values.get(parameter, float("nan")))
+
+            self.rows += 1
+            if len(chunk[HOST_TIME_COLUMN]) >= self.chunk_size:
+                self._flush()
+
+    def append_sample(self, sample: SensorSample):
+        """
+        Add sample of SensorStream
+        """
+        self.append(sample.values, sample.timestamp)
+
+    def attach(self, sensor: Sensor, *sensors: Type[_Sensor], interval: int = 250, count: int = 0):
+        """
+        Start streaming of sensors into this sink
+
+        :param Sensor sensor: sensor api of toy
+        :param sensors: sensor classes, the same as in constructor
+        :param interval: streaming interval in ms
+        :param count: count of frames, 0 is infinite
+        """
+        sensor.set_notify(self, *sensors, interval=interval, count=count)
+
+    def _flush(self):
+        chunk, self._chunk = self._chunk, self._new_chunk()
+        if len(chunk[HOST_TIME_COLUMN]):
+            # keep futures which are running or failed
+            self._pending = [future for future in self._pending if not future.done() or future.exception()]
+            self._pending.append(self._executor.submit(self._writer.write, chunk))
+
+    def flush(self):
+        """
+        Write buffered rows without waiting
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        Write buffered rows and close file
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            self._closed = True
+
+        self._executor.shutdown(wait=True)
+        for future in self._pending:
+            # raise error of background writing
+            future.result()
+        self._writer.close()
+        logger.debug(f"Exported {self.rows} rows to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,429 @@
+"""
+Sensor log structure:
+---------------------------------
+- magic        [8 byte]  b"PSLOG\x00\x02\x00"
+- committed    [8 byte]  count of records flushed to disk, little-endian
+- ordered      [4 byte]  1 if timestamps never decrease, lookups by time use binary search then
+- layout size  [4 byte]  little-endian
+- layout       [n byte]  json: parameter names and flags, index interval
+- padding      up to HEADER_SIZE
+- records      [record size * n]
+---------------------------------
+
+Record structure (all fields little-endian):
+---------------------------------
+- sequence     [4 byte]  record number + 1, zero for never written record
+- crc32        [4 byte]  of timestamp and values
+- timestamp    [8 byte]  host time, double
+- values       [4 byte * parameters]  float, NaN when value is missing
+---------------------------------
+
+Mapped pages may reach the disk in any order after power loss, so complete records are not
+always a prefix of file. Committed count is written only after its records are flushed,
+recovery checks records after it one by one and stops at the first incomplete one.
+
+Writer stamps records by wall clock at open + monotonic clock, so timestamps of one session
+never decrease, but records of separate sessions may still go back after a clock step.
+
+Sparse index (<log>.idx) is a list of (timestamp double, record number uint64)
+of every index_every-th record. It is only a hint and rebuilt when missing or damaged
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from enum import Enum
+from typing import Dict, Iterator, List, NamedTuple, Optional, Type, Tuple
+
+from pysphero.device_api.sensor import StreamingLayout, SensorSample, _Sensor, _ExtendedSensor, \
+    parameter_name, parameter_by_name
+from pysphero.exceptions import PySpheroRuntimeError
+
+LOG_MAGIC = b"PSLOG\x00\x02\x00"
+HEADER_SIZE = 4096
+
+_state = struct.Struct("<QI")
+_layout_size = struct.Struct("<I")
+_record_header = struct.Struct("<II")
+_index_entry = struct.Struct("<dQ")
+
+
+class _Header(NamedTuple):
+    parameters: List[Enum]
+    index_every: int
+    committed: int
+    ordered: bool
+
+
+def _read_header(buffer) -> _Header:
+    if len(buffer) < HEADER_SIZE or buffer[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise PySpheroRuntimeError("File is not a sensor log")
+
+    committed, ordered = _state.unpack_from(buffer, len(LOG_MAGIC))
+    size, = _layout_size.unpack_from(buffer, len(LOG_MAGIC) + _state.size)
+    start = len(LOG_MAGIC) + _state.size + _layout_size.size
+    layout = json.loads(bytes(buffer[start:start + size]).decode())
+    parameters = [parameter_by_name(parameter["name"]) for parameter in layout["parameters"]]
+    return _Header(parameters, layout["index_every"], committed, bool(ordered))
+
+
+def _header(parameters: List[Enum], index_every: int) -> bytes:
+    layout = json.dumps({
+        "parameters": [
+            {
+                "name": parameter_name(parameter),
+                "flag": parameter.value.flag,
+                "extended": isinstance(parameter, _ExtendedSensor),
+            }
+            for parameter in parameters
+        ],
+        "index_every": index_every,
+    }).encode()
+
+    header = LOG_MAGIC + _state.pack(0, True) + _layout_size.pack(len(layout)) + layout
+    if len(header) > HEADER_SIZE:
+        raise PySpheroRuntimeError("Too many parameters for sensor log")
+    return header.ljust(HEADER_SIZE, b"\x00")
+
+
+class _Records:
+    """
+    Fixed-width records over a buffer
+    """
+
+    def __init__(self, buffer, parameters: List[Enum]):
+        self.buffer = buffer
+        self.parameters = parameters
+        self.payload = struct.Struct(f"<d{len(parameters)}f")
+        self.size = _record_header.size + self.payload.size
+
+    def offset(self, number: int) -> int:
+        return HEADER_SIZE + number * self.size
+
+    def capacity(self) -> int:
+        return (len(self.buffer) - HEADER_SIZE) // self.size
+
+    def is_complete(self, number: int) -> bool:
+        offset = self.offset(number)
+        sequence, crc = _record_header.unpack_from(self.buffer, offset)
+        payload = self.buffer[offset + _record_header.size:offset + self.size]
+        return sequence == number + 1 and crc == zlib.crc32(payload)
+
+    def timestamp(self, number: int) -> float:
+        return struct.unpack_from("<d", self.buffer, self.offset(number) + _record_header.size)[0]
+
+    def sample(self, number: int) -> SensorSample:
+        timestamp, *values = self.payload.unpack_from(self.buffer, self.offset(number) + _record_header.size)
+        return SensorSample(timestamp, {
+            parameter: value
+            for parameter, value in zip(self.parameters, values)
+            if value == value  # skip NaN
+        })
+
+    def recover(self, committed: int) -> Tuple[int, bool]:
+        """
+        Count of complete records before the first incomplete one and
+        whether timestamps of checked records never decrease.
+        Committed records were flushed before their count, only the last of them is checked.
+        Records after them are checked by sequence and crc, records after a hole are dropped
+        even if their pages reached the disk
+        """
+        capacity = self.capacity()
+        count = committed
+        if count > capacity or count and not self.is_complete(count - 1):
+            # damaged header, every record is checked
+            count = 0
+
+        ordered = True
+        previous = self.timestamp(count - 1) if count else None
+        while count < capacity and self.is_complete(count):
+            timestamp = self.timestamp(count)
+            if previous is not None and timestamp < previous:
+                ordered = False
+            previous = timestamp
+            count += 1
+        return count, ordered
+
+
+def _in_window(timestamp: float, start: Optional[float], end: Optional[float]) -> bool:
+    return (start is None or timestamp >= start) and (end is None or timestamp < end)
+
+
+def _read_index(path: str, count: int) -> List[Tuple[float, int]]:
+    try:
+        with open(path, "rb") as index:
+            data = index.read()
+    except OSError:
+        return []
+
+    data = data[:len(data) - len(data) % _index_entry.size]
+    return [entry for entry in _index_entry.iter_unpack(data) if entry[1] < count]
+
+
+class SensorLogWriter:
+    """
+    Append-only memory-mapped log of decoded sensor frames.
+    Appending one frame is packing of one fixed-width record into mapped file.
+    Records are flushed to disk every flush_every records or flush_interval seconds,
+    after power loss the log is readable up to the last complete record,
+    reopening of the log continues recording after it
+
+    with SensorLogWriter("session.log", Quaternion, CoreTime) as log:
+        sphero.sensor.set_notify(log, Quaternion, CoreTime, interval=50)
+    """
+
+    def __init__(
+            self,
+            path: str,
+            *sensors: Type[_Sensor],
+            index_every: int = 256,
+            grow_by: int = 1 << 20,
+            flush_every: int = 256,
+            flush_interval: float = 1.0,
+    ):
+        """
+        :param path: log file
+        :param sensors: sensor classes of the stream
+        :param index_every: interval of records in sparse index
+        :param grow_by: size of file extension in bytes
+        :param flush_every: flush after this count of records, None disables it
+        :param flush_interval: flush by append after this time in seconds, None disables it
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.index_every = index_every
+        self.grow_by = grow_by
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        parameters = StreamingLayout.from_sensors(*sensors).parameters
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        try:
+            if exists:
+                with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    header = _read_header(buffer)
+                if header.parameters != parameters:
+                    raise PySpheroRuntimeError(f"Sensor log {path} has another layout")
+                self.index_every = header.index_every
+            else:
+                self._file.write(_header(parameters, index_every))
+                self._file.truncate(HEADER_SIZE + grow_by)
+                header = _Header(parameters, index_every, 0, True)
+
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self._records = _Records(self._mmap, parameters)
+        self.count, ordered = self._records.recover(header.committed)
+        self._ordered = header.ordered and ordered
+        self._last_timestamp = self._records.timestamp(self.count - 1) if self.count else None
+        # clear torn records after the last complete one,
+        # otherwise they could be recovered after the next crash
+        tail = self._records.offset(self.count)
+        self._mmap[tail:] = bytes(len(self._mmap) - tail)
+        # recovered records are committed again
+        self._flushed_count = min(header.committed, self.count)
+        self._commit()
+
+        # wall clock may be stepped (ntp), timestamps of session follow monotonic clock
+        self._wall_start = time.time()
+        self._monotonic_start = time.monotonic()
+
+        # drop index entries of lost records
+        entries = _read_index(self.index_path, self.count)
+        with open(self.index_path, "wb") as index:
+            index.write(b"".join(_index_entry.pack(*entry) for entry in entries))
+        self._index = open(self.index_path, "ab")
+
+        self._nan_values = [float("nan")] * len(parameters)
+        self._positions = {parameter: i for i, parameter in enumerate(parameters)}
+
+    def __call__(self, values: Dict[Enum, float]):
+        """
+        Sensor.set_notify callback
+        """
+        self.append(values)
+
+    def append(self, values: Dict[Enum, float], timestamp: float = None):
+        """
+        Add one frame
+
+        :param values: decoded sensor values
+        :param timestamp: host time, current time by default
+        """
+        if timestamp is None:
+            timestamp = self._wall_start + time.monotonic() - self._monotonic_start
+
+        number = self.count
+        if number >= self._records.capacity():
+            self._grow()
+
+        record_values = list(self._nan_values)
+        for parameter, value in values.items():
+            position = self._positions.get(parameter)
+            if position is not None:
+                record_values[position] = value
+
+        offset = self._records.offset(number)
+        payload_offset = offset + _record_header.size
+        self._records.payload.pack_into(self._mmap, payload_offset, timestamp, *record_values)
+        crc = zlib.crc32(self._mmap[payload_offset:offset + self._records.size])
+        # header is written last, so the record is complete only when payload is written
+        _record_header.pack_into(self._mmap, offset, number + 1, crc)
+        self.count = number + 1
+
+        if self._ordered and self._last_timestamp is not None and timestamp < self._last_timestamp:
+            # may reach the disk before records, it only disables binary search
+            self._ordered = False
+            _state.pack_into(self._mmap, len(LOG_MAGIC), self._flushed_count, False)
+        self._last_timestamp = timestamp
+
+        if number % self.index_every == 0:
+            self._index.write(_index_entry.pack(timestamp, number))
+
+        if (
+            self.flush_every is not None and self.count - self._flushed_count >= self.flush_every
+            or self.flush_interval is not None and time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def append_sample(self, sample: SensorSample):
+        """
+        Add sample of SensorStream
+        """
+        self.append(sample.values, sample.timestamp)
+
+    def _grow(self):
+        self._mmap.flush()
+        size = len(self._mmap) + self.grow_by
+        self._file.truncate(size)
+        self._mmap.resize(size)
+
+    def flush(self):
+        """
+        Write new records and index to disk
+        """
+        self._commit()
+        self._index.flush()
+        os.fsync(self._index.fileno())
+
+    def _commit(self):
+        # offset of flushed range must be aligned
+        start = self._records.offset(self._flushed_count)
+        start -= start % mmap.ALLOCATIONGRANULARITY
+        end = self._records.offset(self.count)
+        if end > start:
+            self._mmap.flush(start, end - start)
+
+        # count is written only when its records are on disk
+        _state.pack_into(self._mmap, len(LOG_MAGIC), self.count, self._ordered)
+        self._mmap.flush(0, HEADER_SIZE)
+
+        self._flushed_count = self.count
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._mmap.close()
+        self._file.truncate(self._records.offset(self.count))
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SensorLogReader:
+    """
+    Random access to sensor log by record number or time range
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = _read_header(self._mmap)
+        except PySpheroRuntimeError:
+            self.close()
+            raise
+
+        self.parameters = header.parameters
+        self._records = _Records(self._mmap, self.parameters)
+        self._count, ordered = self._records.recover(header.committed)
+        self._ordered = header.ordered and ordered
+        self._index = _read_index(f"{path}.idx", self._count)
+        self._index_timestamps = [timestamp for timestamp, _ in self._index]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, number: int) -> SensorSample:
+        if number < 0:
+            number += self._count
+        if not 0 <= number < self._count:
+            raise IndexError("Record number out of range")
+        return self._records.sample(number)
+
+    def __iter__(self) -> Iterator[SensorSample]:
+        for number in range(self._count):
+            yield self._records.sample(number)
+
+    def _first_at(self, timestamp: float) -> int:
+        """
+        First record with time >= timestamp, timestamps of records must be non-decreasing.
+        Sparse index narrows range of binary search over records
+        """
+        low, high = 0, self._count
+        position = bisect.bisect_left(self._index_timestamps, timestamp)
+        if position > 0:
+            low = self._index[position - 1][1]
+        if position < len(self._index):
+            high = self._index[position][1] + 1
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._records.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(self, start: float = None, end: float = None) -> Iterator[SensorSample]:
+        """
+        Samples with start <= timestamp < end
+
+        :param start: host time, beginning of log by default
+        :param end: host time, end of log by default
+        """
+        if not self._ordered:
+            # timestamps went back (e.g. clock step between sessions), binary search isn't possible
+            for number in range(self._count):
+                if _in_window(self._records.timestamp(number), start, end):
+                    yield self._records.sample(number)
+            return
+
+        first = 0 if start is None else self._first_at(start)
+        last = self._count if end is None else max(self._first_at(end), first)
+        for number in range(first, last):
+            yield self._records.sample(number)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
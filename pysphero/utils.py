@@ -3,7 +3,7 @@ from concurrent.futures import ThreadPoolExecutor
 from queue import Queue, Empty
 from threading import Event
 from time import time
-from typing import NamedTuple, Generator
+from typing import NamedTuple, Generator, List
 
 from bluepy.btle import DefaultDelegate, Scanner, ScanEntry
 
@@ -18,6 +18,7 @@ class _ScanItem(NamedTuple):
     mac_address: str
     toy_type: Toy
     name: str
+    rssi: int = 0  # signal strength in dBm
 
 
 class _ScanDelegate(DefaultDelegate):
@@ -30,7 +31,7 @@ class _ScanDelegate(DefaultDelegate):
         name = dev.getValue(ScanEntry.COMPLETE_LOCAL_NAME) or ""
         toy_type = TOY_BY_PREFIX.get(name[:3])
         if toy_type:
-            self.queue.put_nowait(_ScanItem(dev.addr, toy_type, name))
+            self.queue.put_nowait(_ScanItem(dev.addr, toy_type, name, dev.rssi))
 
 
 class _ContextScanner(Scanner):
@@ -88,3 +89,21 @@ def toy_scanner(*, toy_type: Toy = None, name: str = None, timeout: float = 5.0)
                 )
 
     raise PySpheroNotFoundError("Toy not found")
+
+
+def scan_toys(*, toy_type: Toy = None, timeout: float = 5.0) -> List[_ScanItem]:
+    """
+    All toys found during timeout, the strongest signal first
+    """
+    delegate = _ScanDelegate()
+    running_event = Event()
+    running_event.set()
+
+    found = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(_scanner, delegate, timeout, running_event)
+        for scan_item in _queue_iter(delegate.queue, timeout):
+            if toy_type is None or scan_item.toy_type == toy_type:
+                found[scan_item.mac_address] = scan_item
+
+    return sorted(found.values(), key=lambda scan_item: scan_item.rssi, reverse=True)
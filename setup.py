@@ -32,7 +32,16 @@ setup(
         ],
         "gatt": [
             "gatt==0.2.7",
-        ]
+        ],
+        "export": [
+            "numpy",
+            "pyarrow",
+        ],
+    },
+    entry_points={
+        "console_scripts": [
+            "pysphero=pysphero.cli:main",
+        ],
     },
     keywords=["sphero", "sphero-ble", "bolt"],
     classifiers=[
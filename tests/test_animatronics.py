@@ -0,0 +1,77 @@
+from concurrent.futures import Future
+
+import pytest
+
+from pysphero.device_api.animatronics import Animatronics, AnimatronicsCommand, AnimationPlaylist, R2D2Animation
+from pysphero.exceptions import PySpheroTimeoutError
+from pysphero.packet import Packet
+
+
+class ToyAdapter:
+    """
+    Complete played animations immediately, except of animations in `stuck`
+    """
+
+    def __init__(self, stuck=()):
+        self.stuck = set(stuck)
+        self.played = []
+        self.callback = None
+        self.subscriptions = 0
+
+    def write(self, packet: Packet, **kwargs):
+        if packet.command_id != AnimatronicsCommand.play_animation.value:
+            return
+        animation_id = int.from_bytes(bytes(packet.data), "big")
+        self.played.append(animation_id)
+        if animation_id not in self.stuck:
+            self.callback(Packet(packet.device_id, AnimatronicsCommand.play_animation_complete_notify.value,
+                                 data=list(packet.data)))
+
+    def start_notify(self, packet, callback, timeout):
+        self.callback = callback
+        self.subscriptions += 1
+        return Future()
+
+    def stop_notify(self, packet_id=None):
+        self.callback = None
+
+
+def test_play_animation_async():
+    animatronics = Animatronics(ToyAdapter())
+    future = animatronics.play_animation_async(R2D2Animation.emote_happy)
+    assert future.result(timeout=0) == R2D2Animation.emote_happy.value
+    # completion subscription is stopped after the last animation
+    assert animatronics.ble_adapter.callback is None
+
+    animatronics.play_animation_async(R2D2Animation.emote_chatty).result(timeout=0)
+    assert animatronics.ble_adapter.subscriptions == 2
+
+
+def test_play_animation_and_wait_timeout():
+    animatronics = Animatronics(ToyAdapter(stuck=[0x07]))
+    with pytest.raises(PySpheroTimeoutError):
+        animatronics.play_animation_and_wait(0x07, timeout=0.01)
+    # late notification of timed out animation is ignored
+    animatronics._on_animation_complete(Packet(0x17, 0x11, data=[0x00, 0x07]))
+    assert animatronics.ble_adapter.callback is None
+
+
+def test_playlist():
+    adapter = ToyAdapter()
+    playlist = AnimationPlaylist(Animatronics(adapter), R2D2Animation.emote_happy, 0x08)
+    playlist.add(R2D2Animation.emote_chatty)
+    assert playlist.wait(timeout=1) == [R2D2Animation.emote_happy, 0x08, R2D2Animation.emote_chatty]
+    assert adapter.played == [0x0d, 0x08, 0x0a]
+    # one completion subscription for the whole playlist
+    assert adapter.subscriptions == 1
+    assert adapter.callback is None
+
+
+def test_playlist_stops_on_timeout():
+    adapter = ToyAdapter(stuck=[0x08])
+    playlist = AnimationPlaylist(Animatronics(adapter), 0x0d, 0x08, 0x0a, timeout=0.01)
+    with pytest.raises(PySpheroTimeoutError):
+        playlist.wait(timeout=1)
+    assert playlist.played == [0x0d]
+    assert adapter.played == [0x0d, 0x08]
+    assert adapter.callback is None
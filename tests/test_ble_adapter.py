@@ -0,0 +1,274 @@
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.batch import Batch  # noqa: E402
+from pysphero.bluetooth.ble_adapter import AbstractBleAdapter  # noqa: E402
+from pysphero.bluetooth.packet_collector import PacketCollector  # noqa: E402
+from pysphero.driving import StabilizationIndex  # noqa: E402
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroApiError, PySpheroConnectionLostError, \
+    PySpheroRuntimeError  # noqa: E402
+from pysphero.packet import Packet, Flag  # noqa: E402
+
+
+class FakeAdapter(AbstractBleAdapter):
+    """
+    Answer every request after `lost` requests were lost
+    """
+
+    def __init__(self, lost: int = 0, api_error: int = 0x00):
+        super().__init__("aa:bb:cc:dd:ee:ff")
+        self.lost = lost
+        self.api_error = api_error
+        self.sent = []
+        self.connects = 0
+
+    def _connect(self):
+        self.connects += 1
+
+    def _disconnect(self):
+        pass
+
+    def _write_raw(self, data: bytes):
+        request = Packet.from_response(list(data))
+        self.sent.append(request)
+        if self.lost:
+            self.lost -= 1
+            return
+
+        response = Packet(
+            request.device_id,
+            request.command_id,
+            flags=Flag.response.value,
+            sequence=request.sequence,
+            data=[self.api_error, 0x42],
+        )
+        self.packet_collector.append_raw_data(response.build())
+
+
+@pytest.fixture
+def adapter():
+    adapter = FakeAdapter()
+    adapter.timeout_policy.min_timeout = 0.01
+    adapter.timeout_policy.initial_timeout = 0.05
+    yield adapter
+    adapter.close()
+
+
+def test_write_response(adapter):
+    request = Packet(0x13, 0x10)
+    response = adapter.write(request)
+    assert response.sequence == request.sequence
+    assert response.data == [0x42]
+    assert adapter.timeout_policy.srtt(request.id) is not None
+
+
+def test_write_without_response(adapter):
+    assert adapter.write(Packet(0x16, 0x07, flags=0x00)) is None
+
+
+def test_write_retry(adapter):
+    adapter.lost = 2
+    request = Packet(0x13, 0x10)
+    assert adapter.write(request).data == [0x42]
+    assert [p.sequence for p in adapter.sent] == [request.sequence] * 3
+    # retransmitted requests are not measured
+    assert adapter.timeout_policy.srtt(request.id) is None
+
+
+def test_write_retries_exhausted(adapter):
+    adapter.lost = 3
+    with pytest.raises(PySpheroTimeoutError):
+        adapter.write(Packet(0x13, 0x10))
+    assert len(adapter.sent) == 3
+
+
+def test_write_without_side_effects_only_retried(adapter):
+    adapter.lost = 1
+    with pytest.raises(PySpheroTimeoutError):
+        # drive must not run twice after a lost response
+        adapter.write(Packet(0x16, 0x07, data=[0x40, 0x00, 0x00, 0x00]))
+    assert len(adapter.sent) == 1
+
+
+def test_packet_collector_check_response_delta_deprecated():
+    with pytest.warns(DeprecationWarning):
+        PacketCollector(check_response_delta=0.1)
+
+
+def test_write_releases_sequence(adapter):
+    adapter.lost = 3
+    request = adapter.sequences.packet(device_id=0x13, command_id=0x10)
+    with pytest.raises(PySpheroTimeoutError):
+        adapter.write(request)
+    assert adapter.sequences.outstanding == 0
+
+
+def test_write_explicit_timeout_without_retries(adapter):
+    adapter.lost = 1
+    with pytest.raises(PySpheroTimeoutError):
+        adapter.write(Packet(0x13, 0x10), timeout=0.05)
+    assert len(adapter.sent) == 1
+
+
+def test_write_api_error(adapter):
+    adapter.api_error = 0x07
+    with pytest.raises(PySpheroApiError):
+        adapter.write(Packet(0x13, 0x10))
+
+
+def test_durable_state_restored_after_reconnect(adapter):
+    reconnected = threading.Event()
+    adapter.reconnect_callbacks.append(reconnected.set)
+
+    stabilization = Packet(0x16, 0x0c, target_id=0x12, data=[0x01])
+    adapter.write(stabilization)
+    adapter.remember(stabilization)
+    leds = Packet(0x1a, 0x1c, target_id=0x11, data=[0x3f, 0xff, 0x00, 0x00, 0xff, 0x00, 0x00])
+    adapter.write(leds)
+    adapter.remember(leds)
+    adapter.sent.clear()
+
+    adapter.handle_disconnect()
+    assert reconnected.wait(1)
+    assert adapter.connected
+    assert adapter.connects == 1
+    assert [(p.id, p.data) for p in adapter.sent] == [(stabilization.id, [0x01]), (leds.id, leds.data)]
+    assert adapter.sent[0].sequence != stabilization.sequence
+
+
+def test_reconnect_started_again_by_request(adapter):
+    connect = adapter._connect
+    adapter._connect = lambda: (_ for _ in ()).throw(OSError("Toy is out of range"))
+    adapter.reconnect_attempts = 2
+    adapter.reconnect_delay = 0.01
+    adapter.reconnect_timeout = 0.1
+
+    adapter.handle_disconnect()
+    with pytest.raises(PySpheroConnectionLostError):
+        adapter.write(Packet(0x13, 0x10))
+    while adapter._reconnecting:
+        time.sleep(0.01)
+
+    adapter._connect = connect
+    adapter.reconnect_timeout = 1
+    assert adapter.write(Packet(0x13, 0x10)).data == [0x42]
+    assert adapter.connected
+
+
+def test_in_flight_request_aborted_on_disconnect(adapter):
+    adapter.lost = 1
+    adapter.reconnect_delay = 0.01
+    timer = threading.Timer(0.02, adapter.handle_disconnect)
+    timer.start()
+    with pytest.raises(PySpheroConnectionLostError):
+        adapter.write(Packet(0x13, 0x10), timeout=1)
+    timer.join()
+
+
+def test_notifications_queued_per_id():
+    collector = PacketCollector()
+    collector.max_pending_notifications = 2
+    for value in range(3):
+        collector.append_raw_data(Packet(0x18, 0x02, flags=0x00, data=[value]).build())
+
+    assert collector.dropped_notifications[(0x18, 0x02)] == 1
+    assert [collector.get_notification((0x18, 0x02), timeout=0).data for _ in range(2)] == [[1], [2]]
+    with pytest.raises(PySpheroTimeoutError):
+        collector.get_notification((0x18, 0x02), timeout=0)
+
+
+def test_notify_subscriptions_are_independent(adapter):
+    collisions, touches = [], []
+    received = threading.Event()
+    collision = Packet(0x18, 0x12)
+    touch = Packet(0x1a, 0x0f)
+    collision_future = adapter.start_notify(collision, lambda p: (collisions.append(p), received.set()), timeout=None)
+    touch_future = adapter.start_notify(touch, touches.append, timeout=None)
+
+    adapter.stop_notify(touch.id)
+    assert wait([touch_future], timeout=1).not_done == set()
+    adapter.packet_collector.append_raw_data(Packet(0x18, 0x12, flags=0x00, data=[0x01]).build())
+    assert received.wait(1)
+    assert not collision_future.done()
+
+    adapter.stop_notify()
+    assert wait([collision_future], timeout=1).not_done == set()
+    assert [p.data for p in collisions] == [[0x01]]
+    assert touches == []
+    with pytest.raises(PySpheroRuntimeError):
+        adapter.stop_notify(touch.id)
+
+
+def test_notify_skips_notifications_without_subscriber(adapter):
+    received = []
+    adapter.packet_collector.append_raw_data(Packet(0x18, 0x02, flags=0x00, data=[0x01]).build())
+    future = adapter.start_notify(Packet(0x18, 0x02), received.append, timeout=0.05)
+    adapter.packet_collector.append_raw_data(Packet(0x18, 0x02, flags=0x00, data=[0x02]).build())
+    with pytest.raises(PySpheroTimeoutError):
+        future.result(timeout=1)
+    assert [p.data for p in received] == [[0x02]]
+
+
+def test_notify_subscriptions_without_limit(adapter):
+    received = []
+    packets = [Packet(0x18, command_id) for command_id in range(16)]
+    for packet in packets:
+        adapter.start_notify(packet, received.append, timeout=None)
+
+    for packet in packets:
+        adapter.packet_collector.append_raw_data(Packet(*packet.id, flags=0x00).build())
+    deadline = time.monotonic() + 1
+    while len(received) < len(packets) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(p.command_id for p in received) == list(range(16))
+
+
+def test_batch_packs_frames_into_mtu_writes(adapter):
+    writes = []
+    write_raw = adapter._write_raw
+
+    def record(data):
+        writes.append(data)
+        for start in [i for i, b in enumerate(data) if b == Packet.start]:
+            write_raw(data[start:data.index(Packet.end, start) + 1])
+
+    adapter._write_raw = record
+    adapter.mtu = 20
+    batch = Batch(adapter)
+    with batch:
+        batch.driving.set_stabilization(StabilizationIndex.full_control_system)
+        batch.driving.reset_yaw()
+        batch.driving.drive_with_heading(0, 90)
+        requests = list(batch.requests)
+
+    assert len(writes) == 2
+    assert all(len(data) <= adapter.mtu for data in writes)
+    responses = [future.result(timeout=0) for future in batch.futures]
+    assert [response.data for response in responses] == [[0x42]] * 3
+    assert [response.sequence for response in responses] == [request.packet.sequence for request in requests]
+
+
+def test_batch_remembers_only_successful_requests(adapter):
+    adapter.lost = 1
+    with Batch(adapter) as batch:
+        batch.driving.set_stabilization(StabilizationIndex.full_control_system)
+    assert isinstance(batch.futures[0].exception(timeout=0), PySpheroTimeoutError)
+    assert adapter._durable_packets == {}
+
+    with Batch(adapter) as batch:
+        batch.driving.set_stabilization(StabilizationIndex.full_control_system)
+    assert list(adapter._durable_packets) == [(0x16, 0x0c)]
+
+
+def test_parser_builds_packets_from_receive_ring(adapter):
+    request = adapter.sequences.packet(device_id=0x13, command_id=0x10)
+    frame = Packet(0x13, 0x10, flags=Flag.response.value, sequence=request.sequence, data=[0x00, 0x07]).build()
+    adapter.receive_ring.push(b"\x8d\x01\xd8")  # broken frame is dropped by parser
+    adapter.receive_ring.push(frame[:4])
+    adapter.receive_ring.push(frame[4:])
+    assert adapter.packet_collector.get_response(request, timeout=1).data == [0x07]
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.bluepy_adapter import BluepyAdapter  # noqa: E402
+from pysphero.exceptions import PySpheroTimeoutError  # noqa: E402
+from pysphero.packet import Packet, Flag  # noqa: E402
+
+
+def _line(**fields) -> bytes:
+    """
+    Output line of bluepy helper
+    """
+    return ("\x1e".join(f"{tag}={value}" for tag, value in fields.items()) + "\n").encode()
+
+
+class FakeHelper:
+    def __init__(self):
+        read, self.write_fd = os.pipe()
+        # buffered text reader like stdout of subprocess in bluepy
+        self.stdout = os.fdopen(read, "r")
+
+
+class FakeCharacteristic:
+    def __init__(self, peripheral: "FakePeripheral"):
+        self.peripheral = peripheral
+
+    def getDescriptors(self, forUUID):
+        return [self]
+
+    def write(self, data: bytes, withResponse: bool = False):
+        gate = self.peripheral.gate
+        if gate is not None:
+            gate.wait()
+        self.peripheral.writes.append((bytes(data), threading.current_thread()))
+        output = _line(rsp="$wr")
+        if len(data) >= 7:
+            request = Packet.from_response(list(data))
+            response = Packet(
+                request.device_id,
+                request.command_id,
+                flags=Flag.response.value,
+                sequence=request.sequence,
+                data=[0x00, 0x42],
+            )
+            # notification comes in the same read as write response
+            output += _line(rsp="$ntfy", hnd="h0e", d=f"b{response.build().hex()}")
+
+        os.write(self.peripheral._helper.write_fd, output)
+        # like bluepy waiting for write response
+        while not self.peripheral._helper.stdout.readline().startswith("rsp=$wr"):
+            pass
+
+
+class FakePeripheral:
+    """
+    Peripheral answering every request with a notification
+    """
+    instances = []
+
+    def __init__(self, mac_address, addr_type):
+        self.delegate = None
+        self.writes = []
+        self.gate = None
+        self._helper = FakeHelper()
+        self.instances.append(self)
+
+    def setDelegate(self, delegate):
+        self.delegate = delegate
+
+    def setMTU(self, mtu):
+        return {"state": ["conn"], "mtu": [min(mtu, 185)]}
+
+    def getCharacteristics(self, uuid):
+        return [FakeCharacteristic(self)]
+
+    def lose_connection(self):
+        os.write(self._helper.write_fd, _line(rsp="$stat", state="$disc"))
+
+    def disconnect(self):
+        self._helper.stdout.close()
+        os.close(self._helper.write_fd)
+
+
+class FakeBluepyAdapter(BluepyAdapter):
+    peripheral_cls = FakePeripheral
+
+
+@pytest.fixture
+def adapter():
+    FakePeripheral.instances.clear()
+    adapter = FakeBluepyAdapter("aa:bb:cc:dd:ee:ff")
+    yield adapter
+    adapter.close()
+
+
+def test_writes_are_done_by_io_thread(adapter):
+    peripheral = FakePeripheral.instances[-1]
+    response = adapter.write(Packet(0x11, 0x06, flags=Flag.requests_response.value))
+
+    assert response.data == [0x42]
+    data, thread = peripheral.writes[-1]
+    assert thread is adapter._io_thread
+    assert thread is not threading.current_thread()
+
+
+def test_mtu_negotiated(adapter):
+    # ATT MTU 185 without header of write
+    assert adapter.mtu == 182
+
+
+def test_buffered_notification_is_handled_without_idle_timeout(adapter):
+    adapter.idle_timeout = 5.0
+    time.sleep(0.2)  # loop is waiting with the new idle timeout
+
+    started = time.monotonic()
+    response = adapter.write(Packet(0x11, 0x06, flags=Flag.requests_response.value), timeout=1)
+
+    assert response.data == [0x42]
+    assert time.monotonic() - started < 1
+
+
+def test_reconnect_after_lost_connection(adapter):
+    FakePeripheral.instances[-1].lose_connection()
+
+    deadline = time.monotonic() + 5
+    while len(FakePeripheral.instances) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert adapter._connected.wait(5)
+
+    response = adapter.write(Packet(0x11, 0x06, flags=Flag.requests_response.value))
+    assert response.data == [0x42]
+    assert adapter.peripheral is FakePeripheral.instances[-1]
+
+
+def test_timed_out_write_is_not_sent(adapter):
+    peripheral = FakePeripheral.instances[-1]
+    peripheral.gate = threading.Event()
+    adapter.write_timeout = 0.1
+
+    def send_blocked():
+        # write in progress isn't stopped by timeout
+        with pytest.raises(PySpheroTimeoutError):
+            adapter.send(Packet(0x11, 0x06, flags=0x00))
+
+    blocked = threading.Thread(target=send_blocked)
+    blocked.start()
+    time.sleep(0.05)  # I/O thread is writing the first packet
+    with pytest.raises(PySpheroTimeoutError):
+        adapter.send(Packet(0x11, 0x07, flags=0x00))
+
+    peripheral.gate.set()
+    blocked.join()
+    time.sleep(0.1)
+    assert [Packet.from_response(list(data)).command_id for data, _ in peripheral.writes[1:]] == [0x06]
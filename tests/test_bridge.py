@@ -0,0 +1,175 @@
+import threading
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.ble_adapter import AbstractBleAdapter  # noqa: E402
+from pysphero.bluetooth.remote_adapter import RemoteAdapter  # noqa: E402
+from pysphero.bridge import BridgeServer, split_frames  # noqa: E402
+from pysphero.exceptions import PySpheroNotFoundError, PySpheroRuntimeError  # noqa: E402
+from pysphero.packet import Packet, Flag  # noqa: E402
+
+MAC_ADDRESS = "aa:bb:cc:dd:ee:ff"
+
+
+class ToyAdapter(AbstractBleAdapter):
+    """
+    Answer every request with its first data byte
+    """
+
+    def __init__(self):
+        super().__init__(MAC_ADDRESS)
+        self.sent = []
+        self.writes = 0
+
+    def _connect(self):
+        pass
+
+    def _disconnect(self):
+        pass
+
+    def _write_raw(self, data: bytes):
+        self.writes += 1
+        for frame in split_frames(data):
+            request = Packet.from_response(list(frame))
+            self.sent.append(request)
+            response = Packet(
+                request.device_id,
+                request.command_id,
+                flags=Flag.response.value,
+                sequence=request.sequence,
+                data=[0x00, *request.data[:1]],
+            )
+            self.receive_ring.push(response.build())
+
+    def notify(self, packet: Packet):
+        self.receive_ring.push(packet.build())
+
+
+@pytest.fixture
+def toy():
+    toy = ToyAdapter()
+    yield toy
+    toy.close()
+
+
+@pytest.fixture
+def bridge(toy, tmp_path):
+    bridge = BridgeServer(toy, address=str(tmp_path / "bridge.sock"))
+    bridge.start()
+    yield bridge
+    bridge.close()
+
+
+def client(bridge) -> RemoteAdapter:
+    return RemoteAdapter(MAC_ADDRESS, address=bridge.address)
+
+
+def test_split_frames():
+    frames = [Packet(0x13, 0x0d, sequence=0xd8).build(), Packet(0x13, 0x01).build()]
+    assert list(split_frames(b"".join(frames))) == frames
+
+
+def test_requests_of_clients_are_remapped(toy, bridge):
+    first, second = client(bridge), client(bridge)
+    try:
+        def requests(adapter, value):
+            for _ in range(20):
+                # both clients use the same sequences
+                response = adapter.write(Packet(0x13, 0x0d, sequence=0x01, data=[value]), timeout=2)
+                assert response.data == [value]
+
+        threads = [threading.Thread(target=requests, args=(adapter, value)) for adapter, value in
+                   ((first, 0x01), (second, 0x02))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(toy.sent) == 40
+        assert toy.sequences.outstanding == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_bridged_responses_are_not_kept_by_toy(toy, bridge):
+    adapter = client(bridge)
+    try:
+        adapter.write(Packet(0x13, 0x0d, data=[0x01]), timeout=2)
+        sequence = toy.sent[-1].sequence
+        assert toy.packet_collector._responses == {}
+
+        # request of host with the same sequence gets its own response
+        response = toy.write(Packet(0x13, 0x0d, sequence=sequence, data=[0x02]), timeout=2)
+        assert response.data == [0x02]
+    finally:
+        adapter.close()
+
+
+def test_notifications_are_sent_to_subscribers(toy, bridge):
+    subscriber, other = client(bridge), client(bridge)
+    received = threading.Event()
+    try:
+        subscriber.start_notify(Packet(0x18, 0x02, sequence=0x00), lambda packet: received.set(), timeout=2)
+        # subscription is handled by bridge after any later message of the same client
+        subscriber.write(Packet(0x13, 0x0d, data=[0x00]), timeout=2)
+
+        toy.notify(Packet(0x18, 0x02, flags=0x00, data=[0x01]))
+        assert received.wait(2)
+        with pytest.raises(Exception):
+            other.packet_collector.get_notification((0x18, 0x02), timeout=0.2)
+    finally:
+        subscriber.close()
+        other.close()
+
+
+def test_durable_requests_are_remembered_by_bridge(toy, bridge):
+    adapter = client(bridge)
+    try:
+        packet = Packet(0x1a, 0x1a, data=[0x01])
+        adapter.remember(packet)
+        adapter.write(Packet(0x13, 0x0d, data=[0x00]), timeout=2)
+        assert (0x1a, 0x1a) in toy._durable_packets
+    finally:
+        adapter.close()
+
+
+def test_unknown_toy(bridge):
+    with pytest.raises(PySpheroNotFoundError):
+        RemoteAdapter("00:00:00:00:00:00", address=bridge.address)
+
+
+def test_batch_of_client_is_packed_by_bridge(toy, bridge):
+    # e.g. negotiated by adapter of bridge
+    toy.mtu = 244
+    adapter = client(bridge)
+    try:
+        packets = [Packet(0x13, 0x0d, data=[value]) for value in range(4)]
+        adapter.send_many(packets)
+        responses = [adapter.packet_collector.get_response(packet, timeout=2) for packet in packets]
+        assert [response.data for response in responses] == [[value] for value in range(4)]
+        assert toy.writes == 1
+    finally:
+        adapter.close()
+
+
+def test_tcp_bridge_requires_token(toy):
+    with pytest.raises(ValueError):
+        BridgeServer(toy, address=("", 0))
+
+    with BridgeServer(toy, address=("", 0), token="secret") as bridge:
+        bridge.start()
+        assert bridge.address[0] == "127.0.0.1"
+
+        with pytest.raises(PySpheroRuntimeError):
+            RemoteAdapter(MAC_ADDRESS, address=bridge.address)
+        with pytest.raises(PySpheroRuntimeError):
+            RemoteAdapter(MAC_ADDRESS, address=bridge.address, token="wrong")
+
+        adapter = RemoteAdapter(MAC_ADDRESS, address=bridge.address, token="secret")
+        try:
+            assert adapter.write(Packet(0x13, 0x0d, data=[0x01]), timeout=2).data == [0x01]
+        finally:
+            adapter.close()
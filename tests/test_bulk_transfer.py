@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.packet_collector import PacketCollector  # noqa: E402
+from pysphero.bluetooth.timeout_policy import AdaptiveTimeout  # noqa: E402
+from pysphero.bulk_transfer import BulkTransfer, Chunk, split  # noqa: E402
+from pysphero.exceptions import PySpheroTimeoutError  # noqa: E402
+from pysphero.packet import Packet, Flag  # noqa: E402
+
+
+class PageAdapter:
+    """
+    Acknowledge pages in batches of `window`, first request of pages in `lost` is lost
+    """
+
+    def __init__(self, lost=(), window=4):
+        self.packet_collector = PacketCollector()
+        self.timeout_policy = AdaptiveTimeout(initial_timeout=0.05)
+        self.lost = set(lost)
+        self.window = window
+        self.sent = []
+        self.unanswered = []
+        self.max_in_flight = 0
+
+    def send(self, packet: Packet):
+        self.sent.append(packet)
+        offset = int.from_bytes(bytes(packet.data[:4]), "big")
+        if offset in self.lost:
+            self.lost.discard(offset)
+            return
+
+        self.unanswered.append(packet)
+        self.max_in_flight = max(self.max_in_flight, len(self.unanswered))
+        if len(self.unanswered) >= self.window or offset >= 96:
+            for request in self.unanswered:
+                response = Packet(request.device_id, request.command_id, flags=Flag.response.value,
+                                  sequence=request.sequence, data=[0x00])
+                self.packet_collector.append_raw_data(response.build())
+            self.unanswered.clear()
+
+
+def here_is_page(chunk: Chunk) -> Packet:
+    return Packet(0x1d, 0x01, target_id=0x12, data=[*chunk.offset.to_bytes(4, "big"), *chunk.data])
+
+
+def test_split():
+    assert split(b"abcdefg", 3, offset=3) == [Chunk(3, 3, b"def"), Chunk(6, 1, b"g")]
+
+
+def test_upload_window():
+    adapter = PageAdapter(window=4)
+    stats = BulkTransfer(adapter, here_is_page, window=4).upload(bytes(100), chunk_size=16)
+    assert stats.acked == 100
+    assert stats.retransmissions == 0
+    assert adapter.max_in_flight == 4
+    assert len(adapter.sent) == 7
+
+
+def test_upload_retransmits_only_lost_chunks():
+    adapter = PageAdapter(lost=[32], window=1)
+    progress = []
+    stats = BulkTransfer(adapter, here_is_page, window=4, progress=lambda s: progress.append(s.acked)).upload(
+        bytes(100), chunk_size=16,
+    )
+    assert stats.retransmissions == 1
+    # window keeps moving while the lost chunk waits for its own deadline
+    assert [int.from_bytes(bytes(p.data[:4]), "big") for p in adapter.sent] == [0, 16, 32, 48, 64, 80, 96, 32]
+    assert progress[-1] == 100
+
+
+def test_upload_fails_after_retries():
+    adapter = PageAdapter(window=1)
+    adapter.lost = {0}
+    engine = BulkTransfer(adapter, here_is_page, retries=0, timeout=0.01)
+    with pytest.raises(PySpheroTimeoutError):
+        engine.upload(bytes(16), chunk_size=16)
@@ -0,0 +1,112 @@
+import pytest
+
+from pysphero.capture import CaptureWriter, CaptureReader
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.packet import Packet
+
+
+@pytest.fixture
+def capture_path(tmp_path):
+    path = str(tmp_path / "session.cap")
+    with CaptureWriter(path) as writer:
+        for i in range(10):
+            command_id = 0x02 if i % 2 else 0x00
+            packet = Packet(0x18, command_id, flags=0x19, target_id=0x12, sequence=i, data=[0x00, i, 0x8d])
+            writer.write_packet(packet, timestamp=100.0 + i)
+        writer.write_raw([0x8d, 0x0a, 0x23, 0x42, 0x01, 0xab, 0x23, 0xab, 0x05, 0x57, 0xd8], timestamp=110.0)
+    return path
+
+
+def test_capture_read_all(capture_path):
+    with CaptureReader(capture_path) as reader:
+        assert len(reader) == 11
+        views = list(reader)
+        assert [v.timestamp for v in views] == [100.0 + i for i in range(11)]
+
+        view = views[3]
+        assert view.flags == 0x19
+        assert view.target_id == 0x12
+        assert view.source_id is None
+        assert view.id == (0x18, 0x02)
+        assert view.sequence == 3
+        assert isinstance(view.data, memoryview)
+        assert bytes(view.data) == bytes([0x00, 3, 0x8d])
+
+        last = reader[-1]
+        assert last.id == (0x23, 0x42)
+        assert bytes(last.data) == bytes([0xab, 0x8d])
+        assert last.checksum == 0x57
+
+
+def test_capture_to_packet(capture_path):
+    with CaptureReader(capture_path) as reader:
+        packet = reader[4].to_packet()
+        expected = Packet(0x18, 0x00, flags=0x19, target_id=0x12, sequence=4, data=[0x00, 4, 0x8d])
+        assert packet.build() == expected.build()
+
+
+def test_capture_window(capture_path):
+    with CaptureReader(capture_path) as reader:
+        assert [v.sequence for v in reader.window(102.0, 105.0)] == [2, 3, 4]
+        assert [v.sequence for v in reader.window(start=108.5)] == [9, 1]
+        assert list(reader.window(200.0)) == []
+
+
+def test_capture_frames_by_id(capture_path):
+    with CaptureReader(capture_path) as reader:
+        assert sorted(reader.ids()) == [(0x18, 0x00), (0x18, 0x02), (0x23, 0x42)]
+        assert [v.sequence for v in reader.frames(0x18, 0x02)] == [1, 3, 5, 7, 9]
+        assert [v.sequence for v in reader.frames(0x18, 0x02, start=102.0, end=107.0)] == [3, 5]
+        assert list(reader.frames(0x10, 0x00)) == []
+
+
+def test_capture_index_reused_and_rebuilt(capture_path):
+    with CaptureReader(capture_path) as reader:
+        assert len(reader) == 11
+
+    with CaptureWriter(capture_path) as writer:
+        writer.write_packet(Packet(0x18, 0x02, sequence=0x20), timestamp=120.0)
+
+    with CaptureReader(capture_path) as reader:
+        assert len(reader) == 12
+        assert reader[-1].sequence == 0x20
+
+
+def test_capture_truncated_record(capture_path):
+    with open(capture_path, "ab") as capture:
+        capture.write(b"\x00\x00\x00")
+
+    with CaptureReader(capture_path) as reader:
+        assert len(reader) == 11
+
+
+def test_capture_bad_file(tmp_path):
+    path = tmp_path / "bad.cap"
+    path.write_bytes(b"not a capture file")
+    with pytest.raises(PySpheroRuntimeError):
+        CaptureReader(str(path))
+
+
+def test_capture_clock_step(tmp_path):
+    path = str(tmp_path / "session.cap")
+    with CaptureWriter(path) as writer:
+        for sequence, timestamp in enumerate([100.0, 101.0, 102.0, 50.0, 51.0, 103.0]):
+            writer.write_packet(Packet(0x18, 0x02, sequence=sequence), timestamp=timestamp)
+
+    with CaptureReader(path) as reader:
+        assert [v.sequence for v in reader.window(100.5, 103.0)] == [1, 2]
+        assert [v.sequence for v in reader.window(end=60.0)] == [3, 4]
+        assert [v.sequence for v in reader.frames(0x18, 0x02, start=51.0, end=101.0)] == [0, 4]
+
+
+def test_capture_index_same_size(capture_path):
+    with CaptureReader(capture_path) as reader:
+        assert list(reader.frames(0x23, 0x43)) == []
+
+    # command id of the last frame is rewritten, size of capture is the same
+    with open(capture_path, "r+b") as capture:
+        capture.seek(-5, 2)
+        capture.write(b"\x43")
+
+    with CaptureReader(capture_path) as reader:
+        assert [v.id for v in reader.frames(0x23, 0x43)] == [(0x23, 0x43)]
@@ -0,0 +1,64 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.cli import main, LatencyStats  # noqa: E402
+
+
+def test_latency_stats():
+    stats = LatencyStats([0.003, 0.001, 0.002])
+    assert stats.values == pytest.approx([1.0, 2.0, 3.0])
+    assert stats.percentile(50) == pytest.approx(2.0)
+    assert str(LatencyStats([])) == "no responses"
+
+
+def test_ping():
+    out = io.StringIO()
+    assert main(["--simulated", "ping", "--count", "3", "--interval", "0"], out=out) == 0
+    assert "3 sent, 3 received, 0% lost" in out.getvalue()
+
+
+def test_ping_lost():
+    out = io.StringIO()
+    assert main(["--simulated", "--loss", "1", "ping", "-c", "2", "-i", "0", "-t", "0.05"], out=out) == 1
+    assert "2 sent, 0 received, 100% lost" in out.getvalue()
+
+
+def test_bench():
+    out = io.StringIO()
+    assert main(["--simulated", "bench", "--requests", "40", "--window", "8"], out=out) == 0
+    assert "latency: 40 requests, 0 lost" in out.getvalue()
+    assert "throughput: 40 requests" in out.getvalue()
+
+
+@pytest.mark.parametrize("arguments", [
+    ["ping", "--count", "0"],
+    ["bench", "--requests", "0"],
+    ["bench", "--window", "-1"],
+])
+def test_counts_must_be_positive(arguments):
+    with pytest.raises(SystemExit):
+        main(["--simulated", *arguments])
+
+
+def test_stream(tmp_path):
+    output = tmp_path / "samples.jsonl"
+    arguments = ["--simulated", "stream", "Accelerometer", "-i", "10", "-c", "3", "-f", "jsonl", "-o", str(output)]
+    assert main(arguments) == 0
+
+    samples = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(samples) == 3
+    assert set(samples[0]) == {"timestamp", "Accelerometer.x", "Accelerometer.y", "Accelerometer.z"}
+
+
+def test_stream_unknown_sensor():
+    with pytest.raises(SystemExit):
+        main(["--simulated", "stream", "Thermometer"])
+
+
+def test_command_is_required():
+    with pytest.raises(SystemExit):
+        main(["--simulated"])
@@ -0,0 +1,57 @@
+import contextlib
+import time
+
+from pysphero.controller import Controller, DriveOutput
+from pysphero.device_api.sensor import SensorStream, Attitude
+
+
+class FakeSensor:
+    def __init__(self):
+        self.samples = SensorStream(maxsize=1)
+
+    @contextlib.contextmanager
+    def stream(self, *sensors, **kwargs):
+        self.samples.put({Attitude.yaw: 10.0})
+        yield self.samples
+        self.samples.close()
+
+
+class FakeDriving:
+    def __init__(self):
+        self.outputs = []
+
+    def drive_with_heading(self, speed, heading, direction, wait_response=True):
+        assert not wait_response
+        self.outputs.append((speed, heading))
+
+
+class FakeSphero:
+    def __init__(self):
+        self.sensor = FakeSensor()
+        self.driving = FakeDriving()
+
+
+def test_controller_fixed_rate():
+    sphero = FakeSphero()
+    used = []
+
+    def control(sample):
+        used.append(sample)
+        return DriveOutput(speed=0, heading=int(sample.values[Attitude.yaw]))
+
+    controller = Controller(sphero, control, Attitude, rate=100)
+    controller.run(duration=0.2)
+
+    assert 10 <= controller.stats.iterations <= 21
+    assert sphero.driving.outputs[0] == (0, 10)
+    assert all(sample is used[0] for sample in used)
+    assert controller.stats.max_sample_age > 0
+
+
+def test_controller_overrun_skips_deadlines():
+    controller = Controller(FakeSphero(), lambda sample: time.sleep(0.025), rate=100)
+    controller.run(duration=0.1)
+
+    assert controller.stats.overruns == controller.stats.iterations
+    assert controller.stats.skipped >= controller.stats.iterations
+    assert controller.stats.iterations <= 5
@@ -0,0 +1,111 @@
+import pytest
+
+from pysphero.device_api.system_info import Version
+from pysphero.device_info import DeviceInfo, DeviceInfoCache
+
+INFO = DeviceInfo(
+    mac_address="aa:bb:cc:dd:ee:ff",
+    main_application_version=Version(4, 1, 10),
+    bootloader_version=Version(1, 0, 2),
+    sku="SB-1234",
+    stats_id=42,
+)
+
+
+def test_cache(tmp_path):
+    cache = DeviceInfoCache(str(tmp_path / "cache" / "device_info.json"))
+    assert cache.get(INFO.mac_address) is None
+
+    cache.put("AA:BB:CC:DD:EE:FF", INFO)
+    assert DeviceInfoCache(cache.path).get(INFO.mac_address) == INFO
+
+    cache.invalidate(INFO.mac_address)
+    assert cache.get(INFO.mac_address) is None
+
+
+def test_damaged_cache(tmp_path):
+    path = tmp_path / "device_info.json"
+    path.write_text("{")
+    assert DeviceInfoCache(str(path)).get(INFO.mac_address) is None
+
+
+def test_warm_up(tmp_path):
+    pytest.importorskip("bluepy")
+    from pysphero.bluetooth.simulated_adapter import SimulatedAdapter
+    from pysphero.core import Sphero
+
+    adapters = []
+
+    class CountingAdapter(SimulatedAdapter):
+        def __init__(self, mac_address):
+            super().__init__(mac_address)
+            self.writes = 0
+            adapters.append(self)
+
+        def _write_raw(self, data: bytes):
+            self.writes += 1
+            super()._write_raw(data)
+
+    cache = DeviceInfoCache(str(tmp_path / "device_info.json"))
+    with Sphero(INFO.mac_address, ble_adapter_cls=CountingAdapter, device_info_cache=cache, warm_up=True) as sphero:
+        # five requests of warm-up are packed into mtu-sized writes
+        burst = adapters[0].writes
+        assert 0 < burst < 5
+        info = sphero.device_info
+        assert cache.get(INFO.mac_address) == info
+
+        cache.put(INFO.mac_address, INFO)
+        sphero.invalidate_device_info()
+        # toy is asked again after reconnect, not the cache file
+        assert sphero.device_info == info
+        assert adapters[0].writes == 2 * burst
+
+    with Sphero(INFO.mac_address, ble_adapter_cls=CountingAdapter, device_info_cache=cache, warm_up=True) as sphero:
+        assert sphero.device_info == info
+        assert adapters[1].writes == 0
+
+        sphero.invalidate_device_info(persistent=True)
+        assert cache.get(INFO.mac_address) is None
+
+    with Sphero(INFO.mac_address, ble_adapter_cls=CountingAdapter, device_info_cache=cache) as sphero:
+        # device info is read on first use by default
+        assert adapters[2].writes == 0
+        assert sphero.device_info == info
+        assert adapters[2].writes > 0
+
+
+def test_invalidation_while_loading(tmp_path, monkeypatch):
+    pytest.importorskip("bluepy")
+    from pysphero import core
+    from pysphero.bluetooth.simulated_adapter import SimulatedAdapter
+    from pysphero.core import Sphero
+
+    cache = DeviceInfoCache(str(tmp_path / "device_info.json"))
+    with Sphero(INFO.mac_address, ble_adapter_cls=SimulatedAdapter, device_info_cache=cache, warm_up=False) as sphero:
+        def read_during_reconnect(ble_adapter):
+            # e.g. reconnect callback of adapter
+            sphero.invalidate_device_info()
+            return INFO
+
+        monkeypatch.setattr(core, "read_device_info", read_during_reconnect)
+        assert sphero.load_device_info() == INFO
+        assert sphero._device_info is None
+        assert sphero._device_info_outdated
+        assert cache.get(INFO.mac_address) is None
+
+
+def test_reflash_invalidates_cache(tmp_path):
+    pytest.importorskip("bluepy")
+    from pysphero.bluetooth.simulated_adapter import SimulatedAdapter
+    from pysphero.core import Sphero
+
+    cache = DeviceInfoCache(str(tmp_path / "device_info.json"))
+    with Sphero(INFO.mac_address, ble_adapter_cls=SimulatedAdapter, device_info_cache=cache, warm_up=True) as sphero:
+        assert cache.get(INFO.mac_address) is not None
+        sphero.secondary_mcu_firmware_update.begin_reflash()
+        assert cache.get(INFO.mac_address) is None
+
+        sphero.load_device_info()
+        sphero.secondary_mcu_firmware_update.jump_to_main_app()
+        assert cache.get(INFO.mac_address) is None
+        assert sphero._device_info is None
@@ -0,0 +1,65 @@
+import struct
+
+import pytest
+
+from pysphero.driving import Driving, DrivingCommand, Waypoint
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroRuntimeError
+from pysphero.packet import Packet
+
+
+class ToyAdapter:
+    """
+    Answer drive_to_position with result notification while result list isn't empty
+    """
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+        self.callback = None
+
+    def write(self, packet: Packet, **kwargs):
+        self.sent.append(packet)
+        if packet.command_id == DrivingCommand.drive_to_position.value and self.results:
+            self.callback(Packet(packet.device_id, DrivingCommand.drive_to_position_result_notify.value,
+                                 data=[self.results.pop(0)]))
+
+    def start_notify(self, packet, callback, timeout):
+        self.callback = callback
+
+    def stop_notify(self, packet_id=None):
+        self.callback = None
+
+
+def test_drive_to_position_payload():
+    adapter = ToyAdapter([])
+    Driving(adapter).drive_to_position(90, 1.5, -0.5, 0.3, 0x01)
+    assert struct.unpack(">ffffB", bytes(adapter.sent[0].data)) == (90, 1.5, -0.5, pytest.approx(0.3), 0x01)
+
+
+def assert_stopped(adapter: ToyAdapter):
+    stop = adapter.sent[-1]
+    assert stop.command_id == DrivingCommand.drive_with_heading.value
+    assert stop.data[0] == 0
+
+
+def test_follow_trajectory():
+    adapter = ToyAdapter([0x01, 0x01])
+    assert Driving(adapter).follow_trajectory([Waypoint(0, 1), Waypoint(1, 1, speed=0.2)]) == 2
+    assert len(adapter.sent) == 2
+    assert adapter.callback is None
+
+
+def test_follow_trajectory_leg_failed():
+    adapter = ToyAdapter([0x01, 0x00])
+    with pytest.raises(PySpheroRuntimeError):
+        Driving(adapter).follow_trajectory([Waypoint(0, 1), Waypoint(1, 1), Waypoint(1, 0)])
+    assert len(adapter.sent) == 3
+    assert_stopped(adapter)
+
+
+def test_follow_trajectory_leg_timeout():
+    adapter = ToyAdapter([])
+    with pytest.raises(PySpheroTimeoutError):
+        Driving(adapter).follow_trajectory([Waypoint(0, 1)], leg_timeout=0.01)
+    assert adapter.callback is None
+    assert_stopped(adapter)
@@ -0,0 +1,75 @@
+import pytest
+
+from pysphero.device_api import Version
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.firmware import FirmwareCache, DifferentialFlasher, ToyImage, page_hashes
+
+
+class FakeFirmwareUpdate:
+    def __init__(self, blank=()):
+        self.blank = set(blank)
+        self.checked = []
+
+    def is_page_blank(self, address):
+        self.checked.append(address)
+        return address in self.blank
+
+
+class FakeSphero:
+    def __init__(self, blank=()):
+        self.secondary_mcu_firmware_update = FakeFirmwareUpdate(blank)
+
+
+def test_cache(tmp_path):
+    cache = FirmwareCache(str(tmp_path / "cache" / "firmware.json"))
+    assert cache.get("AA:BB:CC:DD:EE:FF") is None
+
+    image = ToyImage(Version(1, 2, 3), 4, page_hashes(b"\x01" * 8, 4))
+    cache.put("AA:BB:CC:DD:EE:FF", image)
+    assert cache.get("aa:bb:cc:dd:ee:ff") == image
+
+    cache.invalidate("aa:bb:cc:dd:ee:ff")
+    assert FirmwareCache(cache.path).get("aa:bb:cc:dd:ee:ff") is None
+
+
+def test_only_changed_pages(tmp_path):
+    old = b"\x01" * 4 + b"\x02" * 4 + b"\x03" * 4
+    new = b"\x01" * 4 + b"\x07" * 4 + b"\x03" * 4 + b"\x04" * 2
+    flasher = DifferentialFlasher(FakeSphero(), FirmwareCache(str(tmp_path / "firmware.json")), page_size=4)
+
+    known = ToyImage(Version(1, 0, 0), 4, page_hashes(old, 4))
+    chunks = flasher._changed_pages(new, page_hashes(new, 4), known)
+    assert [(chunk.offset, chunk.data) for chunk in chunks] == [(4, b"\x07" * 4), (12, b"\x04" * 2)]
+
+
+def test_unknown_toy_skips_blank_pages(tmp_path):
+    sphero = FakeSphero(blank=[4])
+    image = b"\x01" * 4 + b"\xff" * 8
+    flasher = DifferentialFlasher(sphero, FirmwareCache(str(tmp_path / "firmware.json")), page_size=4)
+
+    chunks = flasher._changed_pages(image, page_hashes(image, 4), None)
+    assert [chunk.offset for chunk in chunks] == [0, 8]
+    assert sphero.secondary_mcu_firmware_update.checked == [4, 8]
+
+
+def test_shorter_image_blanks_old_pages(tmp_path):
+    old = b"\x01" * 4 + b"\x02" * 4 + b"\xff" * 4 + b"\x03" * 4
+    new = b"\x01" * 4
+    flasher = DifferentialFlasher(FakeSphero(), FirmwareCache(str(tmp_path / "firmware.json")), page_size=4)
+
+    known = ToyImage(Version(1, 0, 0), 4, page_hashes(old, 4))
+    chunks = flasher._stale_pages(page_hashes(new, 4), known)
+    assert [(chunk.offset, chunk.data) for chunk in chunks] == [(4, b"\xff" * 4), (12, b"\xff" * 4)]
+
+
+def test_unknown_toy_rejects_longer_firmware(tmp_path):
+    image = b"\x01" * 8
+    sphero = FakeSphero(blank=[12])
+    flasher = DifferentialFlasher(sphero, FirmwareCache(str(tmp_path / "firmware.json")), page_size=4)
+
+    with pytest.raises(PySpheroRuntimeError):
+        flasher._stale_pages(page_hashes(image, 4), None)
+    assert sphero.secondary_mcu_firmware_update.checked == [8]
+
+    sphero.secondary_mcu_firmware_update.blank.add(8)
+    assert flasher._stale_pages(page_hashes(image, 4), None) == []
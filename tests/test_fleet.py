@@ -0,0 +1,125 @@
+import multiprocessing
+import struct
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("multiprocessing.shared_memory")
+
+from pysphero.device_api.sensor import Accelerometer  # noqa: E402
+from pysphero.fleet import SampleRing, ToyConfig, Fleet  # noqa: E402
+
+PARAMETERS = [Accelerometer.x, Accelerometer.y, Accelerometer.z]
+
+
+@pytest.fixture
+def ring():
+    ring = SampleRing.create(PARAMETERS, capacity=4)
+    yield ring
+    ring.close()
+
+
+def test_ring_read(ring):
+    ring.append({Accelerometer.x: 1.0, Accelerometer.y: 2.0}, timestamp=10.0)
+    ring.append({Accelerometer.z: 3.0}, timestamp=11.0)
+
+    samples, position = ring.read(0)
+    assert position == 2
+    assert [sample.timestamp for sample in samples] == [10.0, 11.0]
+    assert samples[0].values == {Accelerometer.x: 1.0, Accelerometer.y: 2.0}
+    assert samples[1].values == {Accelerometer.z: 3.0}
+    assert ring.read(position) == ([], 2)
+
+
+def test_ring_overwrite(ring):
+    for i in range(6):
+        ring.append({Accelerometer.x: float(i)}, timestamp=float(i))
+
+    assert ring.get(1) is None
+    samples, position = ring.read(0)
+    assert position == 6
+    assert [sample.values[Accelerometer.x] for sample in samples] == [2.0, 3.0, 4.0, 5.0]
+    assert ring.latest().timestamp == 5.0
+
+
+def test_ring_attach(ring):
+    reader = SampleRing.attach(ring.name, PARAMETERS, ring.capacity)
+    try:
+        ring.append({Accelerometer.y: 4.0}, timestamp=1.0)
+        assert reader.latest().values == {Accelerometer.y: 4.0}
+
+        column = reader.column(Accelerometer.y)
+        assert column[0] == 4.0
+        column.release()
+    finally:
+        reader.close()
+
+
+def _streaming_adapter_cls():
+    from pysphero.bluetooth.ble_adapter import AbstractBleAdapter
+    from pysphero.packet import Packet, Flag
+
+    class StreamingAdapter(AbstractBleAdapter):
+        """
+        Answer every request, stream accelerometer after streaming mask is set
+        """
+
+        def _connect(self):
+            pass
+
+        def _disconnect(self):
+            pass
+
+        def _write_raw(self, data: bytes):
+            request = Packet.from_response(list(data))
+            response = Packet(
+                request.device_id,
+                request.command_id,
+                flags=Flag.response.value,
+                sequence=request.sequence,
+                data=[0x00],
+            )
+            self.packet_collector.append_raw_data(response.build())
+            if (request.device_id, request.command_id) == (0x18, 0x00):
+                threading.Thread(target=self._stream, daemon=True).start()
+
+        def _stream(self):
+            while self._running.is_set():
+                frame = Packet(0x18, 0x02, flags=0x00, data=list(struct.pack(">fff", 1.0, 2.0, 3.0)))
+                self.packet_collector.append_raw_data(frame.build())
+                time.sleep(0.01)
+
+    return StreamingAdapter
+
+
+def test_fleet():
+    pytest.importorskip("bluepy")
+    # arguments of process aren't pickled by fork, so local adapter class can be used
+    config = ToyConfig("aa:bb:cc:dd:ee:ff", sensors=(Accelerometer,), ble_adapter_cls=_streaming_adapter_cls())
+
+    with Fleet(config, restart_delay=0.1, context=multiprocessing.get_context("fork")) as fleet:
+        worker = fleet[config.mac_address]
+        worker.call("driving.reset_yaw").result(5)
+
+        deadline = time.monotonic() + 5
+        while worker.telemetry.head == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sample = worker.telemetry.latest()
+        assert sample.values == {Accelerometer.x: 1.0, Accelerometer.y: 2.0, Accelerometer.z: 3.0}
+
+        with pytest.raises(AttributeError):
+            worker.call("driving.no_such_command").result(5)
+
+        receiver = worker._receiver
+        worker.process.kill()
+        deadline = time.monotonic() + 5
+        while worker.restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert worker.restarts == 1
+        # receiver of the killed process is ended by end of its pipe
+        receiver.join(5)
+        assert not receiver.is_alive()
+        assert worker._receiver is not receiver
+        worker.call("driving.reset_yaw").result(5)
+
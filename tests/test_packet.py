@@ -2,7 +2,7 @@ import pytest
 
 from pysphero.constants import Api2Error
 from pysphero.exceptions import PySpheroRuntimeError
-from pysphero.packet import Packet
+from pysphero.packet import Packet, PacketTemplate
 
 
 def test_packet_init():
@@ -213,3 +213,24 @@ def test_packet_from_response_bad_data():
     raw_packet = [0x8d, 0x0a, 0x23, 0x42, 0x01, 0x15, 0x16, 0xff, 0xd8]
     with pytest.raises(PySpheroRuntimeError):
         Packet.from_response(raw_packet)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x01\x02\x03", b"\x8d\xab\xd8", bytes(range(0x80, 0xe0))])
+@pytest.mark.parametrize("flags, target_id, source_id", [(None, None, None), (None, 0x12, None), (0x3a, 0x8d, 0xab)])
+def test_packet_template_build(data, flags, target_id, source_id):
+    template = PacketTemplate(0x16, 0xd8, flags=flags, target_id=target_id, source_id=source_id)
+    for sequence in (0x00, 0x8d, 0xab, 0xd8, 0xff):
+        packet = Packet(0x16, 0xd8, flags=flags, target_id=target_id, source_id=source_id, sequence=sequence,
+                        data=list(data))
+        assert template.build(sequence, data) == packet.build()
+        assert template.packet(data, sequence).build() == packet.build()
+
+
+def test_packet_template_reuses_buffer():
+    template = PacketTemplate(0x16, 0x07, target_id=0x12)
+    long = template.build(0x01, bytes(range(0x80, 0xe0)))
+    buffer = template._buffer
+    short = template.build(0x02, b"\x8d")
+    assert template._buffer is buffer
+    assert short == Packet(0x16, 0x07, target_id=0x12, sequence=0x02, data=[0x8d]).build()
+    assert long == Packet(0x16, 0x07, target_id=0x12, sequence=0x01, data=list(range(0x80, 0xe0))).build()
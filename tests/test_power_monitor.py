@@ -0,0 +1,117 @@
+import threading
+import time
+
+from pysphero.device_api import Power
+from pysphero.device_api.power import PowerCommand, ChargerStates, BatteryVoltageStates
+from pysphero.exceptions import PySpheroRuntimeError, PySpheroTimeoutError
+from pysphero.packet import Packet
+from pysphero.power_monitor import PowerMonitor, SleepState
+
+
+class ToyAdapter:
+    """
+    Answer battery polls, notifications are sent by test
+    """
+
+    def __init__(self, percentage: int = 87):
+        self.percentage = percentage
+        self.sent = []
+        self.remembered = {}
+        self.callbacks = {}
+
+    def write(self, packet: Packet, **kwargs):
+        self.sent.append(packet)
+        if self.percentage is None:
+            raise PySpheroTimeoutError("Toy is asleep")
+        if packet.command_id == PowerCommand.get_battery_percentage.value:
+            return Packet(packet.device_id, packet.command_id, data=[self.percentage])
+        if packet.command_id == PowerCommand.get_battery_state.value:
+            return Packet(packet.device_id, packet.command_id, data=[BatteryVoltageStates.ok.value])
+
+    def remember(self, packet: Packet):
+        self.remembered[packet.id] = packet
+
+    def start_notify(self, packet, callback, timeout):
+        self.callbacks[packet.id] = callback
+
+    def stop_notify(self, packet_id=None):
+        if packet_id not in self.callbacks:
+            raise PySpheroRuntimeError("Future not found")
+        del self.callbacks[packet_id]
+
+    def notify(self, command: PowerCommand, data=()):
+        self.callbacks[(0x13, command.value)](Packet(0x13, command.value, flags=0x00, data=list(data)))
+
+
+class Toy:
+    mac_address = "aa:bb:cc:dd:ee:ff"
+
+    def __init__(self, adapter: ToyAdapter):
+        self.power = Power(adapter)
+
+
+def test_power_monitor():
+    adapter = ToyAdapter()
+    changed = threading.Event()
+    monitor = PowerMonitor(Toy(adapter), reconcile_interval=60, on_change=lambda state: changed.set())
+    with monitor:
+        assert changed.wait(1)
+        assert monitor.state.battery_percentage == 87
+        assert monitor.state.battery_state is BatteryVoltageStates.ok
+        assert adapter.remembered[(0x13, PowerCommand.enable_battery_state_change_notification.value)].data == [1]
+
+        polls = len(adapter.sent)
+        adapter.notify(PowerCommand.battery_state_changed, [ChargerStates.charging.value])
+        adapter.notify(PowerCommand.will_sleep_async)
+        assert monitor.state.charger_state is ChargerStates.charging
+        assert monitor.state.sleep_state is SleepState.will_sleep
+
+        adapter.notify(PowerCommand.sleep_async)
+        state = monitor.state
+        assert state.sleep_state is SleepState.asleep
+        assert state.sleep_updated >= state.charger_updated
+        # reading of state sends nothing
+        assert len(adapter.sent) == polls
+
+    assert adapter.callbacks == {}
+
+
+def test_reconcile_failure_keeps_state():
+    adapter = ToyAdapter()
+    monitor = PowerMonitor(Toy(adapter), reconcile_interval=0.01)
+    monitor.start()
+    monitor.reconcile()
+
+    adapter.percentage = None
+    polls = len(adapter.sent)
+    while len(adapter.sent) < polls + 2:
+        time.sleep(0.01)
+    monitor.stop()
+
+    assert monitor.state.battery_percentage == 87
+    assert monitor.state.battery_updated is not None
+
+
+def test_reconcile_marks_toy_awake():
+    adapter = ToyAdapter()
+    monitor = PowerMonitor(Toy(adapter), reconcile_interval=60)
+    with monitor:
+        adapter.notify(PowerCommand.sleep_async)
+        assert monitor.state.sleep_state is SleepState.asleep
+
+        # toy was woken up outside of monitor
+        monitor.reconcile()
+        state = monitor.state
+        assert state.sleep_state is SleepState.awake
+        assert state.sleep_updated == state.battery_updated
+
+
+def test_stop_cancels_subscriptions_of_lost_toy():
+    adapter = ToyAdapter()
+    monitor = PowerMonitor(Toy(adapter), reconcile_interval=60)
+    monitor.start()
+
+    # disabling of notification isn't answered
+    adapter.percentage = None
+    monitor.stop()
+    assert adapter.callbacks == {}
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.receive_ring import ReceiveRing  # noqa: E402
+
+
+def test_push_pop_wraps_around():
+    ring = ReceiveRing(capacity=8)
+    assert ring.push(b"abcde")
+    assert ring.pop(timeout=0) == b"abcde"
+    assert ring.push(b"fghijk")
+    assert ring.occupancy == 6
+    assert ring.pop(timeout=0) == b"fghijk"
+    assert ring.high_water == 6
+
+
+def test_full_ring_drops_chunk():
+    ring = ReceiveRing(capacity=8)
+    assert ring.push(b"abcdef")
+    assert not ring.push(b"ghi")
+    assert (ring.dropped, ring.dropped_chunks) == (3, 1)
+    assert ring.pop(timeout=0) == b"abcdef"
+
+
+def test_pop_timeout():
+    assert ReceiveRing().pop(timeout=0.01) == b""
+
+
+def test_producer_consumer_keep_order():
+    ring = ReceiveRing(capacity=64)
+    chunks = [bytes([i % 256]) * (i % 7 + 1) for i in range(2000)]
+    received = bytearray()
+
+    def consume():
+        while len(received) < sum(map(len, chunks)):
+            received.extend(ring.pop(timeout=1))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for chunk in chunks:
+        while not ring.push(chunk):
+            pass
+    consumer.join()
+
+    assert bytes(received) == b"".join(chunks)
+    assert ring.high_water <= ring.capacity
@@ -0,0 +1,173 @@
+import struct
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from pysphero.device_api.sensor import Sensor, StreamingLayout, Quaternion, Accelerometer, Gyroscope, CoreTime, \
+    AmbientLight, Locator, SensorStream, OverflowPolicy, Collision, parameter_name, parameter_by_name
+from pysphero.exceptions import PySpheroTimeoutError, PySpheroConnectionLostError
+
+
+def test_layout_primary_mask():
+    layout = StreamingLayout.from_sensors(CoreTime, Quaternion)
+    assert layout.mask == 0x3c00002
+    assert layout.extended_mask == 0x0
+    assert layout.parameters == [Quaternion.x, Quaternion.y, Quaternion.z, Quaternion.w, CoreTime.core_time]
+
+
+def test_layout_extended_mask():
+    layout = StreamingLayout.from_sensors(Gyroscope, Quaternion, Accelerometer, AmbientLight)
+    assert layout.mask == Quaternion.mask() | Accelerometer.mask()
+    assert layout.extended_mask == Gyroscope.mask() | AmbientLight.mask()
+    assert layout.parameters == [
+        Quaternion.x, Quaternion.y, Quaternion.z, Quaternion.w,
+        Accelerometer.x, Accelerometer.y, Accelerometer.z,
+        Gyroscope.x, Gyroscope.y, Gyroscope.z,
+        AmbientLight.ambient_light,
+    ]
+
+
+def test_layout_decode():
+    layout = StreamingLayout.from_sensors(Gyroscope, Quaternion)
+    data = list(struct.pack(">7f", 0.1, 0.2, 0.3, 0.4, 10.0, 20.0, 30.0))
+    values = layout.decode(data)
+    assert values[Quaternion.w] == struct.unpack(">f", struct.pack(">f", 0.4))[0]
+    assert values[Gyroscope.x] == 10.0
+    assert values[Gyroscope.z] == 30.0
+
+
+def test_layout_decode_modifier():
+    layout = StreamingLayout.from_sensors(Locator)
+    values = layout.decode(list(struct.pack(">2f", 1.5, -2.0)))
+    assert values == {Locator.x: 150.0, Locator.y: -200.0}
+
+
+def test_stream_next_and_iter():
+    stream = SensorStream()
+    stream.put({CoreTime.core_time: 1.0}, timestamp=10.0)
+    stream.put({CoreTime.core_time: 2.0}, timestamp=11.0)
+    stream.close()
+
+    sample = stream.next(timeout=0)
+    assert sample.timestamp == 10.0
+    assert sample.values == {CoreTime.core_time: 1.0}
+    assert [s.values[CoreTime.core_time] for s in stream] == [2.0]
+
+
+def test_stream_next_timeout():
+    stream = SensorStream()
+    with pytest.raises(PySpheroTimeoutError):
+        stream.next(timeout=0.01)
+
+
+def test_stream_drop_oldest():
+    stream = SensorStream(maxsize=2, overflow=OverflowPolicy.drop_oldest)
+    for i in range(5):
+        stream.put({CoreTime.core_time: i})
+    assert stream.dropped == 3
+    assert [s.values[CoreTime.core_time] for s in stream.take(5, timeout=0)] == [3, 4]
+
+
+def test_stream_drop_newest():
+    stream = SensorStream(maxsize=2, overflow=OverflowPolicy.drop_newest)
+    for i in range(5):
+        stream.put({CoreTime.core_time: i})
+    assert stream.dropped == 3
+    assert [s.values[CoreTime.core_time] for s in stream.take(5, timeout=0)] == [0, 1]
+
+
+def test_stream_block():
+    stream = SensorStream(maxsize=1, overflow=OverflowPolicy.block)
+    stream.put({CoreTime.core_time: 0})
+    producer = threading.Thread(target=stream.put, args=({CoreTime.core_time: 1},))
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+
+    assert stream.next(timeout=1).values[CoreTime.core_time] == 0
+    producer.join(1)
+    assert stream.next(timeout=1).values[CoreTime.core_time] == 1
+    assert stream.dropped == 0
+
+
+def test_stream_take_waits_for_batch():
+    stream = SensorStream()
+    timer = threading.Timer(0.02, lambda: [stream.put({CoreTime.core_time: i}) for i in range(3)])
+    timer.start()
+    assert len(stream.take(3, timeout=1)) == 3
+    assert stream.take(3, timeout=0.01) == []
+
+
+def test_stream_closed_with_error():
+    stream = SensorStream()
+    stream.put({CoreTime.core_time: 0})
+    stream.close(PySpheroTimeoutError("no frames"))
+    assert len(stream.take(10, timeout=0)) == 1
+    with pytest.raises(PySpheroTimeoutError):
+        stream.next()
+
+
+def test_parameter_name():
+    assert parameter_name(Accelerometer.x) == "Accelerometer.x"
+    assert parameter_by_name("Accelerometer.x") is Accelerometer.x
+    assert parameter_by_name("Gyroscope.x") is Gyroscope.x
+    with pytest.raises(KeyError):
+        parameter_by_name("Unknown.x")
+
+
+def test_collision_from_bytes():
+    data = struct.pack(">hhhBhhBI", 4096, -2048, 0, 0x02, 120, -35, 87, 123456)
+    collision = Collision.from_bytes(list(data))
+    assert collision.acceleration_x == 1.0
+    assert collision.acceleration_y == -0.5
+    assert not collision.x_axis
+    assert collision.y_axis
+    assert (collision.power_x, collision.power_y, collision.speed, collision.timestamp) == (120, -35, 87, 123456)
+    assert collision.magnitude == pytest.approx(1.118, abs=1e-3)
+
+
+@pytest.mark.parametrize("parameter", ["x_threshold", "y_threshold", "x_speed", "y_speed", "dead_time"])
+@pytest.mark.parametrize("value", [-1, 256])
+def test_collision_detection_parameters_out_of_range(parameter, value):
+    # nothing is sent to toy
+    with pytest.raises(ValueError):
+        Sensor(None).configure_collision_detection(**{parameter: value})
+
+
+class LostLinkAdapter:
+    """
+    Streaming is started, then link is lost
+    """
+
+    def __init__(self):
+        self.connected = True
+
+    def write(self, packet, **kwargs):
+        if not self.connected:
+            raise PySpheroConnectionLostError("Connection lost")
+
+    def remember(self, packet):
+        pass
+
+    def start_notify(self, packet, callback, timeout):
+        return Future()
+
+    def stop_notify(self, packet_id=None):
+        pass
+
+
+def test_stream_error_not_hidden_by_lost_link():
+    adapter = LostLinkAdapter()
+    with pytest.raises(PySpheroTimeoutError):
+        with Sensor(adapter).stream(CoreTime):
+            adapter.connected = False
+            raise PySpheroTimeoutError("no frames")
+
+
+def test_stream_upstream_dropped():
+    upstream = [0]
+    stream = SensorStream(maxsize=1, overflow=OverflowPolicy.block, upstream_dropped=lambda: upstream[0])
+    stream.put({CoreTime.core_time: 0})
+    upstream[0] = 5
+    assert stream.dropped == 5
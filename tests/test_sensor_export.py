@@ -0,0 +1,49 @@
+import pytest
+
+from pysphero.device_api.sensor import Accelerometer, CoreTime
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.sensor_export import ColumnarSink
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(PySpheroRuntimeError):
+        ColumnarSink(str(tmp_path / "session.json"), Accelerometer)
+
+
+def _record(sink: ColumnarSink, rows: int):
+    for i in range(rows):
+        values = {Accelerometer.x: i, Accelerometer.y: -i, Accelerometer.z: 0.5, CoreTime.core_time: 1000.0 + i}
+        if i == 3:
+            del values[Accelerometer.z]
+        sink.append(values, timestamp=float(i))
+
+
+def test_export_npz(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    path = str(tmp_path / "session.npz")
+    with ColumnarSink(path, Accelerometer, CoreTime, chunk_size=4) as sink:
+        _record(sink, 10)
+
+    with numpy.load(path) as data:
+        assert sorted(data.files) == sorted(["host_time", "Accelerometer.x", "Accelerometer.y", "Accelerometer.z",
+                                             "CoreTime.core_time"])
+        assert list(data["host_time"]) == [float(i) for i in range(10)]
+        assert list(data["Accelerometer.x"]) == [float(i) for i in range(10)]
+        assert numpy.isnan(data["Accelerometer.z"][3])
+        assert data["CoreTime.core_time"][9] == 1009.0
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_export_arrow(tmp_path, suffix):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    path = str(tmp_path / f"session{suffix}")
+    with ColumnarSink(path, Accelerometer, CoreTime, chunk_size=4) as sink:
+        _record(sink, 10)
+
+    read = pyarrow.parquet.read_table if suffix == ".parquet" else pyarrow.feather.read_table
+    table = read(path)
+    assert table.num_rows == 10
+    assert table.column("Accelerometer.y").to_pylist() == [float(-i) for i in range(10)]
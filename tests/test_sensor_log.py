@@ -0,0 +1,195 @@
+import math
+import shutil
+import time
+
+import pytest
+
+from pysphero.device_api.sensor import Accelerometer, CoreTime, Gyroscope
+from pysphero.exceptions import PySpheroRuntimeError
+from pysphero.sensor_log import SensorLogWriter, SensorLogReader, HEADER_SIZE, _Records
+
+
+def _values(i: int):
+    return {Accelerometer.x: i, Accelerometer.y: -i, Accelerometer.z: 0.5, CoreTime.core_time: 1000.0 + i}
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / "session.log")
+    with SensorLogWriter(path, Accelerometer, CoreTime, index_every=8, grow_by=1024) as log:
+        for i in range(100):
+            log.append(_values(i), timestamp=float(i))
+    return path
+
+
+def test_log_read(log_path):
+    with SensorLogReader(log_path) as reader:
+        assert len(reader) == 100
+        assert reader.parameters == [Accelerometer.x, Accelerometer.y, Accelerometer.z, CoreTime.core_time]
+
+        sample = reader[42]
+        assert sample.timestamp == 42.0
+        assert sample.values == _values(42)
+        assert reader[-1].timestamp == 99.0
+        assert [sample.timestamp for sample in reader][:3] == [0.0, 1.0, 2.0]
+
+
+def test_log_range(log_path):
+    with SensorLogReader(log_path) as reader:
+        assert [s.timestamp for s in reader.range(10.0, 13.0)] == [10.0, 11.0, 12.0]
+        assert [s.timestamp for s in reader.range(97.5)] == [98.0, 99.0]
+        assert [s.timestamp for s in reader.range(end=2.0)] == [0.0, 1.0]
+        assert list(reader.range(200.0)) == []
+
+
+def test_log_missing_values(tmp_path):
+    path = str(tmp_path / "session.log")
+    with SensorLogWriter(path, Accelerometer, Gyroscope) as log:
+        log.append({Gyroscope.z: 1.0}, timestamp=1.0)
+
+    with SensorLogReader(path) as reader:
+        assert reader[0].values == {Gyroscope.z: 1.0}
+
+
+def test_log_recover_after_crash(log_path):
+    # sequence, crc, timestamp and 4 floats
+    record_size = 4 + 4 + 8 + 4 * 4
+
+    # torn last record and zeroed tail like after power loss
+    with open(log_path, "r+b") as log:
+        log.seek(HEADER_SIZE + 99 * record_size + 12)
+        log.write(b"\xff\xff")
+        log.seek(0, 2)
+        log.write(bytes(4096))
+
+    with SensorLogReader(log_path) as reader:
+        assert len(reader) == 99
+        assert [s.timestamp for s in reader.range(96.0)] == [96.0, 97.0, 98.0]
+
+    with SensorLogWriter(log_path, Accelerometer, CoreTime) as log:
+        assert log.count == 99
+        log.append(_values(500), timestamp=500.0)
+
+    with SensorLogReader(log_path) as reader:
+        assert len(reader) == 100
+        assert reader[-1].values[CoreTime.core_time] == 1500.0
+        assert math.isclose(reader[98].timestamp, 98.0)
+
+
+def test_log_another_layout(log_path):
+    with pytest.raises(PySpheroRuntimeError):
+        SensorLogWriter(log_path, Gyroscope)
+
+
+def test_log_bad_file(tmp_path):
+    path = tmp_path / "bad.log"
+    path.write_bytes(b"not a sensor log" * 512)
+    with pytest.raises(PySpheroRuntimeError):
+        SensorLogReader(str(path))
+
+
+def _crashed_copy(tmp_path, log: SensorLogWriter) -> str:
+    """
+    File of open writer as it would be found after power loss, every page reached the disk
+    """
+    path = str(tmp_path / "crashed.log")
+    shutil.copyfile(log.path, path)
+    return path
+
+
+def test_log_recover_stops_at_hole(tmp_path):
+    record_size = 4 + 4 + 8 + 4 * 4
+    with SensorLogWriter(str(tmp_path / "session.log"), Accelerometer, CoreTime, flush_every=None,
+                         flush_interval=None) as log:
+        for i in range(100):
+            if i == 40:
+                log.flush()
+            log.append(_values(i), timestamp=float(i))
+        path = _crashed_copy(tmp_path, log)
+
+    # page of record 70 didn't reach the disk, later pages did
+    with open(path, "r+b") as crashed:
+        crashed.seek(HEADER_SIZE + 70 * record_size)
+        crashed.write(bytes(record_size))
+
+    with SensorLogReader(path) as reader:
+        assert len(reader) == 70
+
+
+def test_log_open_checks_only_uncommitted_records(tmp_path, monkeypatch):
+    with SensorLogWriter(str(tmp_path / "session.log"), Accelerometer, CoreTime, flush_every=None,
+                         flush_interval=None) as log:
+        for i in range(100):
+            if i == 90:
+                log.flush()
+            log.append(_values(i), timestamp=float(i))
+        path = _crashed_copy(tmp_path, log)
+
+    checked = []
+    is_complete = _Records.is_complete
+
+    def tracking_is_complete(records, number):
+        checked.append(number)
+        return is_complete(records, number)
+
+    monkeypatch.setattr(_Records, "is_complete", tracking_is_complete)
+    with SensorLogReader(path) as reader:
+        assert len(reader) == 100
+    # the last committed record, uncommitted ones and the first empty slot
+    assert checked == list(range(89, 101))
+
+
+def test_log_range_after_clock_step(tmp_path):
+    path = str(tmp_path / "session.log")
+    with SensorLogWriter(path, Accelerometer, CoreTime, index_every=2) as log:
+        for i in range(10):
+            log.append(_values(i), timestamp=100.0 + i)
+    # next session after the clock was stepped back
+    with SensorLogWriter(path, Accelerometer, CoreTime) as log:
+        for i in range(10):
+            log.append(_values(i), timestamp=50.0 + i)
+
+    with SensorLogReader(path) as reader:
+        assert [s.timestamp for s in reader.range(104.0, 106.0)] == [104.0, 105.0]
+        assert [s.timestamp for s in reader.range(55.0, 57.0)] == [55.0, 56.0]
+
+
+def test_log_session_follows_monotonic_clock(tmp_path, monkeypatch):
+    path = str(tmp_path / "session.log")
+    with SensorLogWriter(path, Accelerometer) as log:
+        log.append({Accelerometer.x: 1.0})
+        # ntp steps wall clock back during recording
+        monkeypatch.setattr(time, "time", lambda: 0.0)
+        log.append({Accelerometer.x: 2.0})
+
+    with SensorLogReader(path) as reader:
+        assert reader[1].timestamp >= reader[0].timestamp > 0.0
+
+
+def test_log_flushed_periodically(tmp_path, monkeypatch):
+    path = str(tmp_path / "session.log")
+    log = SensorLogWriter(path, Accelerometer, CoreTime, flush_every=4, flush_interval=None)
+    flushes = []
+    flush = log.flush
+    monkeypatch.setattr(log, "flush", lambda: (flushes.append(log.count), flush()))
+    for i in range(10):
+        log.append(_values(i), timestamp=float(i))
+    assert flushes == [4, 8]
+    log.close()
+
+
+def test_log_writer_closes_short_file(tmp_path, monkeypatch):
+    path = tmp_path / "short.log"
+    path.write_bytes(b"PSLOG")
+    opened = []
+    original_open = open
+
+    def tracking_open(*args, **kwargs):
+        file = original_open(*args, **kwargs)
+        opened.append(file)
+        return file
+
+    monkeypatch.setattr("builtins.open", tracking_open)
+    with pytest.raises(PySpheroRuntimeError):
+        SensorLogWriter(str(path), Accelerometer)
+    assert opened and all(file.closed for file in opened)
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.sequence_allocator import SequenceAllocator  # noqa: E402
+from pysphero.exceptions import PySpheroRuntimeError  # noqa: E402
+from pysphero.packet import Packet  # noqa: E402
+
+
+def test_outstanding_sequences_are_skipped():
+    sequences = SequenceAllocator(window=256)
+    packets = [sequences.packet(device_id=0x13, command_id=0x10) for _ in range(256)]
+    assert sorted(p.sequence for p in packets) == list(range(256))
+
+    sequences.release(packets[7])
+    assert sequences.allocate() == 7
+
+
+def test_release_of_foreign_packet_is_ignored():
+    sequences = SequenceAllocator()
+    packet = sequences.packet(device_id=0x13, command_id=0x10)
+    sequences.release(Packet(0x13, 0x10, sequence=packet.sequence))
+    assert sequences.outstanding == 1
+
+
+def test_exhausted_window_raises():
+    sequences = SequenceAllocator(window=2, block=False)
+    sequences.allocate()
+    sequences.allocate()
+    with pytest.raises(PySpheroRuntimeError):
+        sequences.allocate()
+
+
+def test_exhausted_window_blocks_until_release():
+    sequences = SequenceAllocator(window=1, timeout=1)
+    packet = sequences.packet(device_id=0x13, command_id=0x10)
+    threading.Timer(0.02, sequences.release, args=(packet,)).start()
+    assert sequences.allocate() == packet.sequence + 1
+
+
+def test_concurrent_allocation_is_unique():
+    sequences = SequenceAllocator(window=256)
+    allocated = []
+
+    def allocate():
+        for _ in range(64):
+            allocated.append(sequences.allocate())
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(allocated)) == 256
+
+
+def test_packet_counter_skips_outstanding_sequences():
+    sequences = SequenceAllocator()
+    allocated = sequences.packet(device_id=0x13, command_id=0x10)
+    Packet._sequence = (allocated.sequence - 1) % 256
+    assert Packet(0x13, 0x10).sequence == (allocated.sequence + 1) % 256
+
+    sequences.release(allocated)
+    Packet._sequence = (allocated.sequence - 1) % 256
+    assert Packet(0x13, 0x10).sequence == allocated.sequence
@@ -0,0 +1,106 @@
+import io
+
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.packet_collector import PacketCollector  # noqa: E402
+from pysphero.bluetooth.timeout_policy import AdaptiveTimeout  # noqa: E402
+from pysphero.device_api.system_info import SystemInfo, SystemInfoCommand  # noqa: E402
+from pysphero.exceptions import PySpheroRuntimeError  # noqa: E402
+from pysphero.packet import Packet, Flag  # noqa: E402
+
+
+class LogAdapter:
+    def __init__(self, log: bytes, lost=(), short=()):
+        self.log = log
+        self.lost = set(lost)
+        self.short = list(short)
+        self.packet_collector = PacketCollector()
+        self.timeout_policy = AdaptiveTimeout(initial_timeout=0.05)
+
+    def send(self, packet: Packet):
+        if packet.command_id == SystemInfoCommand.get_log_status.value:
+            data = len(self.log).to_bytes(4, "big")
+        else:
+            offset = int.from_bytes(bytes(packet.data[:4]), "big")
+            if offset in self.lost:
+                self.lost.discard(offset)
+                return
+            data = self.log[offset:offset + int.from_bytes(bytes(packet.data[4:6]), "big")]
+            if offset in self.short:
+                self.short.remove(offset)
+                data = data[:len(data) // 2]
+
+        response = Packet(packet.device_id, packet.command_id, flags=Flag.response.value,
+                          sequence=packet.sequence, data=[0x00, *data])
+        self.packet_collector.append_raw_data(response.build())
+
+    def write(self, packet: Packet, **kwargs):
+        self.send(packet)
+        return self.packet_collector.get_response(packet, timeout=1)
+
+
+LOG = bytes(range(256)) * 3
+
+
+def test_iter_log_in_order_with_lost_chunk():
+    system_info = SystemInfo(LogAdapter(LOG, lost=[128]))
+    assert b"".join(system_info.iter_log(chunk_size=64, window=4)) == LOG
+
+
+def test_iter_log_requests_short_chunk_again():
+    system_info = SystemInfo(LogAdapter(LOG, short=[128, 128]))
+    assert b"".join(system_info.iter_log(chunk_size=64, window=4)) == LOG
+
+
+def test_iter_log_raises_on_short_chunk():
+    system_info = SystemInfo(LogAdapter(LOG, short=[128] * 4))
+    with pytest.raises(PySpheroRuntimeError):
+        b"".join(system_info.iter_log(chunk_size=64, window=4))
+
+
+def test_get_log_chunk_raises_on_short_chunk():
+    with pytest.raises(PySpheroRuntimeError):
+        SystemInfo(LogAdapter(LOG)).get_log_chunk(len(LOG) - 10, 20)
+
+
+def test_download_log_resume():
+    destination = io.BytesIO(LOG[:100] + b"garbage")
+    written = SystemInfo(LogAdapter(LOG)).download_log(destination, offset=100, chunk_size=50)
+    assert written == len(LOG) - 100
+    assert destination.getvalue() == LOG
+
+
+def test_download_log_resume_after_end_of_file():
+    destination = io.BytesIO(LOG[:100])
+    written = SystemInfo(LogAdapter(LOG)).download_log(destination, offset=300, chunk_size=50)
+    assert written == len(LOG) - 100
+    assert destination.getvalue() == LOG
+
+
+def test_download_log_missing_file(tmp_path):
+    path = tmp_path / "log.bin"
+    written = SystemInfo(LogAdapter(LOG)).download_log(str(path), offset=100)
+    assert written == len(LOG)
+    assert path.read_bytes() == LOG
+
+
+class Pipe(io.RawIOBase):
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def test_download_log_to_stream():
+    pipe = Pipe()
+    assert not pipe.seekable()
+    written = SystemInfo(LogAdapter(LOG)).download_log(pipe, offset=100, chunk_size=50)
+    assert written == len(LOG) - 100
+    assert bytes(pipe.data) == LOG[100:]
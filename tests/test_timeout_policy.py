@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("bluepy")
+
+from pysphero.bluetooth.timeout_policy import AdaptiveTimeout  # noqa: E402
+
+
+def test_initial_timeout():
+    policy = AdaptiveTimeout(initial_timeout=3.0)
+    assert policy.timeout((0x13, 0x10)) == 3.0
+    assert policy.srtt((0x13, 0x10)) is None
+
+
+def test_first_measurement():
+    policy = AdaptiveTimeout(min_timeout=0.01)
+    policy.on_response((0x13, 0x10), 0.1)
+    assert policy.srtt((0x13, 0x10)) == pytest.approx(0.1)
+    # srtt + 4 * rtt / 2
+    assert policy.timeout((0x13, 0x10)) == pytest.approx(0.3)
+
+
+def test_measurements_converge():
+    policy = AdaptiveTimeout(min_timeout=0.01)
+    for _ in range(100):
+        policy.on_response((0x13, 0x10), 0.05)
+    assert policy.srtt((0x13, 0x10)) == pytest.approx(0.05)
+    assert policy.timeout((0x13, 0x10)) < 0.06
+
+
+def test_command_classes_are_independent():
+    policy = AdaptiveTimeout(initial_timeout=3.0)
+    policy.on_response((0x13, 0x10), 0.1)
+    assert policy.timeout((0x11, 0x00)) == 3.0
+
+
+def test_timeout_bounds_and_backoff():
+    policy = AdaptiveTimeout(min_timeout=0.2, max_timeout=1.0)
+    policy.on_response((0x13, 0x10), 0.01)
+    assert policy.timeout((0x13, 0x10)) == 0.2
+
+    policy.on_timeout((0x13, 0x10))
+    assert policy.timeout((0x13, 0x10)) == 0.4
+    for _ in range(5):
+        policy.on_timeout((0x13, 0x10))
+    assert policy.timeout((0x13, 0x10)) == 1.0
+
+
+def test_only_read_only_commands_retried():
+    policy = AdaptiveTimeout(retries=2)
+    assert policy.retries_of((0x10, 0x00)) == 2
+    assert policy.retries_of((0x16, 0x07)) == 0
+
+    policy.retryable.add((0x16, 0x07))
+    assert policy.retries_of((0x16, 0x07)) == 2